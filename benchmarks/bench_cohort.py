@@ -0,0 +1,73 @@
+"""
+Cohort analytics at team scale.
+
+Usage:
+    python benchmarks/bench_cohort.py [--users 100 1000 5000] [--days 1095] [--repeat 3]
+
+Builds seeded random daily series for every user (staggered start and end
+dates, skipped days, per-user rating offsets), then times stacking them into
+the cohort matrices and each vectorized aggregate in src/cohort.py. Reports
+the best of --repeat runs in milliseconds and the matrix memory.
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from cohort import COHORT_METRICS, build_cohort, participation, standings, summarize_cohort, weekly_percentiles
+
+def synthetic_series(users, days, seed=0):
+    """Return seeded daily series shaped like stats.build_daily_series output, by user."""
+    rng = np.random.default_rng(seed)
+    end = np.datetime64('2023-12-31')
+    series_by_user = {}
+    for index in range(users):
+        # Some people joined late or stopped logging
+        length = int(rng.integers(days // 4, days + 1))
+        last = end - int(rng.integers(0, days // 10 + 1))
+        dates = last - length + 1 + np.arange(length)
+        logged = rng.random(length) > rng.uniform(0.05, 0.4)
+        series = {'dates': dates, 'logged': logged}
+        for metric in COHORT_METRICS:
+            values = np.clip(np.round(rng.normal(6 + rng.normal(0, 1), 1.5, length) * 2) / 2, 1, 10)
+            series[metric] = np.where(logged, values, np.nan)
+        series_by_user[f"user-{index}"] = series
+    return series_by_user
+
+def best_of(function, repeat):
+    """Return the best wall time of a function in milliseconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--days", type=int, default=1095, help="Longest history per user")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'users':>6} {'matrix MB':>10} {'build':>8} {'pctl':>8} {'partic':>8} {'standing':>9} {'summary':>9}  (ms)")
+    for users in args.users:
+        series_by_user = synthetic_series(users, args.days)
+        cohort = build_cohort(series_by_user)
+        megabytes = sum(cohort[name].nbytes for name in COHORT_METRICS + ('logged',)) / 2**20
+        timings = [
+            best_of(lambda: build_cohort(series_by_user), args.repeat),
+            best_of(lambda: weekly_percentiles(cohort, 'mood'), args.repeat),
+            best_of(lambda: participation(cohort), args.repeat),
+            best_of(lambda: standings(cohort, 'mood'), args.repeat),
+            best_of(lambda: summarize_cohort(cohort), args.repeat),
+        ]
+        print(f"{users:>6} {megabytes:>10.1f} " + " ".join(f"{ms:>8.1f}" for ms in timings[:3])
+              + f" {timings[3]:>9.1f} {timings[4]:>9.1f}")
+
+if __name__ == "__main__":
+    main()
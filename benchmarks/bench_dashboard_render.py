@@ -0,0 +1,74 @@
+"""
+Render-time benchmark for the dashboard charts at growing history lengths.
+
+Usage:
+    python benchmarks/bench_dashboard_render.py [--days 30 365 3650] [--repeat 3]
+
+Each chart is built and rendered to an in-memory PNG with the Agg backend;
+the best of --repeat runs is reported.
+"""
+import os
+import io
+import sys
+import time
+import random
+import argparse
+from datetime import date, timedelta
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+os.environ.setdefault("GOOGLE_API_KEY_GEMINI", "benchmark")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import matplotlib.pyplot as plt
+from dashboard import CHART_NAMES, build_chart
+
+def make_history(days, seed=0):
+    """Build parsed daily logs and weekly reviews covering the given number of days."""
+    rng = random.Random(seed)
+    start = date(2020, 1, 6)
+    daily_logs, weekly_reviews = [], []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if rng.random() < 0.9:
+            daily_logs.append({
+                'day_of_week': day.strftime('%A'),
+                'date': f"{day:%B} {day.day}, {day.year}",
+                'mood': float(rng.randint(2, 9)),
+                'focus': float(rng.randint(2, 9)),
+                'achievements': [f"Task {offset}"] * rng.randint(0, 3),
+                'challenges': ["Distracted"] * rng.randint(0, 2),
+            })
+        if day.weekday() == 6 and day.day >= 7:
+            monday = day - timedelta(days=6)
+            weekly_reviews.append({
+                'week': f"{monday:%B} {monday.day}-{day.day}, {day.year}",
+                'overall_mood': float(rng.randint(4, 9)),
+                'overall_productivity': float(rng.randint(4, 9)),
+            })
+    return daily_logs, weekly_reviews
+
+def time_chart(chart_name, daily_logs, weekly_reviews, repeat):
+    """Return the best build-and-render time of one chart in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fig = build_chart(chart_name, daily_logs, weekly_reviews)
+        fig.savefig(io.BytesIO(), format='png')
+        plt.close(fig)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description="Dashboard render-time benchmark")
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 365, 3650])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'chart':<26}" + "".join(f"{days:>10}d" for days in args.days))
+    histories = {days: make_history(days) for days in args.days}
+    for chart_name in CHART_NAMES:
+        timings = [time_chart(chart_name, *histories[days], args.repeat) for days in args.days]
+        print(f"{chart_name:<26}" + "".join(f"{timing * 1000:>9.0f}ms" for timing in timings))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""
+Download size and decode time of each document fetch strategy.
+
+Usage:
+    python benchmarks/bench_fetch.py [--days 30 365 3650] [--repeat 3]
+
+Serves synthetic documents from the local fake Docs/Drive server and fetches
+each one with every strategy in productivity_tracker.FETCH_STRATEGIES,
+reporting response bytes, fetch time and decode time (best of --repeat).
+"""
+import os
+import io
+import sys
+import argparse
+import contextlib
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fake_google import FakeGoogleServer, FakeGoogleState
+from synthetic_logs import generate_log_text
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[30, 365, 3650])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    documents = {f"doc-{days}": generate_log_text(days) for days in args.days}
+    server = FakeGoogleServer(FakeGoogleState(documents=documents)).start()
+    os.environ["GOOGLE_DOCS_ENDPOINT"] = server.url
+    os.environ.setdefault("GOOGLE_API_KEY_GEMINI", "benchmark")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import productivity_tracker
+        service = productivity_tracker.authenticate_google_docs_api()
+        drive_service = productivity_tracker.authenticate_google_drive_api()
+
+    print(f"{'days':>6} {'strategy':>9} {'bytes':>11} {'fetch ms':>9} {'decode ms':>10}")
+    for days in args.days:
+        document_id = f"doc-{days}"
+        for strategy in productivity_tracker.FETCH_STRATEGIES:
+            best = None
+            for _ in range(args.repeat):
+                text, stats = productivity_tracker.fetch_document_text(document_id, service, strategy, drive_service)
+                assert text == documents[document_id], f"{strategy} returned different text"
+                if best is None or stats['fetch_seconds'] + stats['decode_seconds'] < best['fetch_seconds'] + best['decode_seconds']:
+                    best = stats
+            print(f"{days:>6} {strategy:>9} {best['bytes']:>11,} "
+                  f"{best['fetch_seconds'] * 1000:>9.1f} {best['decode_seconds'] * 1000:>10.1f}")
+    server.stop()
+
+if __name__ == "__main__":
+    main()
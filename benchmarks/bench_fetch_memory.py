@@ -0,0 +1,109 @@
+"""
+Peak memory of each document fetch strategy on a large document.
+
+Usage:
+    python benchmarks/bench_fetch_memory.py [--days 3650]
+
+Serves one large synthetic document from the local fake Docs/Drive server and
+fetches it with every strategy in productivity_tracker.FETCH_STRATEGIES, each
+in a fresh interpreter so peak resident set sizes do not carry over. Reports
+the response bytes, how much the fetch raised the process's peak RSS, and
+the peak of Python heap allocations during the fetch (tracemalloc). The
+request is built before measuring, so only the download and decoding count.
+The RSS high-water mark is reset before the fetch on Linux; elsewhere it
+includes the interpreter's earlier peak, so the heap column is the better
+guide there.
+"""
+import os
+import io
+import sys
+import gc
+import json
+import argparse
+import contextlib
+import subprocess
+import tracemalloc
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+sys.path.insert(0, SRC_DIR)
+
+def reset_peak_rss():
+    """Reset the peak RSS to the current RSS where the kernel allows it (Linux)."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+def peak_rss_bytes():
+    """Return the peak resident set size of this process in bytes."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+def measure(strategy, document_id):
+    """Fetch a document once in this process and print the measurement as JSON."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        import productivity_tracker
+        service = productivity_tracker.authenticate_google_docs_api()
+        drive_service = productivity_tracker.authenticate_google_drive_api()
+        # Warm up the clients on a small document so only the fetch itself is measured
+        productivity_tracker.fetch_document_text("warm-up", service, strategy, drive_service)
+        # Building a request rebuilds the client's method objects; keep that out of the measurement
+        request = productivity_tracker.build_fetch_request(document_id, strategy, service, drive_service)
+        gc.collect()
+        reset_peak_rss()
+        before = peak_rss_bytes()
+        tracemalloc.start()
+        text, stats = productivity_tracker.fetch_document_text(document_id, service, strategy, drive_service,
+                                                               request=request)
+        heap_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        after = peak_rss_bytes()
+    print(json.dumps({'chars': len(text or ""), 'bytes': stats['bytes'],
+                      'peak_delta': after - before, 'heap_peak': heap_peak}))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=3650, help="History length of the large document")
+    parser.add_argument("--measure", nargs=2, metavar=("STRATEGY", "DOCUMENT_ID"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(*args.measure)
+        return
+
+    from fake_google import FakeGoogleServer, FakeGoogleState
+    from synthetic_logs import generate_log_text
+
+    document_id = f"doc-{args.days}"
+    documents = {document_id: generate_log_text(args.days), "warm-up": generate_log_text(7)}
+    server = FakeGoogleServer(FakeGoogleState(documents=documents)).start()
+    os.environ["GOOGLE_DOCS_ENDPOINT"] = server.url
+    os.environ.setdefault("GOOGLE_API_KEY_GEMINI", "benchmark")
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        from productivity_tracker import FETCH_STRATEGIES
+
+    print(f"{args.days} days, {len(documents[document_id]):,} chars of text")
+    print(f"{'strategy':>9} {'bytes':>12} {'peak RSS +MB':>13} {'heap peak MB':>13}")
+    for strategy in FETCH_STRATEGIES:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--measure", strategy, document_id],
+                                env=env, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        assert result['chars'] == len(documents[document_id]), f"{strategy} returned different text"
+        print(f"{strategy:>9} {result['bytes']:>12,} {result['peak_delta'] / 2**20:>13.1f} "
+              f"{result['heap_peak'] / 2**20:>13.1f}")
+    server.stop()
+
+if __name__ == "__main__":
+    main()
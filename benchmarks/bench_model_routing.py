@@ -0,0 +1,76 @@
+"""
+Routing check for the model router against local stub models.
+
+Usage:
+    python benchmarks/bench_model_routing.py [--latency-budget 1.0] [--timeout 0.5]
+
+Three stubs stand in for the configured models: a fast model limited to
+small prompts, a mid-speed model, and a slow model. Prompts from a few
+days to a dense month of logs are routed, one stub is made to hang to
+show the timeout fallback, and the chosen models and latencies are
+reported.
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from model_router import ModelOption, ModelRouter, StubModel, stub_client_factory
+
+def make_prompt(days):
+    """Build a prompt roughly the size of the formatted data for this many days."""
+    day = "Monday, March 6, 2023 (mood 7, focus 6)\nAchievements:\n- Shipped the report\nChallenges:\n- Meetings\n\n"
+    return "Analyze the following productivity and mood data:\n\n" + day * days
+
+def make_models():
+    """The model options, matching the stub latency profiles below."""
+    return [
+        ModelOption('fast-small', max_input_tokens=1000, input_cost=0.075, output_cost=0.30,
+                    base_latency=0.05, latency_per_1k_tokens=0.01),
+        ModelOption('standard', max_input_tokens=100000, input_cost=0.10, output_cost=0.40,
+                    base_latency=0.15, latency_per_1k_tokens=0.02),
+        ModelOption('slow-large', max_input_tokens=1000000, input_cost=0.30, output_cost=2.50,
+                    base_latency=0.40, latency_per_1k_tokens=0.05),
+    ]
+
+def make_stubs(hang=None):
+    """Stubs with different latency profiles; the one named by hang takes far too long."""
+    stubs = {
+        'fast-small': StubModel('fast-small', base_latency=0.05, latency_per_1k_tokens=0.01, jitter=0.01, seed=1),
+        'standard': StubModel('standard', base_latency=0.15, latency_per_1k_tokens=0.02, jitter=0.02, seed=2),
+        'slow-large': StubModel('slow-large', base_latency=0.40, latency_per_1k_tokens=0.05, jitter=0.05, seed=3),
+    }
+    if hang:
+        stubs[hang].base_latency = 5.0
+    return stubs
+
+def run(days_list, latency_budget, timeout, hang=None):
+    """Route one prompt per history length and print the outcome."""
+    router = ModelRouter(make_models(), latency_budget=latency_budget, cost_budget=0.01,
+                         client_factory=stub_client_factory(make_stubs(hang)), timeout=timeout)
+    print(f"\nStubs{' with ' + hang + ' hanging' if hang else ''}:")
+    print(f"{'days':>6} {'tokens':>8} {'model':>12} {'seconds':>8} {'attempts':>9}")
+    for days in days_list:
+        attempts_before = len(router.history)
+        start = time.perf_counter()
+        response = router.generate(make_prompt(days))
+        seconds = time.perf_counter() - start
+        model = router.history[-1][0]
+        attempts = len(router.history) - attempts_before
+        print(f"{days:>6} {router.history[-1][1]:>8} {model:>12} {seconds:>8.2f} {attempts:>9}")
+        assert response.text.startswith(f"[{model}]")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, nargs="+", default=[3, 7, 30, 365])
+    parser.add_argument("--latency-budget", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=0.5)
+    args = parser.parse_args()
+
+    run(args.days, args.latency_budget, args.timeout)
+    run(args.days, args.latency_budget, args.timeout, hang='standard')
+
+if __name__ == "__main__":
+    main()
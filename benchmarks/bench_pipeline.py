@@ -0,0 +1,109 @@
+"""
+Full-pipeline load test against the local fake Docs and Gemini server.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--documents 200] [--workers 16] [--days 365]
+        [--get-latency 0.05] [--gemini-latency 0.5] [--write-latency 0.05]
+        [--error-rate 0.0] [--gemini-quota N]
+
+Starts src/fake_google.py in-process, points the tracker at it through
+GOOGLE_DOCS_ENDPOINT and GEMINI_ENDPOINT, and runs read -> parse ->
+weekly analysis -> write for every document on a thread pool. Reports
+throughput, per-document latency percentiles, failures and per-endpoint
+request counts.
+"""
+import os
+import io
+import sys
+import time
+import tempfile
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from fake_google import EndpointProfile, FakeGoogleServer, FakeGoogleState
+
+def percentile(values, fraction):
+    """Return a percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--days", type=int, default=365, help="History length of each document")
+    parser.add_argument("--get-latency", type=float, default=0.05)
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--write-latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests to every endpoint failing with 503")
+    parser.add_argument("--gemini-quota", type=int, help="generateContent requests allowed per minute")
+    args = parser.parse_args()
+
+    profiles = {
+        'get': EndpointProfile(latency=args.get_latency, jitter=args.get_latency / 2, error_rate=args.error_rate),
+        'batchUpdate': EndpointProfile(latency=args.write_latency, jitter=args.write_latency / 2, error_rate=args.error_rate),
+        'generateContent': EndpointProfile(latency=args.gemini_latency, jitter=args.gemini_latency / 2,
+                                           error_rate=args.error_rate, quota_per_minute=args.gemini_quota),
+    }
+    server = FakeGoogleServer(FakeGoogleState(profiles, days=args.days)).start()
+    os.environ["GOOGLE_DOCS_ENDPOINT"] = server.url
+    os.environ["GEMINI_ENDPOINT"] = server.url
+    os.environ.setdefault("GOOGLE_API_KEY_GEMINI", "benchmark")
+    os.environ["HABIT_CACHE_DIR"] = tempfile.mkdtemp(prefix="habit-bench-")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        import productivity_tracker
+        from data_parser import ProductivityDataParser
+        from snapshot import get_cache_dir
+
+    # The Docs client is not thread-safe, so every worker thread builds its own
+    local = threading.local()
+
+    def run_document(index):
+        document_id = f"load-test-{index}"
+        start = time.perf_counter()
+        if not hasattr(local, 'service'):
+            local.service = productivity_tracker.authenticate_google_docs_api()
+        doc_content = productivity_tracker.read_google_doc(document_id, local.service)
+        if not doc_content:
+            return 'read', time.perf_counter() - start
+        parser = ProductivityDataParser(cache_dir=get_cache_dir(document_id))
+        parser.refresh_snapshot(doc_content)
+        analysis = productivity_tracker.generate_period_analysis(parser, doc_content, "weekly")
+        if not analysis:
+            return 'generate', time.perf_counter() - start
+        if not productivity_tracker.write_analysis_to_doc(document_id, analysis, "weekly", local.service):
+            return 'write', time.perf_counter() - start
+        return 'ok', time.perf_counter() - start
+
+    print(f"Fake server on {server.url}: {args.documents} documents x {args.days} days, {args.workers} workers")
+    wall_start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            results = list(executor.map(run_document, range(args.documents)))
+    wall = time.perf_counter() - wall_start
+    server.stop()
+
+    latencies = [seconds for outcome, seconds in results if outcome == 'ok']
+    failures = {}
+    for outcome, _ in results:
+        if outcome != 'ok':
+            failures[outcome] = failures.get(outcome, 0) + 1
+
+    print(f"Completed {len(latencies)}/{len(results)} documents in {wall:.2f}s ({len(results) / wall:.1f} documents/s)")
+    if latencies:
+        print(f"Per-document latency: p50 {percentile(latencies, 0.5):.3f}s, "
+              f"p95 {percentile(latencies, 0.95):.3f}s, max {max(latencies):.3f}s")
+    if failures:
+        print("Failures by stage: " + ", ".join(f"{stage} {count}" for stage, count in sorted(failures.items())))
+    stats = server.state.stats()
+    print("Requests: " + ", ".join(f"{endpoint} {count}" for endpoint, count in sorted(stats['requests'].items())))
+    if stats['errors']:
+        print("Injected errors: " + ", ".join(f"{endpoint} {count}" for endpoint, count in sorted(stats['errors'].items())))
+
+if __name__ == "__main__":
+    main()
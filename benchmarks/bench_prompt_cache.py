@@ -0,0 +1,86 @@
+"""
+Batch analyses with and without a cached prompt prefix, against local stub models.
+
+Usage:
+    python benchmarks/bench_prompt_cache.py [--periods 12] [--days 7 30] [--history 365] [--cached-ratio 0.1]
+
+Runs one backfill-style batch per period length: the weekly instructions
+and --history days of earlier ratings as the shared prefix, as backfill
+sends them, and a different period's data as suffix for every call. The
+batch is run once sending whole prompts and once inside
+ModelRouter.context_caching(), where the stub holds the registered prefix
+and charges its tokens at --cached-ratio of the normal latency. The
+default cache minimum applies, so a --history too short for Gemini to
+cache is reported as sent in full. Reports the
+mean latency per call, the prompt tokens sent with each call and the cache
+stats line printed by backfill.
+"""
+import os
+import sys
+import time
+import argparse
+import contextlib
+
+os.environ.setdefault("GOOGLE_API_KEY_GEMINI", "benchmark")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from model_router import ModelOption, ModelRouter, StubModel, format_cache_stats, stub_client_factory, stub_context_factory
+from productivity_tracker import build_analysis_prompt
+
+def make_data(days, period):
+    """Formatted data roughly the size of one period of this many days."""
+    day = f"Monday, March {period % 28 + 1}, 2023 (mood 7, focus 6)\nAchievements:\n- Shipped the report\nChallenges:\n- Meetings\n\n"
+    return day * days
+
+def make_background(days):
+    """Formatted history roughly the size of this many days of earlier ratings and weekly reviews."""
+    day = "Monday, January 2, 2023 (mood 7, focus 6)\n"
+    review = "Week of January 2-8, 2023\n- Overall mood: 7/10\n- Overall productivity: 6/10\n- Key achievements:\n  - Shipped the report\n"
+    return "Daily Ratings:\n\n" + day * days + "\nWeekly Reviews:\n\n" + review * (days // 7)
+
+def make_router(cached_ratio):
+    """A router over one stub whose latency is dominated by prompt size."""
+    stub = StubModel('standard', base_latency=0.02, latency_per_1k_tokens=0.2, cached_token_ratio=cached_ratio, seed=1)
+    model = ModelOption('standard', max_input_tokens=1000000, input_cost=0.10, output_cost=0.40,
+                        base_latency=0.02, latency_per_1k_tokens=0.2)
+    stubs = {'standard': stub}
+    router = ModelRouter([model], latency_budget=10.0, client_factory=stub_client_factory(stubs),
+                         context_factory=stub_context_factory(stubs))
+    return router
+
+def run_batch(router, days, periods, history, cached):
+    """Analyze each period once; return the mean seconds and tokens sent per call, and the cache stats."""
+    sent = 0
+    background = make_background(history)
+    caching = router.context_caching() if cached else contextlib.nullcontext()
+    with caching as cache:
+        start = time.perf_counter()
+        for period in range(periods):
+            prefix, suffix = build_analysis_prompt(make_data(days, period), 'weekly', background=background)
+            router.generate(suffix, prefix=prefix)
+            registered = cached and cache.stats()['registrations']
+            sent += len(suffix) if registered else len(prefix) + len(suffix)
+        seconds = time.perf_counter() - start
+        stats = cache.stats() if cached else None
+    return seconds / periods, sent / 4 / periods, stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--periods", type=int, default=12, help="Calls per batch")
+    parser.add_argument("--days", type=int, nargs="+", default=[7, 30], help="Days of data per call")
+    parser.add_argument("--history", type=int, default=365, help="Days of earlier history in the shared prefix")
+    parser.add_argument("--cached-ratio", type=float, default=0.1,
+                        help="Latency of a cached prefix token relative to a sent token")
+    args = parser.parse_args()
+
+    print(f"{'days':>6} {'mode':>8} {'ms/call':>8} {'tokens sent/call':>17}")
+    for days in args.days:
+        stats = None
+        for cached in (False, True):
+            seconds, tokens, batch_stats = run_batch(make_router(args.cached_ratio), days, args.periods, args.history, cached)
+            stats = batch_stats or stats
+            print(f"{days:>6} {'cached' if cached else 'full':>8} {seconds * 1000:>8.1f} {tokens:>17.0f}")
+        print(f"{'':>6} {format_cache_stats(stats)}")
+
+if __name__ == "__main__":
+    main()
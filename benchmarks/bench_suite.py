@@ -0,0 +1,138 @@
+"""
+End-to-end benchmark suite for the parsing, analysis and chart hot paths.
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes week month year 10years] [--repeat 3]
+    python benchmarks/bench_suite.py --update-baseline
+    python benchmarks/bench_suite.py --check [--tolerance 0.5]
+
+Each size is a seeded synthetic log (see src/synthetic_logs.py) in the exact
+format the parser reads. The best of --repeat runs of every benchmark is
+reported in milliseconds. --update-baseline stores the results in
+benchmarks/baseline.json; --check compares against it and exits non-zero
+when a benchmark is slower than the baseline by more than the tolerance.
+Baselines are machine-specific, so refresh it when changing machines.
+"""
+import os
+import io
+import sys
+import json
+import time
+import platform
+import argparse
+from datetime import datetime
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+os.environ.setdefault("GOOGLE_API_KEY_GEMINI", "benchmark")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import matplotlib.pyplot as plt
+from data_parser import ProductivityDataParser
+from dashboard import CHART_NAMES, build_chart, parse_dashboard_data
+from synthetic_logs import SIZES, generate_log_text, history_end
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+def best_of(function, repeat):
+    """Return the best wall time of a function in milliseconds, after one warm-up call."""
+    function()
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def render_chart(chart_name, daily_logs, weekly_reviews):
+    """Build a chart and render it to an in-memory PNG."""
+    fig = build_chart(chart_name, daily_logs, weekly_reviews)
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+
+def run_size(size, repeat, seed=0):
+    """Time every benchmark on one synthetic history."""
+    days = SIZES[size]
+    text = generate_log_text(days, seed=seed)
+    # Analyze as of the history's last day so the windows are never empty
+    end = history_end(days)
+    reference_date = datetime(end.year, end.month, end.day)
+    parser = ProductivityDataParser()
+
+    results = {
+        'parse_daily_logs': best_of(lambda: parser.parse_daily_logs(text), repeat),
+        'parse_weekly_reviews': best_of(lambda: parser.parse_weekly_reviews(text), repeat),
+    }
+    for analysis_type in ("weekly", "monthly"):
+        results[f'extract_data_for_analysis.{analysis_type}'] = best_of(
+            lambda: parser.extract_data_for_analysis(text, analysis_type, reference_date), repeat)
+        data = parser.extract_data_for_analysis(text, analysis_type, reference_date)
+        results[f'format_data_for_gemini.{analysis_type}'] = best_of(
+            lambda: parser.format_data_for_gemini(data, analysis_type), repeat)
+
+    daily_logs, weekly_reviews = parse_dashboard_data(text)
+    for chart_name in CHART_NAMES:
+        results[f'chart.{chart_name}'] = best_of(lambda: render_chart(chart_name, daily_logs, weekly_reviews), repeat)
+
+    return {'days': days, 'chars': len(text), 'entries': len(daily_logs), 'ms': results}
+
+def compare(results, baseline, tolerance):
+    """Return (size, benchmark, baseline ms, current ms) for every regression."""
+    regressions = []
+    for size, current in results.items():
+        previous = baseline.get('sizes', {}).get(size)
+        if not previous:
+            continue
+        for name, ms in current['ms'].items():
+            base = previous['ms'].get(name)
+            # Ignore slowdowns of a few milliseconds; timer noise dwarfs any tolerance there
+            if base is not None and ms - base > 2.0 and ms > base * (1 + tolerance):
+                regressions.append((size, name, base, ms))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", nargs="+", choices=list(SIZES), default=["week", "month", "year", "10years"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=str, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Fail if any benchmark regressed against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Allowed slowdown as a fraction of the baseline (default 0.5 = 50%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        results[size] = run_size(size, args.repeat)
+        print(f"\n{size} ({results[size]['days']} days, {results[size]['entries']} entries, {results[size]['chars']} chars)")
+        for name, ms in results[size]['ms'].items():
+            print(f"  {name:<40}{ms:>10.2f}ms")
+
+    if args.update_baseline:
+        baseline = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'repeat': args.repeat,
+            'sizes': results,
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline written to {args.baseline}")
+
+    if args.check:
+        if not os.path.exists(args.baseline):
+            print(f"\nNo baseline at {args.baseline}; run with --update-baseline first.")
+            sys.exit(2)
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for size, name, base, ms in regressions:
+                print(f"  {size}: {name} {base:.2f}ms -> {ms:.2f}ms")
+            sys.exit(1)
+        print("\nNo regressions against the baseline.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import math
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from stats import parse_log_date
+
+class StreakDetector:
+    """
+    Single-pass detector for streaks and anomalies in the daily series.
+
+    Days must be fed in date order. Every update is O(1), so the detector can
+    be kept around and updated as new days are appended to the log.
+    """
+
+    def __init__(self, low_mood_threshold: float = 4.0, min_streak: int = 3,
+                 baseline_window: int = 14, min_baseline: int = 7,
+                 sigma: float = 2.0, min_gap: int = 2):
+        """
+        Initialize the detector.
+
+        Args:
+            low_mood_threshold: Days with mood at or below this are "low".
+            min_streak: Minimum number of consecutive low-mood days to report.
+            baseline_window: Number of previous focus ratings in the baseline.
+            min_baseline: Minimum number of ratings before drops are reported.
+            sigma: How many standard deviations below the baseline is a drop.
+            min_gap: Minimum number of missing days to report as a logging gap.
+        """
+        self.low_mood_threshold = low_mood_threshold
+        self.min_streak = min_streak
+        self.baseline_window = baseline_window
+        self.min_baseline = min_baseline
+        self.sigma = sigma
+        self.min_gap = min_gap
+
+        self.last_date: Optional[datetime] = None
+        self.completed: List[Dict] = []
+
+        # Current low-mood streak
+        self._streak_start: Optional[datetime] = None
+        self._streak_length = 0
+
+        # Rolling focus baseline kept as running sums over a fixed window
+        self._focus_window = deque()
+        self._focus_sum = 0.0
+        self._focus_sum_sq = 0.0
+
+    def update(self, date: datetime, mood: Optional[float] = None, focus: Optional[float] = None) -> List[Dict]:
+        """
+        Feed the next day of the series.
+
+        Args:
+            date: The date of the log; must be after the previously fed date.
+            mood: The mood rating, if logged.
+            focus: The focus rating, if logged.
+
+        Returns:
+            The findings completed by this update.
+        """
+        if self.last_date is not None and date <= self.last_date:
+            raise ValueError(f"Days must be fed in date order: {date:%B %d, %Y} after {self.last_date:%B %d, %Y}")
+
+        found = []
+
+        # Logging gaps also break a running streak
+        if self.last_date is not None:
+            missing = (date - self.last_date).days - 1
+            if missing > 0:
+                found.extend(self._close_streak())
+            if missing >= self.min_gap:
+                found.append({
+                    'type': 'logging_gap',
+                    'start': _format_date(self.last_date + timedelta(days=1)),
+                    'end': _format_date(date - timedelta(days=1)),
+                    'days': missing,
+                })
+
+        # Low-mood streaks
+        if mood is not None and mood <= self.low_mood_threshold:
+            if self._streak_length == 0:
+                self._streak_start = date
+            self._streak_length += 1
+        else:
+            found.extend(self._close_streak())
+
+        # Focus drops against the baseline of previous days
+        if focus is not None:
+            count = len(self._focus_window)
+            if count >= self.min_baseline:
+                mean = self._focus_sum / count
+                variance = max(self._focus_sum_sq / count - mean * mean, 0.0)
+                std = math.sqrt(variance)
+                if std > 0 and focus < mean - self.sigma * std:
+                    found.append({
+                        'type': 'focus_drop',
+                        'date': _format_date(date),
+                        'focus': focus,
+                        'baseline': round(mean, 2),
+                        'sigmas': round((mean - focus) / std, 2),
+                    })
+
+            self._focus_window.append(focus)
+            self._focus_sum += focus
+            self._focus_sum_sq += focus * focus
+            if len(self._focus_window) > self.baseline_window:
+                dropped = self._focus_window.popleft()
+                self._focus_sum -= dropped
+                self._focus_sum_sq -= dropped * dropped
+
+        self.last_date = date
+        self.completed.extend(found)
+        return found
+
+    def findings(self) -> List[Dict]:
+        """
+        Return all findings so far, including a low-mood streak still in progress.
+
+        Returns:
+            A list of finding dictionaries in the order they were detected.
+        """
+        findings = list(self.completed)
+        if self._streak_length >= self.min_streak:
+            findings.append(self._streak_finding(ongoing=True))
+        return findings
+
+    def _close_streak(self) -> List[Dict]:
+        """Finish the current low-mood streak, returning it if long enough."""
+        found = []
+        if self._streak_length >= self.min_streak:
+            found.append(self._streak_finding(ongoing=False))
+        self._streak_start = None
+        self._streak_length = 0
+        return found
+
+    def _streak_finding(self, ongoing: bool) -> Dict:
+        """Build the finding for the current low-mood streak."""
+        return {
+            'type': 'low_mood_streak',
+            'start': _format_date(self._streak_start),
+            'end': _format_date(self._streak_start + timedelta(days=self._streak_length - 1)),
+            'days': self._streak_length,
+            'ongoing': ongoing,
+        }
+
+def _format_date(date: datetime) -> str:
+    """Format a date the same way the daily logs do."""
+    return f"{date:%B} {date.day}, {date.year}"
+
+def _dated_ratings(daily_logs: Union[List[Dict], np.ndarray]):
+    """Yield (date, mood, focus) for every dated log; missing ratings are None."""
+    if isinstance(daily_logs, np.ndarray):
+        # Archive rows are read in place; NaN marks a missing rating
+        records = daily_logs[~np.isnat(daily_logs['date'])]
+        dates = records['date'].astype('datetime64[s]').astype(datetime)
+        for date, mood, focus in zip(dates, records['mood'].tolist(), records['focus'].tolist()):
+            yield date, None if math.isnan(mood) else mood, None if math.isnan(focus) else focus
+        return
+
+    for log in daily_logs:
+        date = parse_log_date(log.get('date'))
+        if date is not None:
+            yield date, log.get('mood'), log.get('focus')
+
+def detect_anomalies(daily_logs: Union[List[Dict], np.ndarray], detector: Optional[StreakDetector] = None) -> List[Dict]:
+    """
+    Run streak and anomaly detection over a list of daily logs.
+
+    Args:
+        daily_logs: A list of dictionaries, each representing a daily log,
+            or the daily_logs structured array of a log archive.
+        detector: An optional, pre-configured detector to feed.
+
+    Returns:
+        A list of findings.
+    """
+    if detector is None:
+        detector = StreakDetector()
+
+    # Sort once; duplicate dates keep the later log, as in stats.build_daily_series
+    by_date = {}
+    for date, mood, focus in _dated_ratings(daily_logs):
+        by_date[date] = (mood, focus)
+
+    for date in sorted(by_date):
+        if detector.last_date is not None and date <= detector.last_date:
+            continue
+        detector.update(date, *by_date[date])
+
+    return detector.findings()
+
+def findings_since(findings: List[Dict], since: datetime) -> List[Dict]:
+    """
+    Filter findings to those that end on or after a date.
+
+    Args:
+        findings: The findings returned by detect_anomalies.
+        since: The earliest end date to keep.
+
+    Returns:
+        The matching findings.
+    """
+    kept = []
+    for finding in findings:
+        end = parse_log_date(finding.get('end', finding.get('date')))
+        if end is not None and end >= since:
+            kept.append(finding)
+    return kept
+
+def format_anomalies(findings: List[Dict]) -> str:
+    """
+    Format findings as a short list for a prompt.
+
+    Args:
+        findings: The findings returned by detect_anomalies.
+
+    Returns:
+        A formatted string, or an empty string when there is nothing to report.
+    """
+    if not findings:
+        return ""
+
+    lines = ["Detected Patterns:"]
+    for finding in findings:
+        if finding['type'] == 'low_mood_streak':
+            status = " (ongoing)" if finding.get('ongoing') else ""
+            lines.append(f"- Low mood streak: {finding['days']} days, {finding['start']} to {finding['end']}{status}")
+        elif finding['type'] == 'focus_drop':
+            lines.append(
+                f"- Focus drop on {finding['date']}: {finding['focus']:g}/10, "
+                f"{finding['sigmas']:g} sigma below baseline {finding['baseline']:g}"
+            )
+        elif finding['type'] == 'logging_gap':
+            lines.append(f"- Logging gap: {finding['days']} days without entries, {finding['start']} to {finding['end']}")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,272 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from data_parser import ProductivityDataParser
+from history_store import HistoryStore
+from productivity_tracker import (
+    authenticate_google_docs_api,
+    generate_period_analysis,
+    get_model_router,
+    read_google_doc,
+    write_sections_to_doc,
+)
+from model_router import format_cache_stats
+from snapshot import get_cache_dir, load_json, save_json
+
+def month_end(date: datetime) -> datetime:
+    """Return the last day of a date's month."""
+    return (date.replace(day=1) + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+def periods_since(since: datetime, until: datetime, analysis_type: str) -> List[Tuple[datetime, datetime]]:
+    """
+    List the first and last days of every period in a range.
+
+    Weekly periods are consecutive 7-day windows starting on `since`;
+    monthly periods are calendar months. The periods tile the range: each
+    starts the day after the previous one ends. The first monthly period
+    starts on `since` and the trailing period ends on `until`, so either
+    may be partial (see is_partial).
+
+    Args:
+        since: The first day to cover.
+        until: The last day to cover.
+        analysis_type: "weekly" or "monthly".
+
+    Returns:
+        The (start, end) days of each period, both inclusive, oldest first.
+    """
+    if analysis_type not in ("weekly", "monthly"):
+        raise ValueError(f"Backfill supports weekly and monthly analyses, not '{analysis_type}'")
+    start = since.replace(hour=0, minute=0, second=0, microsecond=0)
+    until = until.replace(hour=0, minute=0, second=0, microsecond=0)
+    periods = []
+    while start <= until:
+        end = start + timedelta(days=6) if analysis_type == "weekly" else month_end(start)
+        periods.append((start, min(end, until)))
+        start = end + timedelta(days=1)
+    return periods
+
+def is_partial(start: datetime, end: datetime, analysis_type: str) -> bool:
+    """Return whether a period from periods_since is shorter than a full week or calendar month."""
+    if analysis_type == "weekly":
+        return (end - start).days < 6
+    return start.day != 1 or end != month_end(end)
+
+def shared_background(parser: ProductivityDataParser, since: datetime, router, min_tokens: int) -> Optional[str]:
+    """
+    Return the history before a backfill range as shared context, if it is long enough to cache.
+
+    Every period of the backfill starts on or after `since`, so the history
+    before it is the same for all of them and holds no later entries. It is
+    only worth sending when it can be cached: otherwise every call would
+    resend it in full.
+
+    Args:
+        parser: The parser, with its history store filled.
+        since: The first day of the backfill.
+        router: The ModelRouter whose token estimate is used.
+        min_tokens: The shortest prefix the prompt cache registers.
+
+    Returns:
+        The formatted history, or None if there is none or it is too short.
+    """
+    background = parser.format_history(None, since - timedelta(days=1))
+    if not background:
+        return None
+    tokens = router.count_tokens(background)
+    if tokens < min_tokens:
+        print(f"The history before {since:%Y-%m-%d} is about {tokens} tokens, below the {min_tokens}-token "
+              f"prompt cache minimum; periods are analyzed without it")
+        return None
+    print(f"Sharing about {tokens} tokens of history before {since:%Y-%m-%d} with every period as cached context")
+    return background
+
+class Backfill:
+    """
+    Generates analyses for every past period since a date.
+
+    Periods run as independent jobs on a bounded thread pool, since each one
+    spends nearly all its time waiting on Gemini. After every completed
+    period the result is checkpointed, so a crashed or interrupted run picks
+    up where it stopped.
+    """
+
+    CHECKPOINT_FILENAME = "backfill_{analysis_type}.json"
+
+    def __init__(self, parser: ProductivityDataParser, doc_content: str, analysis_type: str,
+                 concurrency: int = 4, checkpoint_path: Optional[str] = None,
+                 generate: Callable = generate_period_analysis, background: Optional[str] = None):
+        """
+        Initialize the backfill.
+
+        Args:
+            parser: The parser, with its snapshot already refreshed.
+            doc_content: The text of the Google Doc, or None to read the
+                entries from the parser's history store.
+            analysis_type: "weekly" or "monthly".
+            concurrency: The maximum number of periods analyzed at once.
+            checkpoint_path: Where completed periods are saved. Defaults to a
+                file in the parser's cache directory.
+            generate: Function (parser, doc_content, analysis_type,
+                reference_date, period_start=..., background=...) -> text.
+            background: Formatted history shared by every period, from
+                shared_background.
+        """
+        self.parser = parser
+        self.doc_content = doc_content
+        self.analysis_type = analysis_type
+        self.concurrency = max(1, concurrency)
+        self.checkpoint_path = checkpoint_path or os.path.join(
+            parser.cache_dir, self.CHECKPOINT_FILENAME.format(analysis_type=analysis_type)
+        )
+        self.generate = generate
+        self.background = background
+        self.lock = threading.Lock()
+        # ISO reference date -> analysis text
+        self.completed: Dict[str, str] = load_json(self.checkpoint_path, {})
+
+    def run_period(self, start: datetime, reference_date: datetime) -> Optional[str]:
+        """Analyze the days from start to the reference date and checkpoint the result if generation succeeded."""
+        analysis = self.generate(self.parser, self.doc_content, self.analysis_type, reference_date,
+                                 period_start=start, background=self.background)
+        if analysis:
+            with self.lock:
+                self.completed[reference_date.date().isoformat()] = analysis
+                save_json(self.checkpoint_path, self.completed)
+        return analysis
+
+    def run(self, since: datetime, until: Optional[datetime] = None) -> Dict[str, str]:
+        """
+        Analyze every period since a date that is not checkpointed yet.
+
+        Args:
+            since: The first day to cover.
+            until: The last day to cover; today if None.
+
+        Returns:
+            ISO reference date -> analysis text for every completed period in
+            the range, oldest first.
+        """
+        periods = periods_since(since, until or datetime.now(), self.analysis_type)
+        pending = [(start, date) for start, date in periods if date.date().isoformat() not in self.completed]
+        print(f"{self.analysis_type.capitalize()} backfill: {len(periods)} periods, "
+              f"{len(periods) - len(pending)} already done, {len(pending)} to run")
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(self.run_period, start, date): date for start, date in pending}
+            for future in as_completed(futures):
+                date = futures[future]
+                try:
+                    analysis = future.result()
+                except Exception as e:
+                    print(f"  {date:%Y-%m-%d}: failed ({e})")
+                    continue
+                print(f"  {date:%Y-%m-%d}: {'done' if analysis else 'failed'}")
+
+        keys = [date.date().isoformat() for _, date in periods]
+        return {key: self.completed[key] for key in keys if key in self.completed}
+
+def format_backfill(results: Dict[str, str], analysis_type: str,
+                    periods: Optional[List[Tuple[datetime, datetime]]] = None) -> str:
+    """
+    Join backfilled analyses into one document, newest period first.
+
+    Args:
+        results: The results of Backfill.run.
+        analysis_type: "weekly" or "monthly".
+        periods: The periods from periods_since; partial ones are labeled
+            with their days when given.
+
+    Returns:
+        The combined text.
+    """
+    starts = {end.date().isoformat(): start for start, end in periods or []}
+    sections = []
+    for key in sorted(results, reverse=True):
+        end = datetime.strptime(key, '%Y-%m-%d')
+        period = "Week" if analysis_type == "weekly" else "Month"
+        heading = f"{period} ending {end:%B %d, %Y}"
+        start = starts.get(key)
+        if start is not None and is_partial(start, end, analysis_type):
+            heading = f"Partial {period.lower()}, {start:%B %d} to {end:%B %d, %Y}"
+        sections.append(f"{heading}\n{results[key].strip()}")
+    return "\n\n".join(sections)
+
+def main(since, until=None, analysis_type="both", concurrency=4, output_file=None, write_to_doc=False):
+    """
+    Main function to backfill analyses for past periods.
+
+    Args:
+        since: The first day to cover, as "YYYY-MM-DD".
+        until: The last day to cover, as "YYYY-MM-DD"; today if None.
+        analysis_type: "weekly", "monthly" or "both".
+        concurrency: The maximum number of Gemini requests in flight.
+        output_file: Write the combined results to this file.
+        write_to_doc: Write the combined results to the Google Doc in one
+            update, with one section per analysis type.
+    """
+    print("Productivity and Mood Tracker - Backfill")
+    print("========================================")
+
+    document_id = os.environ.get("GOOGLE_DOC_ID")
+    if not document_id:
+        print("Error: GOOGLE_DOC_ID environment variable is not set.")
+        return
+
+    if analysis_type not in ("weekly", "monthly", "both"):
+        print("Error: Backfill supports weekly and monthly analyses only.")
+        return
+
+    try:
+        since_date = datetime.strptime(since, '%Y-%m-%d')
+        until_date = datetime.strptime(until, '%Y-%m-%d') if until else datetime.now()
+    except ValueError:
+        print("Error: --since and --until must be dates in YYYY-MM-DD format.")
+        return
+
+    service = authenticate_google_docs_api()
+    if not service:
+        print("Failed to authenticate with Google Docs API.")
+        return
+
+    doc_content = read_google_doc(document_id, service)
+    if not doc_content:
+        print("Failed to read the Google Doc.")
+        return
+
+    # Parse once into an in-memory store; every period job then reads its window from the store
+    parser = ProductivityDataParser(cache_dir=get_cache_dir(document_id), store=HistoryStore(":memory:"), user=document_id)
+    parser.refresh_snapshot(doc_content)
+
+    analysis_types = ["weekly", "monthly"] if analysis_type == "both" else [analysis_type]
+    sections = []
+    # Every period of a type shares its instructions and the history before the range as one
+    # prompt prefix, registered once for the whole batch
+    router = get_model_router()
+    with router.context_caching() as prompt_cache:
+        background = shared_background(parser, since_date, router, prompt_cache.min_tokens)
+        for current_type in analysis_types:
+            backfill = Backfill(parser, None, current_type, concurrency=concurrency, background=background)
+            results = backfill.run(since_date, until_date)
+            if not results:
+                print(f"No {current_type} analyses were generated.")
+                continue
+            periods = periods_since(since_date, until_date, current_type)
+            sections.append((f"{current_type.capitalize()} Analysis (Backfill)", format_backfill(results, current_type, periods)))
+    print(format_cache_stats(prompt_cache.stats()))
+
+    # One batchUpdate for every analysis type, so the document gets a single revision
+    if write_to_doc and sections:
+        write_sections_to_doc(document_id, sections, service, description=f"{' and '.join(analysis_types)} backfill")
+
+    documents = [f"{title}\n\n{text}" for title, text in sections]
+
+    if output_file and documents:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write("\n\n".join(documents) + "\n")
+        print(f"Backfill written to {output_file}")
+    elif documents and not write_to_doc:
+        print("\n\n".join(documents))
@@ -0,0 +1,384 @@
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from stats import build_daily_series
+
+COHORT_METRICS = ('mood', 'focus')
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+
+def build_cohort(series_by_user: Dict[str, Dict]) -> Dict:
+    """
+    Stack per-user daily series into date-aligned user x day matrices.
+
+    The date axis starts on the Monday on or before the earliest logged day
+    and ends on the Sunday on or after the latest, so the matrices reshape
+    into whole Monday-to-Sunday weeks without copying. Days a user did not
+    log are NaN. Ratings are stored as float32, which holds the 0-10 scale
+    exactly and halves the memory of thousands of users x years.
+
+    Args:
+        series_by_user: Each user's daily series (see stats.build_daily_series).
+
+    Returns:
+        A dictionary with the users, the datetime64[D] dates, a user x day
+        matrix per metric in COHORT_METRICS and a boolean logged matrix.
+    """
+    users = [user for user, series in series_by_user.items() if len(series['dates'])]
+    if not users:
+        matrices = {metric: np.empty((0, 0), dtype=np.float32) for metric in COHORT_METRICS}
+        return {'users': [], 'dates': np.array([], dtype='datetime64[D]'),
+                'logged': np.empty((0, 0), dtype=bool), **matrices}
+
+    firsts = np.array([series_by_user[user]['dates'][0] for user in users], dtype='datetime64[D]')
+    lasts = np.array([series_by_user[user]['dates'][-1] for user in users], dtype='datetime64[D]')
+    # 1970-01-01 was a Thursday, so shift by 3 to make Monday == 0
+    first_day = firsts.min().astype(int)
+    start = first_day - (first_day + 3) % 7
+    length = int(lasts.max().astype(int)) - start + 1
+    length += -length % 7
+
+    cohort = {
+        'users': users,
+        'dates': np.datetime64(int(start), 'D') + np.arange(length),
+        'logged': np.zeros((len(users), length), dtype=bool),
+    }
+    for metric in COHORT_METRICS:
+        cohort[metric] = np.full((len(users), length), np.nan, dtype=np.float32)
+
+    # One contiguous slice assignment per user and matrix
+    offsets = firsts.astype(int) - start
+    for row, (user, offset) in enumerate(zip(users, offsets)):
+        series = series_by_user[user]
+        span = slice(offset, offset + len(series['dates']))
+        cohort['logged'][row, span] = series['logged']
+        for metric in COHORT_METRICS:
+            cohort[metric][row, span] = series[metric]
+
+    return cohort
+
+def cohort_from_logs(logs_by_user: Dict[str, object]) -> Dict:
+    """
+    Build a cohort from each user's daily logs.
+
+    Args:
+        logs_by_user: Each user's parsed daily logs, or the daily_logs array
+            of their log archive.
+
+    Returns:
+        The cohort (see build_cohort).
+    """
+    return build_cohort({user: build_daily_series(logs) for user, logs in logs_by_user.items()})
+
+def _weekly(matrix: np.ndarray) -> np.ndarray:
+    """View a user x day matrix as user x week x 7 days."""
+    return matrix.reshape(matrix.shape[0], -1, 7)
+
+def _masked_mean(values: np.ndarray, axis: int) -> np.ndarray:
+    """Mean over an axis ignoring NaN, NaN where nothing is present (without all-NaN warnings)."""
+    present = ~np.isnan(values)
+    sums = np.where(present, values, 0).sum(axis=axis, dtype=np.float64)
+    counts = present.sum(axis=axis)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+def weekly_user_means(cohort: Dict, metric: str) -> np.ndarray:
+    """
+    Compute every user's mean rating for every week.
+
+    Args:
+        cohort: The cohort (see build_cohort).
+        metric: One of COHORT_METRICS.
+
+    Returns:
+        A user x week matrix; NaN for weeks a user did not rate.
+    """
+    return _masked_mean(_weekly(cohort[metric]), axis=2)
+
+def column_percentiles(matrix: np.ndarray, percentiles: Sequence[float]) -> np.ndarray:
+    """
+    Compute percentiles down every column of a matrix, ignoring NaN.
+
+    Equivalent to np.nanpercentile(matrix, percentiles, axis=0) with linear
+    interpolation, but done with one sort and a gather instead of a
+    per-column loop.
+
+    Args:
+        matrix: A 2-D array; NaN entries are ignored.
+        percentiles: The percentiles to compute, in 0-100.
+
+    Returns:
+        A percentile x column array; NaN for columns without values.
+    """
+    ordered = np.sort(matrix, axis=0)  # NaN sorts last
+    counts = (~np.isnan(matrix)).sum(axis=0)
+    positions = np.asarray(percentiles, dtype=np.float64)[:, None] / 100 * np.maximum(counts - 1, 0)
+    lower = np.floor(positions).astype(int)
+    upper = np.minimum(lower + 1, np.maximum(counts - 1, 0))
+    below = np.take_along_axis(ordered, lower, axis=0).astype(np.float64)
+    above = np.take_along_axis(ordered, upper, axis=0).astype(np.float64)
+    values = below + (above - below) * (positions - lower)
+    return np.where(counts > 0, values, np.nan)
+
+def weekly_percentiles(cohort: Dict, metric: str, percentiles: Sequence[float] = DEFAULT_PERCENTILES) -> Dict:
+    """
+    Compute percentiles of the users' weekly means for every week.
+
+    Args:
+        cohort: The cohort (see build_cohort).
+        metric: One of COHORT_METRICS.
+        percentiles: The percentiles to compute, in 0-100.
+
+    Returns:
+        A dictionary with the week start dates, the percentiles and a
+        percentile x week matrix (NaN for weeks nobody rated).
+    """
+    week_starts = cohort['dates'][::7]
+    means = weekly_user_means(cohort, metric)
+    values = column_percentiles(means, percentiles) if means.size else np.empty((len(percentiles), 0))
+    return {'week_starts': week_starts, 'percentiles': list(percentiles), 'values': values}
+
+def participation(cohort: Dict) -> Dict:
+    """
+    Compute how many users take part in logging, per week.
+
+    A user counts as enrolled in a week from their first logged day to their
+    last, so people who joined late or left are not counted as absent.
+
+    Args:
+        cohort: The cohort (see build_cohort).
+
+    Returns:
+        A dictionary with the week start dates, the number of enrolled users,
+        the fraction of enrolled users who logged at least once, and the
+        fraction of enrolled user-days that were logged.
+    """
+    logged = cohort['logged']
+    week_starts = cohort['dates'][::7]
+    if not logged.size:
+        empty = np.array([], dtype=float)
+        return {'week_starts': week_starts, 'enrolled': np.array([], dtype=int), 'active_rate': empty, 'day_rate': empty}
+
+    # Enrollment runs from each user's first to last logged day
+    length = logged.shape[1]
+    has_logs = logged.any(axis=1)
+    first = logged.argmax(axis=1)[has_logs]
+    last = (length - 1 - logged[:, ::-1].argmax(axis=1))[has_logs]
+
+    # Enrolled users per day and per week as prefix sums of +1/-1 markers, without a user x day mask
+    enrolled_days = np.cumsum(np.bincount(first, minlength=length + 1)
+                              - np.bincount(last + 1, minlength=length + 1))[:length]
+    n_weeks = length // 7
+    enrolled_count = np.cumsum(np.bincount(first // 7, minlength=n_weeks + 1)
+                               - np.bincount(last // 7 + 1, minlength=n_weeks + 1))[:n_weeks]
+
+    weekly_logged = _weekly(logged)
+    active_count = weekly_logged.any(axis=2).sum(axis=0)
+    logged_days = weekly_logged.sum(axis=(0, 2))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        active_rate = np.where(enrolled_count > 0, active_count / enrolled_count, np.nan)
+        enrolled_week_days = enrolled_days.reshape(-1, 7).sum(axis=1)
+        day_rate = np.where(enrolled_week_days > 0, logged_days / enrolled_week_days, np.nan)
+
+    return {'week_starts': week_starts, 'enrolled': enrolled_count, 'active_rate': active_rate, 'day_rate': day_rate}
+
+def standings(cohort: Dict, metric: str, window: int = 28) -> Dict:
+    """
+    Compare every user's recent mean rating with the team baseline.
+
+    The baseline is the mean and standard deviation of the users' means over
+    the last `window` days of the cohort, so every person weighs the same
+    however often they log.
+
+    Args:
+        cohort: The cohort (see build_cohort).
+        metric: One of COHORT_METRICS.
+        window: The number of trailing days compared.
+
+    Returns:
+        A dictionary with the team mean and standard deviation, and per-user
+        arrays (in cohort order) of the recent mean, the z-score against the
+        team, and the percentile rank (0-100); NaN for users who did not rate
+        anything in the window.
+    """
+    recent = cohort[metric][:, -window:]
+    user_means = _masked_mean(recent, axis=1)
+    rated = ~np.isnan(user_means)
+
+    team_mean = float(user_means[rated].mean()) if rated.any() else float('nan')
+    team_std = float(user_means[rated].std()) if rated.sum() > 1 else float('nan')
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z_scores = (user_means - team_mean) / team_std if team_std > 0 else np.full(len(user_means), np.nan)
+
+    # Percentile rank among the rated users, ties sharing their average rank
+    ranks = np.full(len(user_means), np.nan)
+    if rated.any():
+        values = user_means[rated]
+        below = np.searchsorted(np.sort(values), values, side='left')
+        not_above = np.searchsorted(np.sort(values), values, side='right')
+        ranks[rated] = 100.0 * (below + not_above) / (2 * len(values))
+
+    return {'team_mean': team_mean, 'team_std': team_std, 'mean': user_means, 'z_score': z_scores, 'rank': ranks}
+
+def _rounded(value) -> Optional[float]:
+    """Round a number for display, mapping NaN to None."""
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), 2)
+
+def summarize_cohort(cohort: Dict, window: int = 28, weeks: int = 4) -> Dict:
+    """
+    Summarize a cohort for prompts and reports.
+
+    Args:
+        cohort: The cohort (see build_cohort).
+        window: The trailing days used for each user's standing.
+        weeks: The number of most recent weeks of percentiles and
+            participation to include.
+
+    Returns:
+        A JSON-serializable dictionary.
+    """
+    users = cohort['users']
+    summary = {
+        'users': len(users),
+        'first_date': str(cohort['dates'][0]) if len(cohort['dates']) else None,
+        'last_date': str(cohort['dates'][-1]) if len(cohort['dates']) else None,
+        'weeks': [],
+        'standings': {},
+    }
+    if not users:
+        return summary
+
+    rates = participation(cohort)
+    distributions = {metric: weekly_percentiles(cohort, metric) for metric in COHORT_METRICS}
+    for week in range(max(0, len(rates['week_starts']) - weeks), len(rates['week_starts'])):
+        entry = {
+            'week_start': str(rates['week_starts'][week]),
+            'enrolled': int(rates['enrolled'][week]),
+            'active_rate': _rounded(rates['active_rate'][week]),
+            'day_rate': _rounded(rates['day_rate'][week]),
+        }
+        for metric, distribution in distributions.items():
+            entry[metric] = {f"p{p:g}": _rounded(value)
+                             for p, value in zip(distribution['percentiles'], distribution['values'][:, week])}
+        summary['weeks'].append(entry)
+
+    for metric in COHORT_METRICS:
+        standing = standings(cohort, metric, window)
+        summary['standings'][metric] = {
+            'team_mean': _rounded(standing['team_mean']),
+            'team_std': _rounded(standing['team_std']),
+            'users': {
+                user: {'mean': _rounded(standing['mean'][i]), 'z_score': _rounded(standing['z_score'][i]),
+                       'rank': _rounded(standing['rank'][i])}
+                for i, user in enumerate(users)
+            },
+        }
+    return summary
+
+def format_cohort_summary(summary: Dict, max_users: int = 10) -> str:
+    """
+    Format a cohort summary as a compact text block for a prompt.
+
+    Args:
+        summary: The summary returned by summarize_cohort.
+        max_users: The most users listed at each end of the standings.
+
+    Returns:
+        A short, line-oriented summary.
+    """
+    if not summary.get('users'):
+        return ""
+
+    def show(value):
+        return 'n/a' if value is None else f"{value:g}"
+
+    def percent(value):
+        return 'n/a' if value is None else f"{value:.0%}"
+
+    lines = [f"Team of {summary['users']} ({summary['first_date']} to {summary['last_date']}):"]
+    for week in summary['weeks']:
+        lines.append(
+            f"- Week of {week['week_start']}: {percent(week['active_rate'])} of {week['enrolled']} people logged, "
+            f"{percent(week['day_rate'])} of days; "
+            + "; ".join(f"{metric} " + " ".join(f"{name} {show(value)}" for name, value in week[metric].items())
+                        for metric in COHORT_METRICS)
+        )
+
+    for metric, standing in summary['standings'].items():
+        ranked = sorted(((values['z_score'], user) for user, values in standing['users'].items()
+                         if values['z_score'] is not None), reverse=True)
+        lines.append(f"- {metric.capitalize()} baseline: mean {show(standing['team_mean'])}, sd {show(standing['team_std'])}")
+        if ranked:
+            shown = ranked if len(ranked) <= 2 * max_users else ranked[:max_users] + ranked[-max_users:]
+            lines.append("  z-scores: " + ", ".join(f"{user} {show(z)}" for z, user in shown))
+
+    return "\n".join(lines) + "\n"
+
+def load_cohort_logs(documents: List[Tuple[str, str]], from_history: bool = False) -> Dict[str, List[Dict]]:
+    """
+    Read and parse the daily logs of every document in a batch.
+
+    Args:
+        documents: A list of (name, doc_id) tuples.
+        from_history: Read the logs from the history store at HISTORY_DB
+            instead of fetching the documents.
+
+    Returns:
+        Each readable user's daily logs, by name.
+    """
+    from data_parser import ProductivityDataParser
+    from history_store import store_from_env
+    from productivity_tracker import authenticate_google_docs_api, read_google_doc
+
+    logs_by_user = {}
+    if from_history:
+        store = store_from_env()
+        if store is None:
+            raise ValueError("Reading from the history store requires HISTORY_DB (--history-db).")
+        for name, doc_id in documents:
+            logs_by_user[name] = store.daily_logs(doc_id)
+        return logs_by_user
+
+    parser = ProductivityDataParser()
+    service = authenticate_google_docs_api()
+    for name, doc_id in documents:
+        doc_content = read_google_doc(doc_id, service)
+        if not doc_content:
+            print(f"Failed to read the Google Doc for {name}, skipping.")
+            continue
+        logs_by_user[name] = parser.parse_daily_logs(doc_content)
+    return logs_by_user
+
+def main(batch_file: str, output_dir: Optional[str] = None, from_history: bool = False, window: int = 28):
+    """
+    Print the cohort summary of every document in a batch file.
+
+    Args:
+        batch_file: A batch file of "name,doc_id" lines (see dashboard.read_batch_file).
+        output_dir: If given, also render the cohort chart to this directory.
+        from_history: Read the logs from the history store instead of the documents.
+        window: The trailing days used for each user's standing.
+    """
+    from dashboard import read_batch_file
+
+    print("Team Cohort Summary")
+    print("===================")
+    cohort = cohort_from_logs(load_cohort_logs(read_batch_file(batch_file), from_history))
+    if not cohort['users']:
+        print("No logs found for any document in the batch.")
+        return
+
+    print(format_cohort_summary(summarize_cohort(cohort, window)))
+
+    if output_dir:
+        import matplotlib.pyplot as plt
+        from dashboard import create_cohort_chart
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, "cohort.png")
+        fig = create_cohort_chart(cohort)
+        fig.savefig(path)
+        plt.close(fig)
+        print(f"Saved {path}")
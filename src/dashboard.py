@@ -1,56 +1,145 @@
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
-from datetime import datetime
+from datetime import datetime, timedelta
 import numpy as np
 from dotenv import load_dotenv
 from data_parser import ProductivityDataParser
-from productivity_tracker import read_google_doc
+from stats import DAY_NAMES, build_daily_series, day_of_week_profile, parse_log_date, rolling_mean
+from anomalies import detect_anomalies
+from interval_index import DailyLogIndex, build_review_index, logs_for_review
+from downsample import bucket_period, bucket_sums, downsample_series
+from figure_cache import FigureCache, chart_inputs, chart_key
+from productivity_tracker import authenticate_google_docs_api, fetch_document_text, read_google_doc
+from metrics import RunMetrics, metrics_from_env
+from log_archive import LogArchive
+from cohort import participation, weekly_percentiles
+from history_store import StoredHistory, store_from_env
+from metric_schema import load_metric_schema
 
 # Load environment variables from .env file
 load_dotenv()
 
-def create_mood_focus_chart(daily_logs):
+# Above these sizes charts switch to aggregated or downsampled rendering
+MAX_LINE_POINTS = 400
+MAX_MARKER_POINTS = 60
+MAX_ANNOTATION_LABELS = 20
+MAX_WEEK_LABELS = 26
+MAX_WEEK_BARS = 104
+
+def format_date_axis(ax):
+    """
+    Give a date axis an adaptive locator and a concise formatter.
+    
+    Tick density then depends on the axis width, not on the number of days.
+    
+    Args:
+        ax: The matplotlib axis with dates on the x-axis.
+    """
+    locator = mdates.AutoDateLocator(minticks=4, maxticks=12)
+    ax.xaxis.set_major_locator(locator)
+    ax.xaxis.set_major_formatter(mdates.ConciseDateFormatter(locator))
+
+def annotate_anomalies(ax, findings):
+    """
+    Annotate detected streaks and anomalies on a mood/focus axis.
+    
+    Each kind of finding is drawn as a single artist, so the cost stays
+    flat as the number of findings grows; focus drops only get text labels
+    when there are few of them.
+    
+    Args:
+        ax: The matplotlib axis holding the mood/focus lines.
+        findings: The findings returned by anomalies.detect_anomalies.
+    """
+    streaks = []
+    gaps = []
+    drop_dates = []
+    drop_values = []
+    drop_labels = []
+    
+    for finding in findings:
+        if finding['type'] in ('low_mood_streak', 'logging_gap'):
+            start = mdates.date2num(parse_log_date(finding['start']))
+            end = mdates.date2num(parse_log_date(finding['end']) + timedelta(days=1))
+            (streaks if finding['type'] == 'low_mood_streak' else gaps).append((start, end - start))
+        elif finding['type'] == 'focus_drop':
+            drop_dates.append(parse_log_date(finding['date']))
+            drop_values.append(finding['focus'])
+            drop_labels.append(f"-{finding['sigmas']:g}σ")
+    
+    if streaks:
+        ax.broken_barh(streaks, (0, 10), color='orange', alpha=0.2, label='Low mood streak')
+    if gaps:
+        ax.broken_barh(gaps, (0, 10), facecolor='none', edgecolor='gray', hatch='//', alpha=0.5, label='Logging gap')
+    if drop_dates:
+        ax.plot(drop_dates, drop_values, 'v', color='red', markersize=10, label='Focus drop')
+        if len(drop_dates) <= MAX_ANNOTATION_LABELS:
+            for date, value, label in zip(drop_dates, drop_values, drop_labels):
+                ax.annotate(label, (date, value), textcoords='offset points', xytext=(0, -15),
+                            ha='center', color='red', fontsize=8)
+
+def create_mood_focus_chart(daily_logs, findings=None):
     """
     Create a chart showing mood and focus over time.
     
+    Long histories are downsampled with LTTB to at most MAX_LINE_POINTS
+    points per line, which keeps peaks and dips visible.
+    
     Args:
-        daily_logs: A list of dictionaries, each representing a daily log.
+        daily_logs: A list of dictionaries, each representing a daily log,
+            or an archive's daily_logs structured array sorted by date.
+        findings: Streak and anomaly findings to annotate. Detected from
+            the logs when not given.
         
     Returns:
         The figure object.
     """
     # Extract dates, moods, and focuses
-    dates = []
-    moods = []
-    focuses = []
-    
-    for log in daily_logs:
-        if 'date' in log and 'mood' in log and 'focus' in log:
-            try:
-                date = datetime.strptime(log['date'], '%B %d, %Y')
-                dates.append(date)
-                moods.append(log['mood'])
-                focuses.append(log['focus'])
-            except ValueError:
-                # Skip logs with invalid dates
-                continue
+    if isinstance(daily_logs, np.ndarray):
+        # Archive rows are read in place; rows missing a rating are skipped as below
+        rated = daily_logs[~np.isnat(daily_logs['date']) & ~np.isnan(daily_logs['mood']) & ~np.isnan(daily_logs['focus'])]
+        day_dates = rated['date']
+        moods = rated['mood']
+        focuses = rated['focus']
+    else:
+        dates = []
+        moods = []
+        focuses = []
+        
+        for log in daily_logs:
+            if 'date' in log and 'mood' in log and 'focus' in log:
+                try:
+                    date = datetime.strptime(log['date'], '%B %d, %Y')
+                    dates.append(date)
+                    moods.append(log['mood'])
+                    focuses.append(log['focus'])
+                except ValueError:
+                    # Skip logs with invalid dates
+                    continue
+        day_dates = np.array(dates, dtype='datetime64[D]')
     
     # Create the figure and axis
     fig, ax = plt.subplots(figsize=(12, 6))
     
-    # Plot mood and focus
-    ax.plot(dates, moods, 'o-', color='blue', label='Mood')
-    ax.plot(dates, focuses, 'o-', color='green', label='Focus')
+    # Plot mood and focus, downsampled for long histories
+    style = 'o-' if len(day_dates) <= MAX_MARKER_POINTS else '-'
+    for values, color, label in ((moods, 'blue', 'Mood'), (focuses, 'green', 'Focus')):
+        line_dates, line_values = downsample_series(day_dates, np.array(values, dtype=float), MAX_LINE_POINTS)
+        ax.plot(line_dates.astype(datetime), line_values, style, color=color, label=label)
+    
+    # Annotate low-mood streaks, focus drops and logging gaps
+    if findings is None:
+        findings = detect_anomalies(daily_logs)
+    annotate_anomalies(ax, findings)
     
     # Set the y-axis limits
     ax.set_ylim(0, 10)
     
     # Format the x-axis
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%b %d'))
-    ax.xaxis.set_major_locator(mdates.DayLocator(interval=1))
-    plt.xticks(rotation=45)
+    format_date_axis(ax)
     
     # Add labels and title
     ax.set_xlabel('Date')
@@ -72,58 +161,77 @@ def create_achievements_challenges_chart(daily_logs):
     """
     Create a chart showing the number of achievements and challenges over time.
     
+    Histories longer than a quarter are summed into weekly bars, and longer
+    than two years into monthly bars, so the number of bars stays bounded.
+    
     Args:
-        daily_logs: A list of dictionaries, each representing a daily log.
+        daily_logs: A list of dictionaries, each representing a daily log,
+            or an archive's daily_logs structured array sorted by date.
         
     Returns:
         The figure object.
     """
     # Extract dates, achievements, and challenges
-    dates = []
-    num_achievements = []
-    num_challenges = []
-    
-    for log in daily_logs:
-        if 'date' in log:
-            try:
-                date = datetime.strptime(log['date'], '%B %d, %Y')
-                dates.append(date)
-                
-                # Count achievements
-                if 'achievements' in log:
-                    num_achievements.append(len(log['achievements']))
-                else:
-                    num_achievements.append(0)
-                
-                # Count challenges
-                if 'challenges' in log:
-                    num_challenges.append(len(log['challenges']))
-                else:
-                    num_challenges.append(0)
-            except ValueError:
-                # Skip logs with invalid dates
-                continue
+    if isinstance(daily_logs, np.ndarray):
+        # The archive stores the list lengths, so no item text is read
+        dated = daily_logs[~np.isnat(daily_logs['date'])]
+        day_dates = dated['date']
+        num_achievements = dated['achievements']
+        num_challenges = dated['challenges']
+    else:
+        dates = []
+        num_achievements = []
+        num_challenges = []
+        
+        for log in daily_logs:
+            if 'date' in log:
+                try:
+                    date = datetime.strptime(log['date'], '%B %d, %Y')
+                    dates.append(date)
+                    
+                    # Count achievements
+                    if 'achievements' in log:
+                        num_achievements.append(len(log['achievements']))
+                    else:
+                        num_achievements.append(0)
+                    
+                    # Count challenges
+                    if 'challenges' in log:
+                        num_challenges.append(len(log['challenges']))
+                    else:
+                        num_challenges.append(0)
+                except ValueError:
+                    # Skip logs with invalid dates
+                    continue
+        day_dates = np.array(dates, dtype='datetime64[D]')
+    
+    # Choose the bucket size from the span of the history
+    span = int((day_dates.max() - day_dates.min()).astype(int)) + 1 if len(day_dates) else 0
+    period = bucket_period(span)
+    bucket_dates, achievement_sums = bucket_sums(day_dates, num_achievements, period)
+    _, challenge_sums = bucket_sums(day_dates, num_challenges, period)
     
     # Create the figure and axis
     fig, ax = plt.subplots(figsize=(12, 6))
     
-    # Set the width of the bars
-    width = 0.35
+    # Set the width of the bars (in days) from the bucket size
+    bucket_days = {'D': 1, 'W': 7, 'M': 30}[period]
+    width = 0.35 * bucket_days
     
-    # Set the positions of the bars on the x-axis
-    x = np.arange(len(dates))
+    # Bars are placed on a date axis, centred in their bucket
+    x = mdates.date2num(bucket_dates.astype(datetime)) + (bucket_days - 1) / 2
     
     # Create the bars
-    ax.bar(x - width/2, num_achievements, width, label='Achievements', color='blue')
-    ax.bar(x + width/2, num_challenges, width, label='Challenges', color='red')
+    ax.bar(x - width/2, achievement_sums, width, label='Achievements', color='blue')
+    ax.bar(x + width/2, challenge_sums, width, label='Challenges', color='red')
     
     # Format the x-axis
-    ax.set_xticks(x)
-    ax.set_xticklabels([date.strftime('%b %d') for date in dates], rotation=45)
+    ax.xaxis_date()
+    format_date_axis(ax)
     
     # Add labels and title
-    ax.set_xlabel('Date')
-    ax.set_ylabel('Count')
+    ax.set_xlabel({'D': 'Date', 'W': 'Week', 'M': 'Month'}[period])
+    ax.set_ylabel('Count' if period == 'D' else f"Count per {'week' if period == 'W' else 'month'}")
     ax.set_title('Achievements and Challenges Over Time')
     
     # Add a legend
@@ -137,26 +245,40 @@ def create_achievements_challenges_chart(daily_logs):
     
     return fig
 
-def create_weekly_overview_chart(weekly_reviews):
+def create_weekly_overview_chart(weekly_reviews, daily_logs=None):
     """
     Create a chart showing overall mood and productivity from weekly reviews.
     
     Args:
         weekly_reviews: A list of dictionaries, each representing a weekly review.
+        daily_logs: Optional daily logs, or an archive's daily_logs structured
+            array sorted by date; when given, the average daily mood of each
+            review's week is overlaid on its bars.
         
     Returns:
         The figure object.
     """
+    # Order the reviews chronologically by their week interval; unparseable weeks keep document order
+    review_index = build_review_index(weekly_reviews)
+    indexed_ids = {id(review) for review in review_index.items()}
+    ordered_reviews = review_index.items() + [review for review in weekly_reviews if id(review) not in indexed_ids]
+    day_index = DailyLogIndex(daily_logs) if daily_logs is not None and len(daily_logs) else None
+    
     # Extract weeks, overall moods, and overall productivities
     weeks = []
     overall_moods = []
     overall_productivities = []
+    daily_moods = []
     
-    for review in weekly_reviews:
+    for review in ordered_reviews:
         if 'week' in review and 'overall_mood' in review and 'overall_productivity' in review:
             weeks.append(review['week'])
             overall_moods.append(review['overall_mood'])
             overall_productivities.append(review['overall_productivity'])
+            
+            # Average the daily moods logged during the review's week
+            week_moods = [log['mood'] for log in logs_for_review(review, day_index) if 'mood' in log] if day_index else []
+            daily_moods.append(sum(week_moods) / len(week_moods) if week_moods else np.nan)
     
     # Create the figure and axis
     fig, ax = plt.subplots(figsize=(12, 6))
@@ -167,13 +289,22 @@ def create_weekly_overview_chart(weekly_reviews):
     # Set the positions of the bars on the x-axis
     x = np.arange(len(weeks))
     
-    # Create the bars
-    ax.bar(x - width/2, overall_moods, width, label='Overall Mood', color='blue')
-    ax.bar(x + width/2, overall_productivities, width, label='Overall Productivity', color='green')
+    # Create the bars; beyond MAX_WEEK_BARS weeks, one line per series is drawn instead
+    if len(weeks) <= MAX_WEEK_BARS:
+        ax.bar(x - width/2, overall_moods, width, label='Overall Mood', color='blue')
+        ax.bar(x + width/2, overall_productivities, width, label='Overall Productivity', color='green')
+    else:
+        ax.plot(x, overall_moods, '-', color='blue', label='Overall Mood')
+        ax.plot(x, overall_productivities, '-', color='green', label='Overall Productivity')
     
-    # Format the x-axis
-    ax.set_xticks(x)
-    ax.set_xticklabels(weeks, rotation=45)
+    # Overlay the daily mood average of each week
+    if day_index and not np.all(np.isnan(daily_moods)):
+        ax.plot(x, daily_moods, 'D' if len(weeks) <= MAX_WEEK_BARS else ':', color='orange', label='Avg Daily Mood')
+    
+    # Format the x-axis, labelling at most MAX_WEEK_LABELS weeks
+    step = max(1, -(-len(weeks) // MAX_WEEK_LABELS))
+    ax.set_xticks(x[::step])
+    ax.set_xticklabels(weeks[::step], rotation=45)
     
     # Set the y-axis limits
     ax.set_ylim(0, 10)
@@ -194,16 +325,167 @@ def create_weekly_overview_chart(weekly_reviews):
     
     return fig
 
-def create_dashboard(doc_content):
+def create_trends_chart(daily_logs):
     """
-    Create a dashboard with multiple charts.
+    Create a chart showing rolling mood/focus trends and day-of-week profiles.
     
     Args:
-        doc_content: The content of the Google Doc.
+        daily_logs: A list of dictionaries, each representing a daily log,
+            or an archive's daily_logs structured array.
         
     Returns:
-        None
+        The figure object.
     """
+    # Build the calendar-aligned daily series
+    series = build_daily_series(daily_logs)
+    
+    # Create the figure with a trend axis and a weekday profile axis
+    fig, (trend_ax, profile_ax) = plt.subplots(1, 2, figsize=(14, 6), gridspec_kw={'width_ratios': [3, 1]})
+    
+    # Plot the rolling means, downsampled for long histories
+    for metric, color in (('mood', 'blue'), ('focus', 'green')):
+        for window, style, alpha in ((7, '-', 1.0), (28, '--', 0.6)):
+            line_dates, line_values = downsample_series(series['dates'], rolling_mean(series[metric], window), MAX_LINE_POINTS)
+            trend_ax.plot(line_dates.astype(datetime), line_values, style, color=color, alpha=alpha,
+                          label=f'{metric.capitalize()} ({window}-day)')
+    
+    trend_ax.set_ylim(0, 10)
+    format_date_axis(trend_ax)
+    trend_ax.set_xlabel('Date')
+    trend_ax.set_ylabel('Rating (0-10)')
+    trend_ax.set_title('Rolling Mood and Focus')
+    trend_ax.legend()
+    trend_ax.grid(True, linestyle='--', alpha=0.7)
+    
+    # Plot the day-of-week profiles
+    width = 0.35
+    x = np.arange(len(DAY_NAMES))
+    profile_ax.bar(x - width/2, day_of_week_profile(series['dates'], series['mood']), width, label='Mood', color='blue')
+    profile_ax.bar(x + width/2, day_of_week_profile(series['dates'], series['focus']), width, label='Focus', color='green')
+    profile_ax.set_xticks(x)
+    profile_ax.set_xticklabels([day[:3] for day in DAY_NAMES])
+    profile_ax.set_ylim(0, 10)
+    profile_ax.set_title('By Day of Week')
+    profile_ax.grid(True, linestyle='--', alpha=0.7, axis='y')
+    
+    # Adjust layout
+    fig.autofmt_xdate()
+    plt.tight_layout()
+    
+    return fig
+
+def create_metrics_chart(daily_logs, schema=None):
+    """
+    Create small multiples of every configured metric's daily values and 7-day rolling mean.
+    
+    Args:
+        daily_logs: A list of dictionaries, each representing a daily log,
+            or an archive's daily_logs structured array.
+        schema: The MetricSchema to chart; the configured schema if None.
+        
+    Returns:
+        The figure object.
+    """
+    schema = schema or load_metric_schema()
+    series = build_daily_series(daily_logs, schema.names)
+    
+    # One row per metric, sharing the date axis
+    fig, axes = plt.subplots(len(schema.metrics), 1, figsize=(12, 2.5 * len(schema.metrics) + 1), sharex=True, squeeze=False)
+    
+    for ax, metric in zip(axes[:, 0], schema.metrics):
+        values = series[metric.name]
+        for line, style, alpha, label in ((values, '.', 0.3, 'Daily'), (rolling_mean(values, 7), '-', 1.0, '7-day mean')):
+            line_dates, line_values = downsample_series(series['dates'], line, MAX_LINE_POINTS)
+            ax.plot(line_dates.astype(datetime), line_values, style, color='purple', alpha=alpha, label=label)
+        
+        # Rated metrics use their full scale; unscaled ones start at zero
+        if metric.scale is not None:
+            ax.set_ylim(0, metric.scale)
+            ax.set_ylabel(f'{metric.label} (0-{metric.scale:g})')
+        else:
+            ax.set_ylim(bottom=0)
+            ax.set_ylabel(f'{metric.label} ({metric.unit})' if metric.unit else metric.label)
+        if np.isnan(values).all():
+            ax.text(0.5, 0.5, 'Not logged yet', transform=ax.transAxes, ha='center', va='center', color='gray')
+        ax.grid(True, linestyle='--', alpha=0.7)
+    
+    axes[0, 0].set_title('Tracked Metrics')
+    axes[0, 0].legend(loc='upper left')
+    format_date_axis(axes[-1, 0])
+    axes[-1, 0].set_xlabel('Date')
+    
+    # Adjust layout
+    fig.autofmt_xdate()
+    plt.tight_layout()
+    
+    return fig
+
+def create_cohort_chart(cohort):
+    """
+    Create a team chart of weekly mood/focus percentile bands and participation.
+    
+    Args:
+        cohort: A cohort built by cohort.build_cohort.
+        
+    Returns:
+        The figure object.
+    """
+    fig, (mood_ax, focus_ax, participation_ax) = plt.subplots(3, 1, figsize=(12, 10), sharex=True)
+    
+    # Shade the 10-90 and 25-75 percentile bands around the median
+    for ax, metric, color in ((mood_ax, 'mood', 'blue'), (focus_ax, 'focus', 'green')):
+        distribution = weekly_percentiles(cohort, metric, (10, 25, 50, 75, 90))
+        weeks = distribution['week_starts'].astype(datetime)
+        p10, p25, p50, p75, p90 = distribution['values']
+        ax.fill_between(weeks, p10, p90, color=color, alpha=0.15, label='10th-90th percentile')
+        ax.fill_between(weeks, p25, p75, color=color, alpha=0.3, label='25th-75th percentile')
+        ax.plot(weeks, p50, '-', color=color, label='Median')
+        ax.set_ylim(0, 10)
+        ax.set_ylabel(f'{metric.capitalize()} (0-10)')
+        ax.set_title(f'Team Weekly {metric.capitalize()}')
+        ax.legend(loc='lower left')
+        ax.grid(True, linestyle='--', alpha=0.7)
+    
+    # Plot the share of enrolled users who logged each week
+    rates = participation(cohort)
+    weeks = rates['week_starts'].astype(datetime)
+    participation_ax.plot(weeks, rates['active_rate'] * 100, '-', color='purple', label='Logged at least once')
+    participation_ax.plot(weeks, rates['day_rate'] * 100, '--', color='orange', label='Days logged')
+    participation_ax.set_ylim(0, 105)
+    participation_ax.set_ylabel('Participation (%)')
+    participation_ax.set_title(f'Participation ({len(cohort["users"])} users)')
+    participation_ax.legend(loc='lower left')
+    participation_ax.grid(True, linestyle='--', alpha=0.7)
+    format_date_axis(participation_ax)
+    
+    # Adjust layout
+    fig.autofmt_xdate()
+    plt.tight_layout()
+    
+    return fig
+
+def parse_dashboard_data(doc_content):
+    """
+    Parse and sort the logs the dashboard charts are built from.
+    
+    Args:
+        doc_content: The content of the Google Doc, a LogArchive, or a
+            StoredHistory read from the history store.
+        
+    Returns:
+        A (daily_logs, weekly_reviews) tuple, with daily logs sorted by date.
+        For an archive, the daily logs are its structured array, which the
+        charts read directly.
+    """
+    # Stored history is already parsed and sorted
+    if isinstance(doc_content, StoredHistory):
+        return doc_content.daily_logs, doc_content.weekly_reviews
+    
+    # An archive is already parsed; only its rows need sorting, and no chart reads the item text
+    if isinstance(doc_content, LogArchive):
+        order = np.argsort(doc_content.daily_logs['date'], kind='stable')
+        return doc_content.daily_logs[order], doc_content.weekly_review_dicts(with_items=False)
+    
     # Create a parser instance
     parser = ProductivityDataParser()
     
@@ -214,19 +496,251 @@ def create_dashboard(doc_content):
     # Sort daily logs by date
     daily_logs.sort(key=lambda x: datetime.strptime(x.get('date', ''), '%B %d, %Y') if x.get('date') else datetime.min)
     
+    return daily_logs, weekly_reviews
+
+def build_chart(chart_name, daily_logs, weekly_reviews):
+    """
+    Build one dashboard chart by name.
+    
+    Args:
+        chart_name: One of the keys of CHART_NAMES.
+        daily_logs: The daily logs from parse_dashboard_data.
+        weekly_reviews: The weekly reviews.
+        
+    Returns:
+        The figure object.
+    """
+    if chart_name == 'mood_focus':
+        return create_mood_focus_chart(daily_logs)
+    elif chart_name == 'achievements_challenges':
+        return create_achievements_challenges_chart(daily_logs)
+    elif chart_name == 'weekly_overview':
+        return create_weekly_overview_chart(weekly_reviews, daily_logs)
+    elif chart_name == 'trends':
+        return create_trends_chart(daily_logs)
+    elif chart_name == 'metrics':
+        return create_metrics_chart(daily_logs)
+    raise ValueError(f"Unknown chart: {chart_name}")
+
+# Charts rendered by the dashboard, in display order
+CHART_NAMES = ('mood_focus', 'achievements_challenges', 'weekly_overview', 'trends', 'metrics')
+
+def render_chart(chart_name, daily_logs, weekly_reviews, path, image_format=None):
+    """
+    Render one chart to a file with the non-interactive Agg backend.
+    
+    Runs in a worker process; the figure is closed as soon as it is saved so
+    long batches do not accumulate memory.
+    
+    Args:
+        chart_name: One of CHART_NAMES.
+        daily_logs: The daily logs from parse_dashboard_data.
+        weekly_reviews: The weekly reviews.
+        path: The output file.
+        image_format: "png" or "svg"; taken from the path's extension if None.
+        
+    Returns:
+        The output path.
+    """
+    plt.switch_backend('Agg')
+    fig = build_chart(chart_name, daily_logs, weekly_reviews)
+    try:
+        fig.savefig(path, format=image_format)
+    finally:
+        plt.close(fig)
+    return path
+
+def render_dashboard(doc_content, output_dir, image_format="png", executor=None, figure_cache=None):
+    """
+    Render every dashboard chart to files, one chart per worker process.
+    
+    Charts whose inputs are unchanged are copied from the figure cache;
+    only the others are rendered.
+    
+    Args:
+        doc_content: The content of the Google Doc, or a LogArchive.
+        output_dir: The directory to write the charts to.
+        image_format: "png" or "svg".
+        executor: An existing process pool to submit to; a temporary one is
+            created when None.
+        figure_cache: The FigureCache to use; a default one is created when
+            None. Pass False to always render.
+        
+    Returns:
+        The list of written file paths.
+    """
+    if image_format not in ("png", "svg"):
+        raise ValueError(f"Unsupported image format: {image_format}")
+    
+    os.makedirs(output_dir, exist_ok=True)
+    daily_logs, weekly_reviews = parse_dashboard_data(doc_content)
+    if figure_cache is None:
+        figure_cache = FigureCache()
+    
+    # Serve unchanged charts from the cache and collect the ones to render
+    paths = {}
+    pending = {}
+    for chart_name in CHART_NAMES:
+        output_path = os.path.join(output_dir, f"{chart_name}.{image_format}")
+        if not figure_cache:
+            pending[chart_name] = (None, output_path)
+            continue
+        key = chart_key(chart_name, chart_inputs(chart_name, daily_logs, weekly_reviews), {'format': image_format})
+        cached_path = figure_cache.lookup(key, image_format)
+        if cached_path:
+            paths[chart_name] = figure_cache.export(cached_path, output_path)
+        else:
+            pending[chart_name] = (key, output_path)
+    
+    if pending:
+        owns_executor = executor is None
+        if owns_executor:
+            executor = ProcessPoolExecutor(max_workers=len(pending))
+        
+        try:
+            futures = {}
+            for chart_name, (key, output_path) in pending.items():
+                # Render into the cache first, then copy out
+                target = figure_cache.path_for(key, image_format) + ".tmp" if key else output_path
+                futures[chart_name] = executor.submit(render_chart, chart_name, daily_logs, weekly_reviews, target, image_format)
+            
+            for chart_name, future in futures.items():
+                key, output_path = pending[chart_name]
+                rendered_path = future.result()
+                if key:
+                    cached_path = figure_cache.path_for(key, image_format)
+                    os.replace(rendered_path, cached_path)
+                    rendered_path = figure_cache.export(cached_path, output_path)
+                paths[chart_name] = rendered_path
+        finally:
+            if owns_executor:
+                executor.shutdown()
+        
+        if figure_cache:
+            figure_cache.evict()
+    
+    print(f"Rendered {len(pending)} of {len(CHART_NAMES)} charts ({len(CHART_NAMES) - len(pending)} unchanged, served from cache)")
+    return [paths[chart_name] for chart_name in CHART_NAMES]
+
+def read_batch_file(path):
+    """
+    Read a per-user batch file.
+    
+    Each non-empty line is "name,doc_id" or just "doc_id"; lines starting
+    with "#" are ignored.
+    
+    Args:
+        path: The path of the batch file.
+        
+    Returns:
+        A list of (name, doc_id) tuples.
+    """
+    documents = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            name, _, doc_id = line.rpartition(',')
+            documents.append((name.strip() or doc_id.strip(), doc_id.strip()))
+    return documents
+
+def check_output_name(name):
+    """
+    Check that a batch name can be used as a directory inside the output directory.
+    
+    Raises:
+        ValueError: If the name is empty, "." or "..", or contains a path separator.
+    """
+    separators = {os.sep, os.altsep, '/'} - {None}
+    if name in ('', '.', '..') or any(separator in name for separator in separators):
+        raise ValueError(f"Batch name '{name}' cannot be used as an output directory name")
+
+def render_batch(documents, output_dir, image_format="png", workers=None):
+    """
+    Render the dashboards of many documents into one directory per user.
+    
+    While one document is parsed and its charts render in a shared process
+    pool, the next document is fetched on a background thread. At most two
+    documents are held at once and the pool's workers are recycled
+    periodically (on Python 3.11+), so memory stays flat however many
+    documents are in the batch.
+    
+    Args:
+        documents: A list of (name, doc_id) tuples.
+        output_dir: The root output directory.
+        image_format: "png" or "svg".
+        workers: The number of worker processes (defaults to the CPU count).
+        
+    Returns:
+        A dictionary mapping each name to its written paths, or None if its
+        document could not be read.
+        
+    Raises:
+        ValueError: If a name cannot be used as a directory name (see
+            check_output_name).
+    """
+    for name, _ in documents:
+        check_output_name(name)
+    
+    # max_tasks_per_child was added in Python 3.11
+    pool_options = {'max_tasks_per_child': 50} if sys.version_info >= (3, 11) else {}
+    results = {}
+    figure_cache = FigureCache()
+    with ProcessPoolExecutor(max_workers=workers, **pool_options) as executor, ThreadPoolExecutor(max_workers=1) as fetcher:
+        next_fetch = fetcher.submit(read_google_doc, documents[0][1]) if documents else None
+        for index, (name, _) in enumerate(documents):
+            doc_content = next_fetch.result()
+            # Fetch the next document while this one renders
+            if index + 1 < len(documents):
+                next_fetch = fetcher.submit(read_google_doc, documents[index + 1][1])
+            
+            print(f"Rendering dashboard for {name}...")
+            if not doc_content:
+                print(f"Failed to read the Google Doc for {name}, skipping.")
+                results[name] = None
+                continue
+            results[name] = render_dashboard(doc_content, os.path.join(output_dir, name), image_format, executor, figure_cache)
+    return results
+
+def create_dashboard(doc_content, metrics=None):
+    """
+    Create a dashboard with multiple charts.
+    
+    Args:
+        doc_content: The content of the Google Doc, or a LogArchive.
+        metrics: RunMetrics to record the parse and chart stages in.
+        
+    Returns:
+        None
+    """
+    metrics = metrics or RunMetrics("dashboard")
+    
+    with metrics.span("parse") as span:
+        daily_logs, weekly_reviews = parse_dashboard_data(doc_content)
+        span.record('daily_logs', len(daily_logs))
+        span.record('weekly_reviews', len(weekly_reviews))
+    
     # Create the charts
-    mood_focus_fig = create_mood_focus_chart(daily_logs)
-    achievements_challenges_fig = create_achievements_challenges_chart(daily_logs)
-    weekly_overview_fig = create_weekly_overview_chart(weekly_reviews)
+    figures = []
+    for chart_name in CHART_NAMES:
+        with metrics.span(f"chart.{chart_name}"):
+            figures.append(build_chart(chart_name, daily_logs, weekly_reviews))
     
     # Show the charts
-    plt.show()
+    with metrics.span("show"):
+        plt.show()
 
-def main():
-    """Main function to run the dashboard."""
-    print("Productivity and Mood Dashboard")
-    print("==============================")
+def fetch_dashboard_document(metrics):
+    """
+    Fetch the Google Doc in GOOGLE_DOC_ID, prompting for the ID if unset.
     
+    Args:
+        metrics: RunMetrics to record the auth and fetch stages in.
+        
+    Returns:
+        The document text, or None on failure.
+    """
     # Check if document ID is provided as an environment variable
     document_id = os.environ.get("GOOGLE_DOC_ID")
     
@@ -234,17 +748,108 @@ def main():
     if not document_id:
         document_id = input("Enter your Google Doc ID: ")
     
+    with metrics.span("auth"):
+        service = authenticate_google_docs_api()
+    
     # Read the Google Doc
     print("Reading Google Doc...")
-    doc_content = read_google_doc(document_id)
+    with metrics.span("fetch") as span:
+        doc_content, fetch_stats = fetch_document_text(document_id, service) if service else (None, {})
+        for key, value in fetch_stats.items():
+            span.record(key, value)
+        span.record('chars', len(doc_content or ""))
+    return doc_content
+
+def main(output_dir=None, image_format="png", batch_file=None, workers=None, archive_path=None, from_history=False):
+    """
+    Main function to run the dashboard.
     
-    if not doc_content:
-        print("Failed to read the Google Doc. Please check your credentials and document ID.")
+    Args:
+        output_dir: If given, render the charts headlessly to this directory
+            instead of showing them.
+        image_format: "png" or "svg" for headless rendering.
+        batch_file: A per-user batch file (see read_batch_file); requires
+            output_dir.
+        workers: The number of render worker processes.
+        archive_path: A log archive (see log_archive.write_archive) to chart
+            instead of fetching the Google Doc.
+        from_history: Chart the document's entries in the history store at
+            HISTORY_DB instead of fetching the Google Doc.
+    """
+    print("Productivity and Mood Dashboard")
+    print("==============================")
+    
+    if batch_file:
+        if not output_dir:
+            print("Error: --batch requires --output.")
+            return
+        try:
+            results = render_batch(read_batch_file(batch_file), output_dir, image_format, workers)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return
+        rendered = sum(1 for paths in results.values() if paths)
+        print(f"Rendered dashboards for {rendered} of {len(results)} documents to {output_dir}")
+        return
+    
+    # Time each stage; the record is written to METRICS_FILE ("-" for stdout), if set
+    metrics = metrics_from_env("dashboard")
+    metrics_file = os.environ.get("METRICS_FILE")
+    
+    if archive_path:
+        # The archive is already parsed and memory-mapped; nothing to fetch
+        print(f"Opening log archive {archive_path}...")
+        with metrics.span("load") as span:
+            try:
+                doc_content = LogArchive(archive_path)
+            except (OSError, ValueError) as e:
+                print(f"Failed to open the log archive: {e}")
+                metrics.record('outcome', 'load_failed')
+                metrics.emit(metrics_file)
+                return
+            span.record('daily_logs', len(doc_content.daily_logs))
+    elif from_history:
+        history_store = store_from_env()
+        if history_store is None:
+            print("Error: reading from the history store requires HISTORY_DB (--history-db).")
+            metrics.record('outcome', 'no_history_store')
+            metrics.emit(metrics_file)
+            return
+        
+        document_id = os.environ.get("GOOGLE_DOC_ID") or input("Enter your Google Doc ID: ")
+        print(f"Reading stored history from {history_store.path}...")
+        with metrics.span("load") as span:
+            doc_content = history_store.history(document_id)
+            span.record('daily_logs', len(doc_content.daily_logs))
+        if not doc_content.daily_logs and not doc_content.weekly_reviews:
+            print("No stored entries for this document. Run an analysis with --history-db first.")
+            metrics.record('outcome', 'load_failed')
+            metrics.emit(metrics_file)
+            return
+    else:
+        doc_content = fetch_dashboard_document(metrics)
+        if not doc_content:
+            print("Failed to read the Google Doc. Please check your credentials and document ID.")
+            metrics.record('outcome', 'fetch_failed')
+            metrics.emit(metrics_file)
+            return
+    
+    if output_dir:
+        print(f"Rendering dashboard to {output_dir}...")
+        with metrics.span("render") as span:
+            paths = render_dashboard(doc_content, output_dir, image_format)
+            span.record('charts', len(paths))
+        for path in paths:
+            print(f"Saved {path}")
+        metrics.record('outcome', 'ok')
+        metrics.emit(metrics_file)
         return
     
     # Create the dashboard
     print("Creating dashboard...")
-    create_dashboard(doc_content)
+    create_dashboard(doc_content, metrics)
+    metrics.record('outcome', 'ok')
+    metrics.emit(metrics_file)
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
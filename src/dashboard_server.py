@@ -0,0 +1,231 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from dashboard import CHART_NAMES, parse_dashboard_data, render_dashboard
+from productivity_tracker import authenticate_google_docs_api, get_document_revision, read_google_doc
+from snapshot import get_cache_dir
+from stats import compute_trend_stats
+from anomalies import detect_anomalies
+from metric_schema import load_metric_schema
+
+INDEX_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<meta http-equiv="refresh" content="{refresh}">
+<title>Productivity and Mood Dashboard</title>
+<style>body {{ font-family: sans-serif; margin: 2em; }} img {{ max-width: 100%; display: block; margin-bottom: 2em; }}</style>
+</head>
+<body>
+<h1>Productivity and Mood Dashboard</h1>
+<p>Revision {revision}, updated {updated}. <a href="/stats.json">Statistics (JSON)</a></p>
+{images}
+</body>
+</html>
+"""
+
+class DashboardState:
+    """The latest rendered charts and statistics, shared by all request handlers."""
+
+    def __init__(self):
+        """Initialize an empty state; requests get a 503 until the first render."""
+        self.lock = threading.Lock()
+        self.revision = None
+        self.updated = None
+        # path -> (content type, body bytes)
+        self.resources = {}
+
+    def etag(self, path):
+        """Return the ETag of a resource for the current revision."""
+        digest = hashlib.sha1(f"{self.revision}:{path}".encode('utf-8')).hexdigest()[:16]
+        return f'"{digest}"'
+
+    def publish(self, revision, resources):
+        """Atomically swap in the resources of a new revision."""
+        with self.lock:
+            self.revision = revision
+            self.updated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            self.resources = resources
+
+    def get(self, path):
+        """Return (content type, body, etag) for a path, or None."""
+        with self.lock:
+            if path not in self.resources:
+                return None
+            content_type, body = self.resources[path]
+            return content_type, body, self.etag(path)
+
+class DocumentPoller(threading.Thread):
+    """Background thread that polls the document revision and re-renders on change."""
+
+    def __init__(self, document_id, state, poll_interval=60, image_format="png", refresh=60):
+        """
+        Initialize the poller.
+
+        Args:
+            document_id: The Google Doc ID.
+            state: The DashboardState to publish renders to.
+            poll_interval: Seconds between revision checks.
+            image_format: "png" or "svg".
+            refresh: Seconds between browser refreshes of the index page.
+        """
+        super().__init__(daemon=True)
+        self.document_id = document_id
+        self.state = state
+        self.poll_interval = poll_interval
+        self.image_format = image_format
+        self.refresh = refresh
+        self.stop_event = threading.Event()
+        self.service = None
+        self.output_dir = os.path.join(get_cache_dir(document_id), "served")
+
+    def poll_once(self):
+        """
+        Check the document revision and re-render if it changed.
+
+        Returns:
+            True if a new revision was rendered.
+        """
+        if self.service is None:
+            self.service = authenticate_google_docs_api()
+            if not self.service:
+                return False
+
+        revision = get_document_revision(self.document_id, self.service)
+        if revision is None or revision == self.state.revision:
+            return False
+
+        doc_content = read_google_doc(self.document_id, self.service)
+        if not doc_content:
+            return False
+
+        print(f"New revision {revision}, re-rendering dashboard...")
+        self.state.publish(revision, self.render(revision, doc_content))
+        return True
+
+    def render(self, revision, doc_content):
+        """Render the charts, statistics and index page for a revision."""
+        content_type = 'image/svg+xml' if self.image_format == 'svg' else 'image/png'
+        resources = {}
+
+        paths = render_dashboard(doc_content, self.output_dir, self.image_format)
+        for chart_name, path in zip(CHART_NAMES, paths):
+            with open(path, 'rb') as f:
+                resources[f"/charts/{chart_name}.{self.image_format}"] = (content_type, f.read())
+
+        daily_logs, _ = parse_dashboard_data(doc_content)
+        stats = {
+            'revision': revision,
+            'stats': compute_trend_stats(daily_logs, metrics=load_metric_schema().names),
+            'anomalies': detect_anomalies(daily_logs),
+        }
+        resources['/stats.json'] = ('application/json', json.dumps(stats, indent=2).encode('utf-8'))
+
+        images = "\n".join(
+            f'<img src="/charts/{chart_name}.{self.image_format}" alt="{chart_name}">' for chart_name in CHART_NAMES
+        )
+        index = INDEX_TEMPLATE.format(
+            refresh=self.refresh,
+            revision=revision,
+            updated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            images=images,
+        )
+        resources['/'] = ('text/html; charset=utf-8', index.encode('utf-8'))
+        return resources
+
+    def run(self):
+        """Poll until stopped; errors are reported and retried on the next poll."""
+        while not self.stop_event.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                print(f"Error while polling the document: {e}")
+            self.stop_event.wait(self.poll_interval)
+
+    def stop(self):
+        """Ask the poller to stop after its current poll."""
+        self.stop_event.set()
+
+def make_handler(state):
+    """Build a request handler class bound to a dashboard state."""
+
+    class DashboardRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            """Serve a rendered resource, or a 304 if the client's ETag is current."""
+            path = self.path.split('?', 1)[0]
+            if path == '/index.html':
+                path = '/'
+
+            resource = state.get(path)
+            if resource is None:
+                if state.revision is None:
+                    self.send_error(503, "Dashboard is still rendering")
+                else:
+                    self.send_error(404)
+                return
+
+            content_type, body, etag = resource
+
+            # Clients holding the current revision get an empty 304
+            if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # Keep the console quiet; revalidations would otherwise flood it
+            pass
+
+    return DashboardRequestHandler
+
+def serve(document_id, host="127.0.0.1", port=8050, poll_interval=60, image_format="png"):
+    """
+    Serve the dashboard over HTTP, re-rendering only when the document changes.
+
+    Args:
+        document_id: The Google Doc ID.
+        host: The interface to bind.
+        port: The port to listen on.
+        poll_interval: Seconds between revision checks.
+        image_format: "png" or "svg".
+    """
+    state = DashboardState()
+    poller = DocumentPoller(document_id, state, poll_interval, image_format, refresh=poll_interval)
+    poller.start()
+
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    print(f"Serving dashboard on http://{host}:{port}/ (polling every {poll_interval}s, Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping dashboard server...")
+    finally:
+        poller.stop()
+        server.server_close()
+
+def main(host="127.0.0.1", port=8050, poll_interval=60, image_format="png"):
+    """Main function to run the dashboard server."""
+    print("Productivity and Mood Dashboard Server")
+    print("======================================")
+
+    # Check if document ID is provided as an environment variable
+    document_id = os.environ.get("GOOGLE_DOC_ID")
+
+    # If not, prompt the user for it
+    if not document_id:
+        document_id = input("Enter your Google Doc ID: ")
+
+    serve(document_id, host, port, poll_interval, image_format)
@@ -1,17 +1,43 @@
 import re
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
+from stats import compute_trend_stats, format_stats_summary
+from anomalies import detect_anomalies, findings_since, format_anomalies
+from snapshot import ParsedSnapshot
+from rollups import RollupStore, bucket_keys, summarize_bucket
+from search_index import SearchIndex
+from dedup import collapse_near_duplicates
+from interval_index import DailyLogIndex, build_review_index, logs_for_review, parse_week_interval
+from history_store import HistoryStore
+from metric_schema import CORE_METRICS, MetricSchema, load_metric_schema
 
 class ProductivityDataParser:
     """Parser for extracting structured data from productivity logs."""
     
-    def __init__(self):
-        """Initialize the parser."""
+    def __init__(self, cache_dir: Optional[str] = None, store: Optional[HistoryStore] = None,
+                 user: Optional[str] = None, schema: Optional[MetricSchema] = None):
+        """
+        Initialize the parser.
+        
+        Args:
+            cache_dir: Directory for the parsed snapshot and rollups. If None,
+                they are rebuilt in memory on every run.
+            store: A HistoryStore that refresh_snapshot keeps up to date and
+                that extract_data_for_analysis reads from when given no text.
+            user: The user the document belongs to in the store.
+            schema: The metrics to extract from each daily log; the schema
+                configured by HABIT_METRICS_FILE (mood and focus by default)
+                if None.
+        """
+        self.cache_dir = cache_dir
+        self.store = store
+        self.user = user
+        self.new_entries = 0
+        
         # Regular expressions for parsing different parts of the log
         self.date_pattern = re.compile(r'(Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday),\s+([A-Za-z]+\s+\d{1,2},\s+\d{4})')
         self.week_pattern = re.compile(r'Week of ([A-Za-z]+\s+\d{1,2}-\d{1,2},\s+\d{4})')
-        self.mood_pattern = re.compile(r'Mood:\s*(\d+(?:\.\d+)?)/10')
-        self.focus_pattern = re.compile(r'Focus:\s*(\d+(?:\.\d+)?)/10')
+        self.schema = schema or load_metric_schema()
         self.achievements_pattern = re.compile(r'Achievements:(.*?)(?=Challenges:|$)', re.DOTALL)
         self.challenges_pattern = re.compile(r'Challenges:(.*?)(?=Notes:|$)', re.DOTALL)
         self.notes_pattern = re.compile(r'Notes:(.*?)(?=\n\n|\Z)', re.DOTALL)
@@ -45,15 +71,8 @@ class ProductivityDataParser:
                 log['day_of_week'] = day_of_week
                 log['date'] = date_str
             
-            # Extract mood
-            mood_match = self.mood_pattern.search(day)
-            if mood_match:
-                log['mood'] = float(mood_match.group(1))
-            
-            # Extract focus
-            focus_match = self.focus_pattern.search(day)
-            if focus_match:
-                log['focus'] = float(focus_match.group(1))
+            # Extract mood, focus and any configured metrics in one scan
+            log.update(self.schema.extract(day))
             
             # Extract achievements
             achievements_match = self.achievements_pattern.search(day)
@@ -136,109 +155,353 @@ class ProductivityDataParser:
         
         return weekly_reviews
     
-    def extract_data_for_analysis(self, text: str, analysis_type: str = "weekly") -> Dict:
+    def refresh_snapshot(self, text: str) -> Tuple[ParsedSnapshot, RollupStore, SearchIndex]:
         """
-        Extract data for analysis based on the analysis type.
+        Merge the parsed document into the snapshot and update derived stores.
+        
+        Only the rollup buckets and search postings of new, changed or
+        deleted entries are updated; everything is persisted in the parser's
+        cache directory.
+        With a history store, the document's entries are also upserted there.
+        
+        Args:
+            text: The text containing productivity data.
+            
+        Returns:
+            The up-to-date snapshot, rollup store and search index.
+        """
+        snapshot = ParsedSnapshot.load(self.cache_dir)
+        rollups = RollupStore.load(self.cache_dir)
+        search_index = SearchIndex.load(self.cache_dir)
+        
+        daily_logs = self.parse_daily_logs(text)
+        weekly_reviews = self.parse_weekly_reviews(text)
+        changed_logs, changed_reviews = snapshot.merge(daily_logs, weekly_reviews)
+        
+        if self.store is not None:
+            self.store.upsert_document(self.user, daily_logs, weekly_reviews)
+        
+        # Remember how many entries are new (not just edited) since the last refresh
+        self.new_entries = sum(1 for previous, current in list(changed_logs.values()) + list(changed_reviews.values())
+                               if previous is None and current is not None)
+        
+        if changed_logs:
+            rollups.update(changed_logs, snapshot)
+            rollups.save()
+        
+        if changed_logs or changed_reviews:
+            search_index.update(changed_logs, changed_reviews)
+            search_index.save()
+            snapshot.save()
+        
+        return snapshot, rollups, search_index
+    
+    def refresh_rollups(self, text: str) -> RollupStore:
+        """
+        Merge the parsed document into the snapshot and return the rollups.
         
         Args:
             text: The text containing productivity data.
-            analysis_type: The type of analysis to perform ("weekly" or "monthly").
+            
+        Returns:
+            The up-to-date rollup store.
+        """
+        return self.refresh_snapshot(text)[1]
+    
+    def use_cached_snapshot(self) -> bool:
+        """
+        Analyze the last parsed state of the document when it cannot be fetched.
+        
+        Afterwards extract_data_for_analysis(None, ...) reads the history
+        store, which already holds that state when there is one; otherwise
+        the cached snapshot is loaded into an in-memory store.
+        
+        Returns:
+            True if there are cached entries to analyze.
+        """
+        if self.store is not None:
+            return self.user in self.store.users()
+        
+        snapshot = ParsedSnapshot.load(self.cache_dir)
+        if not snapshot.daily_logs and not snapshot.weekly_reviews:
+            return False
+        self.store = HistoryStore(":memory:")
+        self.user = self.user or "snapshot"
+        self.store.upsert_document(self.user, list(snapshot.daily_logs.values()), list(snapshot.weekly_reviews.values()))
+        return True
+    
+    def _require_store(self) -> HistoryStore:
+        """Return the history store, which is required when no text is given."""
+        if self.store is None:
+            raise ValueError("No document text given and the parser has no history store")
+        return self.store
+    
+    def _stored_rollups(self, since: datetime, until: datetime) -> RollupStore:
+        """Build in-memory rollups from the stored daily logs in a date window."""
+        snapshot = ParsedSnapshot()
+        rollups = RollupStore()
+        changed_logs, _ = snapshot.merge(self._require_store().daily_logs(self.user, since, until), [])
+        rollups.update(changed_logs, snapshot)
+        return rollups
+    
+    def _weekly_reviews(self, text: Optional[str]) -> List[Dict]:
+        """Parse the weekly reviews, or read them from the history store if text is None."""
+        if text is None:
+            return self._require_store().weekly_reviews(self.user)
+        return self.parse_weekly_reviews(text)
+    
+    def _logs_up_to(self, text: Optional[str], reference_date: Optional[datetime]) -> List[Dict]:
+        """Parse the daily logs, sorted by date, leaving out logs after the reference date."""
+        if text is None:
+            # The store returns dated logs in order; the window is an index range scan
+            return self._require_store().daily_logs(self.user, end=reference_date)
+        
+        daily_logs = self.parse_daily_logs(text)
+        
+        # Sort logs by date
+        daily_logs.sort(key=lambda x: datetime.strptime(x.get('date', ''), '%B %d, %Y') if x.get('date') else datetime.min)
+        
+        if reference_date is not None:
+            daily_logs = [
+                log for log in daily_logs
+                if not log.get('date') or datetime.strptime(log['date'], '%B %d, %Y') <= reference_date
+            ]
+        return daily_logs
+    
+    def extract_data_for_analysis(self, text: Optional[str], analysis_type: str = "weekly",
+                                  reference_date: Optional[datetime] = None,
+                                  period_start: Optional[datetime] = None) -> Dict:
+        """
+        Extract data for analysis based on the analysis type.
+        
+        Args:
+            text: The text containing productivity data, or None to read the
+                user's entries from the history store instead.
+            analysis_type: The type of analysis to perform ("weekly", "monthly",
+                "quarterly" or "yearly"). Quarterly and yearly data are read
+                from the rollups rather than the daily logs.
+            reference_date: The last day of the period to analyze. Defaults to
+                now; set it to analyze a past period, in which case later
+                entries are ignored.
+            period_start: The first day of a weekly or monthly period. Defaults
+                to the 7 or 30 days ending on the reference date; backfill
+                passes its periods' exact bounds so that they tile.
             
         Returns:
             A dictionary containing the extracted data.
         """
         data = {}
+        today = reference_date or datetime.now()
         
         if analysis_type == "weekly":
             # For weekly analysis, extract data from the past 7 days
-            daily_logs = self.parse_daily_logs(text)
-            
-            # Sort logs by date
-            daily_logs.sort(key=lambda x: datetime.strptime(x.get('date', ''), '%B %d, %Y') if x.get('date') else datetime.min)
+            daily_logs = self._logs_up_to(text, reference_date)
             
-            # Get logs from the past 7 days
-            today = datetime.now()
-            seven_days_ago = today - timedelta(days=7)
+            # Get logs from the past 7 days, the reference day included
+            week_start = period_start or (today - timedelta(days=6)).replace(hour=0, minute=0, second=0, microsecond=0)
             
             recent_logs = [
                 log for log in daily_logs 
-                if log.get('date') and datetime.strptime(log['date'], '%B %d, %Y') >= seven_days_ago
+                if log.get('date') and datetime.strptime(log['date'], '%B %d, %Y') >= week_start
             ]
             
             data['daily_logs'] = recent_logs
             
+            # Trend statistics use the full history so rolling windows have context
+            data['stats'] = compute_trend_stats(daily_logs, metrics=self.schema.names)
+            
+            # Streaks and anomalies are detected over the full history, reported for this week
+            data['anomalies'] = findings_since(detect_anomalies(daily_logs), week_start)
+            
             # Also include the most recent weekly review if available
-            weekly_reviews = self.parse_weekly_reviews(text)
+            weekly_reviews = self._weekly_reviews(text)
+            if reference_date is not None:
+                # For a past period, the latest review that had ended by then
+                weekly_reviews = build_review_index(weekly_reviews).overlapping(datetime.min, reference_date)
+                weekly_reviews = [review for review in weekly_reviews if parse_week_interval(review['week'])[1] <= reference_date]
             if weekly_reviews:
                 data['weekly_review'] = weekly_reviews[-1]
                 
         elif analysis_type == "monthly":
             # For monthly analysis, extract data from the past 30 days
-            daily_logs = self.parse_daily_logs(text)
-            
-            # Sort logs by date
-            daily_logs.sort(key=lambda x: datetime.strptime(x.get('date', ''), '%B %d, %Y') if x.get('date') else datetime.min)
+            daily_logs = self._logs_up_to(text, reference_date)
             
-            # Get logs from the past 30 days
-            today = datetime.now()
-            thirty_days_ago = today - timedelta(days=30)
+            # Get logs from the past 30 days, the reference day included
+            month_start = period_start or (today - timedelta(days=29)).replace(hour=0, minute=0, second=0, microsecond=0)
             
             recent_logs = [
                 log for log in daily_logs 
-                if log.get('date') and datetime.strptime(log['date'], '%B %d, %Y') >= thirty_days_ago
+                if log.get('date') and datetime.strptime(log['date'], '%B %d, %Y') >= month_start
             ]
             
             data['daily_logs'] = recent_logs
             
-            # Include all weekly reviews from the past 30 days
-            weekly_reviews = self.parse_weekly_reviews(text)
-            
-            recent_reviews = []
-            for review in weekly_reviews:
-                if review.get('week'):
-                    # Extract the end date from the week string (e.g., "March 1-7, 2023" -> "March 7, 2023")
-                    week_str = review['week']
-                    match = re.search(r'([A-Za-z]+)\s+\d{1,2}-(\d{1,2}),\s+(\d{4})', week_str)
-                    if match:
-                        month, day, year = match.group(1), match.group(2), match.group(3)
-                        end_date_str = f"{month} {day}, {year}"
-                        try:
-                            end_date = datetime.strptime(end_date_str, '%B %d, %Y')
-                            if end_date >= thirty_days_ago:
-                                recent_reviews.append(review)
-                        except ValueError:
-                            # If date parsing fails, include the review anyway
-                            recent_reviews.append(review)
-                    else:
-                        # If regex doesn't match, include the review anyway
-                        recent_reviews.append(review)
+            # Trend statistics use the full history so rolling windows have context
+            data['stats'] = compute_trend_stats(daily_logs, metrics=self.schema.names)
+            
+            # Include all weekly reviews overlapping the period
+            weekly_reviews = self._weekly_reviews(text)
+            review_index = build_review_index(weekly_reviews)
+            recent_reviews = review_index.overlapping(month_start, today)
+            
+            # If a week cannot be parsed, include the review anyway
+            recent_reviews += [
+                review for review in weekly_reviews
+                if review.get('week') and parse_week_interval(review['week']) is None
+            ]
             
             data['weekly_reviews'] = recent_reviews
+            
+            # Link each review to the daily logs of its week
+            day_index = DailyLogIndex(daily_logs)
+            data['review_logs'] = {
+                review['week']: logs_for_review(review, day_index) for review in recent_reviews
+            }
+        
+        elif analysis_type == "quarterly":
+            # The current quarter, broken down by month, plus the previous quarter for comparison
+            quarter_key = bucket_keys(today)['quarter']
+            year, quarter = int(quarter_key[:4]), int(quarter_key[-1])
+            first_month = 3 * (quarter - 1) + 1
+            previous_key = f"{year - 1}-Q4" if quarter == 1 else f"{year}-Q{quarter - 1}"
+            
+            if text is None:
+                previous_start = datetime(year - 1, 10, 1) if quarter == 1 else datetime(year, first_month - 3, 1)
+                rollups = self._stored_rollups(previous_start, today)
+            else:
+                rollups = self.refresh_rollups(text)
+            
+            data['period'] = quarter_key
+            data['summary'] = summarize_bucket(rollups.get('quarter', quarter_key))
+            data['previous'] = summarize_bucket(rollups.get('quarter', previous_key))
+            data['breakdown'] = [
+                (f"{year}-{month:02d}", summarize_bucket(rollups.get('month', f"{year}-{month:02d}")))
+                for month in range(first_month, first_month + 3)
+            ]
+        
+        elif analysis_type == "yearly":
+            # The current year, broken down by quarter, plus the previous year for comparison
+            year = today.year
+            rollups = self._stored_rollups(datetime(year - 1, 1, 1), today) if text is None else self.refresh_rollups(text)
+            
+            data['period'] = str(year)
+            data['summary'] = summarize_bucket(rollups.year(year))
+            data['previous'] = summarize_bucket(rollups.year(year - 1))
+            data['breakdown'] = [
+                (f"{year}-Q{quarter}", summarize_bucket(rollups.get('quarter', f"{year}-Q{quarter}")))
+                for quarter in range(1, 5)
+            ]
         
         return data
     
+    def _format_log_line(self, log: Dict) -> str:
+        """Format the heading line of a daily log: its date and ratings."""
+        # Configured metrics follow mood and focus when they were logged
+        extra_metrics = "".join(
+            f", {metric.label.lower()} {self.schema.format_value(metric.name, log[metric.name])}"
+            for metric in self.schema.metrics
+            if metric.name not in CORE_METRICS and metric.name in log
+        )
+        return (
+            f"{log.get('day_of_week', 'Unknown')}, {log.get('date', 'Unknown')} "
+            f"(mood {log.get('mood', 'N/A')}, focus {log.get('focus', 'N/A')}{extra_metrics})\n"
+        )
+    
+    def _format_review(self, review: Dict) -> str:
+        """Format a weekly review with its ratings and lists."""
+        formatted_text = f"Week of {review.get('week', 'Unknown')}\n"
+        formatted_text += f"- Overall mood: {review.get('overall_mood', 'N/A')}/10\n"
+        formatted_text += f"- Overall productivity: {review.get('overall_productivity', 'N/A')}/10\n"
+        
+        if 'key_achievements' in review:
+            formatted_text += "- Key achievements:\n"
+            for achievement in review['key_achievements']:
+                formatted_text += f"  - {achievement}\n"
+        
+        if 'challenges' in review:
+            formatted_text += "- Challenges:\n"
+            for challenge in review['challenges']:
+                formatted_text += f"  - {challenge}\n"
+        
+        if 'goals_for_next_week' in review:
+            formatted_text += "- Goals for next week:\n"
+            for goal in review['goals_for_next_week']:
+                formatted_text += f"  - {goal}\n"
+        return formatted_text
+    
+    def format_history(self, text: Optional[str], until: datetime) -> str:
+        """
+        Format the history up to a day as background for analyses of later periods.
+        
+        The statistics over that history are followed by one line per daily
+        log (its lists and notes left out) and every weekly review that had
+        ended by then. A batch of analyses of later periods shares this text,
+        so it can be sent once as cached context.
+        
+        Args:
+            text: The text containing productivity data, or None to read the
+                history store.
+            until: The last day to include.
+            
+        Returns:
+            The formatted history, or an empty string if nothing was logged by then.
+        """
+        daily_logs = self._logs_up_to(text, until)
+        weekly_reviews = [
+            review for review in self._weekly_reviews(text)
+            if parse_week_interval(review.get('week')) and parse_week_interval(review['week'])[1] <= until
+        ]
+        if not daily_logs and not weekly_reviews:
+            return ""
+        
+        formatted_text = ""
+        summary = format_stats_summary(compute_trend_stats(daily_logs, metrics=self.schema.names),
+                                       f"Statistics (history up to {until:%B %d, %Y})")
+        if summary:
+            formatted_text += summary + "\n"
+        if daily_logs:
+            formatted_text += "Daily Ratings:\n\n" + "".join(self._format_log_line(log) for log in daily_logs) + "\n"
+        if weekly_reviews:
+            formatted_text += "Weekly Reviews:\n\n" + "\n".join(self._format_review(review) for review in weekly_reviews)
+        return formatted_text
+    
     def format_data_for_gemini(self, data: Dict, analysis_type: str = "weekly") -> str:
         """
         Format the extracted data for the Gemini API.
         
         Args:
             data: The extracted data.
-            analysis_type: The type of analysis to perform ("weekly" or "monthly").
+            analysis_type: The type of analysis to perform ("weekly", "monthly",
+                "quarterly" or "yearly").
             
         Returns:
             A formatted string for the Gemini API.
         """
         formatted_text = ""
         
+        # Lead with the compact numeric summary instead of repeating raw ratings. Extracted
+        # statistics cover the whole history, not just the analyzed period.
+        stats = data.get('stats')
+        title = "Statistics (all logged history)"
+        if stats is None and data.get('daily_logs'):
+            stats = compute_trend_stats(data['daily_logs'], metrics=self.schema.names)
+            title = "Statistics"
+        if stats:
+            summary = format_stats_summary(stats, title)
+            if summary:
+                formatted_text += summary + "\n"
+        
         if analysis_type == "weekly":
+            # Format detected streaks and anomalies
+            if data.get('anomalies'):
+                formatted_text += format_anomalies(data['anomalies']) + "\n"
+            
             # Format daily logs
             if 'daily_logs' in data and data['daily_logs']:
                 formatted_text += "Daily Logs:\n\n"
                 
                 for log in data['daily_logs']:
-                    formatted_text += f"{log.get('day_of_week', 'Unknown')}, {log.get('date', 'Unknown')}\n"
-                    formatted_text += f"- Mood: {log.get('mood', 'N/A')}/10\n"
-                    formatted_text += f"- Focus: {log.get('focus', 'N/A')}/10\n"
+                    formatted_text += self._format_log_line(log)
                     
                     if 'achievements' in log:
                         formatted_text += "- Achievements:\n"
@@ -257,31 +520,13 @@ class ProductivityDataParser:
             
             # Format weekly review if available
             if 'weekly_review' in data:
-                review = data['weekly_review']
                 formatted_text += "Weekly Review:\n\n"
-                formatted_text += f"Week of {review.get('week', 'Unknown')}\n"
-                formatted_text += f"- Overall mood: {review.get('overall_mood', 'N/A')}/10\n"
-                formatted_text += f"- Overall productivity: {review.get('overall_productivity', 'N/A')}/10\n"
-                
-                if 'key_achievements' in review:
-                    formatted_text += "- Key achievements:\n"
-                    for achievement in review['key_achievements']:
-                        formatted_text += f"  - {achievement}\n"
-                
-                if 'challenges' in review:
-                    formatted_text += "- Challenges:\n"
-                    for challenge in review['challenges']:
-                        formatted_text += f"  - {challenge}\n"
-                
-                if 'goals_for_next_week' in review:
-                    formatted_text += "- Goals for next week:\n"
-                    for goal in review['goals_for_next_week']:
-                        formatted_text += f"  - {goal}\n"
+                formatted_text += self._format_review(data['weekly_review'])
         
         elif analysis_type == "monthly":
             # Format daily logs (summarized)
             if 'daily_logs' in data and data['daily_logs']:
-                # Calculate average mood and focus
+                # The statistics summary above covers the full history; these averages cover the month only
                 moods = [log.get('mood') for log in data['daily_logs'] if 'mood' in log]
                 focuses = [log.get('focus') for log in data['daily_logs'] if 'focus' in log]
                 
@@ -303,19 +548,19 @@ class ProductivityDataParser:
                     if 'challenges' in log:
                         all_challenges.extend(log['challenges'])
                 
-                # Remove duplicates
-                unique_achievements = list(set(all_achievements))
-                unique_challenges = list(set(all_challenges))
+                # Fold near-duplicate wordings into one item with an occurrence count
+                unique_achievements = collapse_near_duplicates(all_achievements)
+                unique_challenges = collapse_near_duplicates(all_challenges)
                 
                 if unique_achievements:
                     formatted_text += "- Key achievements this month:\n"
-                    for achievement in unique_achievements[:10]:  # Limit to top 10
-                        formatted_text += f"  - {achievement}\n"
+                    for achievement, count in unique_achievements[:10]:  # Limit to top 10
+                        formatted_text += f"  - {achievement} (x{count})\n" if count > 1 else f"  - {achievement}\n"
                 
                 if unique_challenges:
                     formatted_text += "- Key challenges this month:\n"
-                    for challenge in unique_challenges[:10]:  # Limit to top 10
-                        formatted_text += f"  - {challenge}\n"
+                    for challenge, count in unique_challenges[:10]:  # Limit to top 10
+                        formatted_text += f"  - {challenge} (x{count})\n" if count > 1 else f"  - {challenge}\n"
                 
                 formatted_text += "\n"
             
@@ -328,6 +573,18 @@ class ProductivityDataParser:
                     formatted_text += f"- Overall mood: {review.get('overall_mood', 'N/A')}/10\n"
                     formatted_text += f"- Overall productivity: {review.get('overall_productivity', 'N/A')}/10\n"
                     
+                    # Summarize the daily logs the review covers
+                    week_logs = data.get('review_logs', {}).get(review.get('week'), [])
+                    if week_logs:
+                        moods = [log['mood'] for log in week_logs if 'mood' in log]
+                        focuses = [log['focus'] for log in week_logs if 'focus' in log]
+                        formatted_text += f"- Days logged: {len(week_logs)}"
+                        if moods:
+                            formatted_text += f", daily mood {sum(moods) / len(moods):.1f}"
+                        if focuses:
+                            formatted_text += f", daily focus {sum(focuses) / len(focuses):.1f}"
+                        formatted_text += "\n"
+                    
                     if 'key_achievements' in review:
                         formatted_text += "- Key achievements:\n"
                         for achievement in review['key_achievements']:
@@ -345,6 +602,83 @@ class ProductivityDataParser:
                     
                     formatted_text += "\n"
         
+        elif analysis_type in ("quarterly", "yearly"):
+            if 'summary' in data:
+                summary = data['summary']
+                formatted_text += f"{analysis_type.capitalize()} Summary ({data.get('period', 'Unknown')}):\n\n"
+                formatted_text += self._format_rollup_summary(summary)
+                
+                previous = data.get('previous')
+                if previous and previous['days']:
+                    formatted_text += "- Previous period:\n"
+                    formatted_text += f"  - Days logged: {previous['days']}\n"
+                    formatted_text += f"  - Mood: {self._format_range(previous['mood'])}\n"
+                    formatted_text += f"  - Focus: {self._format_range(previous['focus'])}\n"
+                
+                formatted_text += "\n"
+            
+            # Format the per-month or per-quarter breakdown
+            breakdown = [(key, summary) for key, summary in data.get('breakdown', []) if summary['days']]
+            if breakdown:
+                formatted_text += "Breakdown:\n\n"
+                for key, summary in breakdown:
+                    formatted_text += (
+                        f"{key}: {summary['days']} days, mood {self._format_range(summary['mood'])}, "
+                        f"focus {self._format_range(summary['focus'])}, "
+                        f"{summary['achievements']} achievements, {summary['challenges']} challenges\n"
+                    )
+        
+        return formatted_text
+    
+    def format_stats_only(self, data: Dict, analysis_type: str) -> str:
+        """
+        Format the numeric part of the extracted data as a stand-in for a Gemini analysis.
+        
+        Args:
+            data: The data from extract_data_for_analysis.
+            analysis_type: The type of analysis the data was extracted for.
+            
+        Returns:
+            The statistics (and for weekly data, the detected streaks and
+            anomalies) under a note that no written analysis is available.
+        """
+        formatted_text = f"Statistics only: the {analysis_type} analysis could not be generated in time.\n\n"
+        
+        if data.get('stats'):
+            formatted_text += format_stats_summary(data['stats'], "Statistics (all logged history)")
+            if analysis_type == "weekly" and data.get('anomalies'):
+                formatted_text += "\n" + format_anomalies(data['anomalies'])
+        elif 'summary' in data:
+            formatted_text += f"{analysis_type.capitalize()} Summary ({data.get('period', 'Unknown')}):\n"
+            formatted_text += self._format_rollup_summary(data['summary'])
+        else:
+            formatted_text += "No logged data for this period."
+        
+        return formatted_text.rstrip()
+    
+    def _format_range(self, aggregate: Dict) -> str:
+        """Format a rollup mean with its min-max range."""
+        if aggregate['mean'] is None:
+            return "N/A"
+        return f"{aggregate['mean']:.1f}/10 (range {aggregate['min']:g}-{aggregate['max']:g})"
+    
+    def _format_rollup_summary(self, summary: Dict) -> str:
+        """Format a summarized rollup bucket as a list of prompt lines."""
+        formatted_text = f"- Days logged: {summary['days']}\n"
+        formatted_text += f"- Mood: {self._format_range(summary['mood'])}\n"
+        formatted_text += f"- Focus: {self._format_range(summary['focus'])}\n"
+        formatted_text += f"- Achievements: {summary['achievements']}, challenges: {summary['challenges']}\n"
+        
+        if summary['top_achievements']:
+            formatted_text += "- Most frequent achievements:\n"
+            for item, count in summary['top_achievements']:
+                formatted_text += f"  - {item} (x{count})\n"
+        
+        if summary['top_challenges']:
+            formatted_text += "- Most frequent challenges:\n"
+            for item, count in summary['top_challenges']:
+                formatted_text += f"  - {item} (x{count})\n"
+        
         return formatted_text
 
 # Example usage
@@ -0,0 +1,90 @@
+import os
+import time
+from typing import Dict, Optional
+
+# Share of the run deadline each stage may use, in run order
+DEFAULT_STAGE_SHARES = {
+    'fetch': 0.25,
+    'parse': 0.10,
+    'gemini': 0.55,
+    'write': 0.10,
+}
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a stage runs out of its share of the run deadline."""
+
+class Deadline:
+    """
+    A wall-clock deadline for one run, split into per-stage budgets.
+
+    Each stage ends at a fixed checkpoint: the run start plus the shares of
+    that stage and every stage before it. Time an early stage does not use
+    therefore carries over to the later ones, while a slow stage can never
+    eat into the budget reserved for the stages after it.
+    """
+
+    def __init__(self, seconds: float, shares: Optional[Dict[str, float]] = None, clock=time.monotonic):
+        """
+        Start the deadline.
+
+        Args:
+            seconds: The whole run's budget.
+            shares: The fraction of the budget per stage, in run order;
+                DEFAULT_STAGE_SHARES if None. Shares are normalized to sum to 1.
+            clock: A monotonic clock returning seconds.
+
+        Raises:
+            ValueError: If the budget is not positive or no stage has a share.
+        """
+        shares = shares or DEFAULT_STAGE_SHARES
+        total_share = sum(shares.values())
+        if seconds <= 0 or total_share <= 0:
+            raise ValueError("A deadline needs a positive budget and at least one stage")
+
+        self.seconds = seconds
+        self.clock = clock
+        self.started = clock()
+        self.checkpoints: Dict[str, float] = {}
+        elapsed_share = 0.0
+        for stage, share in shares.items():
+            elapsed_share += share
+            self.checkpoints[stage] = self.started + seconds * elapsed_share / total_share
+
+    def remaining(self, stage: Optional[str] = None) -> float:
+        """
+        Return the seconds left for a stage, or for the whole run.
+
+        Args:
+            stage: The stage name; None for the end of the run. Stages
+                without a share are only bound by the end of the run.
+
+        Returns:
+            The seconds left, 0 once the budget is spent.
+        """
+        end = self.checkpoints.get(stage, self.started + self.seconds)
+        return max(end - self.clock(), 0.0)
+
+    def expired(self, stage: Optional[str] = None) -> bool:
+        """Return whether a stage's (or the run's) budget is spent."""
+        return self.remaining(stage) <= 0
+
+    def check(self, stage: Optional[str] = None) -> float:
+        """
+        Return the seconds left for a stage, raising if there are none.
+
+        Raises:
+            DeadlineExceeded: If the stage's budget is spent.
+        """
+        remaining = self.remaining(stage)
+        if remaining <= 0:
+            raise DeadlineExceeded(f"The {stage or 'run'} budget of the {self.seconds:g}s run deadline is spent")
+        return remaining
+
+    def summary(self) -> Dict:
+        """Return the budget and elapsed seconds, for run metrics."""
+        return {'seconds': self.seconds, 'elapsed': round(self.clock() - self.started, 3)}
+
+def deadline_from_env() -> Optional[Deadline]:
+    """Return a Deadline of RUN_DEADLINE seconds starting now, or None if it is unset."""
+    seconds = os.environ.get("RUN_DEADLINE")
+    return Deadline(float(seconds)) if seconds else None
@@ -0,0 +1,147 @@
+import re
+import zlib
+from collections import Counter, defaultdict
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from search_index import STOPWORDS
+
+# MinHash parameters: NUM_BANDS bands of ROWS_PER_BAND rows put the LSH
+# candidate threshold at roughly (1 / NUM_BANDS) ** (1 / ROWS_PER_BAND) ~ 0.5
+NUM_PERMUTATIONS = 64
+NUM_BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // NUM_BANDS
+MERSENNE_PRIME = (1 << 31) - 1
+
+_rng = np.random.RandomState(42)
+_HASH_A = _rng.randint(1, MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.int64)
+_HASH_B = _rng.randint(0, MERSENNE_PRIME, size=NUM_PERMUTATIONS).astype(np.int64)
+
+def normalize(text: str) -> str:
+    """
+    Normalize an item for near-duplicate comparison.
+
+    Lowercases, drops punctuation and stopwords, and strips a trailing "s"
+    from longer words so small wording changes do not dominate.
+
+    Args:
+        text: The achievement or challenge text.
+
+    Returns:
+        The normalized text.
+    """
+    words = re.findall(r'[a-z0-9]+', text.lower())
+    words = [word[:-1] if len(word) > 3 and word.endswith('s') else word for word in words if word not in STOPWORDS]
+    return ' '.join(words)
+
+def shingles(text: str) -> np.ndarray:
+    """
+    Return the hashed word shingles (single words and word pairs) of a normalized text.
+
+    Word pairs keep "project X" and "project Y" apart while single words let
+    reworded variants such as "got distracted on social media" match.
+
+    Args:
+        text: The normalized text.
+
+    Returns:
+        An array of unique shingle hashes.
+    """
+    words = text.split() or ['']
+    grams = set(words) | {f"{first} {second}" for first, second in zip(words, words[1:])}
+    return np.fromiter((zlib.crc32(gram.encode('utf-8')) % MERSENNE_PRIME for gram in grams), dtype=np.int64)
+
+def minhash_signature(shingle_hashes: np.ndarray) -> np.ndarray:
+    """
+    Compute the MinHash signature of a shingle set in one vectorized pass.
+
+    Args:
+        shingle_hashes: The hashed shingles.
+
+    Returns:
+        An array of NUM_PERMUTATIONS minimum hash values.
+    """
+    hashed = (np.outer(_HASH_A, shingle_hashes) + _HASH_B[:, None]) % MERSENNE_PRIME
+    return hashed.min(axis=1)
+
+def cluster_near_duplicates(items: List[str], threshold: float = 0.6) -> List[List[int]]:
+    """
+    Group near-duplicate items using MinHash signatures and LSH banding.
+
+    Only items sharing at least one band are compared, so the work grows
+    with the number of candidate pairs rather than quadratically.
+
+    Args:
+        items: The texts to cluster.
+        threshold: Minimum estimated Jaccard similarity to merge two items.
+
+    Returns:
+        Clusters as lists of indices into items.
+    """
+    normalized = [normalize(item) for item in items]
+
+    # Identical normalized texts are duplicates without hashing
+    groups: Dict[str, List[int]] = defaultdict(list)
+    for i, text in enumerate(normalized):
+        groups[text].append(i)
+    keys = list(groups)
+
+    signatures = np.array([minhash_signature(shingles(key)) for key in keys]) if keys else np.empty((0, NUM_PERMUTATIONS))
+
+    # Union-find over the distinct normalized texts
+    parent = list(range(len(keys)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Bucket each band of each signature; items sharing a bucket are candidates
+    for band in range(NUM_BANDS):
+        buckets = defaultdict(list)
+        rows = signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        for i, row in enumerate(rows):
+            buckets[row.tobytes()].append(i)
+
+        for members in buckets.values():
+            # Compare the remaining members against one pivot at a time, vectorized
+            members = np.array(members)
+            while len(members) > 1:
+                pivot = members[0]
+                similarity = (signatures[members[1:]] == signatures[pivot]).mean(axis=1)
+                for j in members[1:][similarity >= threshold]:
+                    parent[find(j)] = find(pivot)
+                members = members[1:][similarity < threshold]
+
+    clusters: Dict[int, List[int]] = defaultdict(list)
+    for k, key in enumerate(keys):
+        clusters[find(k)].extend(groups[key])
+    return list(clusters.values())
+
+def collapse_near_duplicates(items: List[str], threshold: float = 0.6) -> List[Tuple[str, int]]:
+    """
+    Fold near-duplicate items into one representative with an occurrence count.
+
+    Args:
+        items: The texts to collapse, e.g. a month of challenges.
+        threshold: Minimum estimated Jaccard similarity to merge two items.
+
+    Returns:
+        (representative, count) pairs, most frequent first. The representative
+        is the most common wording in its cluster.
+    """
+    first_seen = {}
+    for i, item in enumerate(items):
+        first_seen.setdefault(item, i)
+
+    collapsed = []
+    for cluster in cluster_near_duplicates(items, threshold):
+        wordings = Counter(items[i] for i in cluster)
+        # Most common wording, then the shortest, then the earliest
+        representative = min(wordings, key=lambda wording: (-wordings[wording], len(wording), first_seen[wording]))
+        collapsed.append((representative, len(cluster), min(cluster)))
+
+    collapsed.sort(key=lambda entry: (-entry[1], entry[2]))
+    return [(representative, count) for representative, count, _ in collapsed]
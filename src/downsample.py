@@ -0,0 +1,117 @@
+import numpy as np
+from typing import Tuple
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Pick the points to keep with Largest-Triangle-Three-Buckets downsampling.
+
+    LTTB keeps the first and last points and, from each of threshold - 2
+    equally sized buckets in between, the point forming the largest triangle
+    with the previously kept point and the average of the next bucket. It
+    preserves the visual shape of a line (peaks and dips) far better than
+    striding or averaging.
+
+    Args:
+        x: The x values (numeric, increasing).
+        y: The y values; must not contain NaN.
+        threshold: The number of points to keep.
+
+    Returns:
+        The sorted indices of the points to keep.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+
+    # Bucket edges over the points between the first and the last
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+
+        # Average of the next bucket (or the last point)
+        next_x = x[end:next_end].mean() if next_end > end else x[-1]
+        next_y = y[end:next_end].mean() if next_end > end else y[-1]
+
+        # Triangle areas for every candidate in this bucket, vectorized
+        areas = np.abs(
+            (x[previous] - next_x) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(areas)) if end > start else start
+        kept[bucket + 1] = previous
+
+    return kept
+
+def downsample_series(dates: np.ndarray, values: np.ndarray, threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Downsample a dated line series with LTTB, skipping missing values.
+
+    Args:
+        dates: The datetime64 dates of the series.
+        values: The values, with NaN for missing points.
+        threshold: The maximum number of points to keep.
+
+    Returns:
+        The kept (dates, values).
+    """
+    present = ~np.isnan(values)
+    dates, values = dates[present], values[present]
+    if len(values) <= threshold:
+        return dates, values
+
+    indices = lttb_indices(dates.astype('datetime64[D]').astype(float), values, threshold)
+    return dates[indices], values[indices]
+
+def bucket_period(n_days: int, daily_limit: int = 92, weekly_limit: int = 104) -> str:
+    """
+    Choose a bar-chart bucket size for a history length.
+
+    Args:
+        n_days: The number of days in the history.
+        daily_limit: Above this many days, bars are weekly.
+        weekly_limit: Above this many weeks, bars are monthly.
+
+    Returns:
+        "D", "W" or "M".
+    """
+    if n_days <= daily_limit:
+        return 'D'
+    if n_days <= weekly_limit * 7:
+        return 'W'
+    return 'M'
+
+def bucket_sums(dates: np.ndarray, values: np.ndarray, period: str) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sum a daily series into day, week (Monday-based) or month buckets.
+
+    Args:
+        dates: The datetime64 dates of the series.
+        values: The values to sum.
+        period: "D", "W" or "M".
+
+    Returns:
+        The bucket start dates (datetime64[D]) and the bucket sums.
+    """
+    days = dates.astype('datetime64[D]')
+    if period == 'D':
+        starts = days
+    elif period == 'W':
+        # 1970-01-01 was a Thursday, so shift by 3 to land on Mondays
+        ordinals = days.astype(int)
+        starts = (ordinals - (ordinals + 3) % 7).astype('datetime64[D]')
+    elif period == 'M':
+        starts = days.astype('datetime64[M]').astype('datetime64[D]')
+    else:
+        raise ValueError(f"Unknown bucket period: {period}")
+
+    unique_starts, inverse = np.unique(starts, return_inverse=True)
+    sums = np.bincount(inverse, weights=np.asarray(values, dtype=float), minlength=len(unique_starts))
+    return unique_starts, sums
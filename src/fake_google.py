@@ -0,0 +1,474 @@
+import re
+import json
+import time
+import random
+import zlib
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from synthetic_logs import generate_log_text
+
+DOCUMENT_PATH = re.compile(r'^/v1/documents/([^/:]+)$')
+BATCH_UPDATE_PATH = re.compile(r'^/v1/documents/([^/:]+):batchUpdate$')
+EXPORT_PATH = re.compile(r'^/(?:drive/v3/)?files/([^/:]+)/export$')
+GENERATE_PATH = re.compile(r'^/v1(?:beta)?/models/([^/:]+):generateContent$')
+CACHED_CONTENT_PATH = re.compile(r'^/v1(?:beta)?/(cachedContents(?:/[^/:]+)?)$')
+
+class EndpointProfile:
+    """Latency, error rate and quota of one fake endpoint."""
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 quota_per_minute: Optional[int] = None):
+        """
+        Initialize the profile.
+
+        Args:
+            latency: Seconds every request takes before responding.
+            jitter: Maximum extra random seconds per request.
+            error_rate: Probability of answering with a 503.
+            quota_per_minute: Requests allowed per rolling minute before
+                answering with a 429; unlimited if None.
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_per_minute = quota_per_minute
+
+class FakeGoogleState:
+    """Documents, counters and quota windows shared by all request handlers."""
+
+    def __init__(self, profiles: Optional[Dict[str, EndpointProfile]] = None, days: int = 365,
+                 seed: int = 0, documents: Optional[Dict[str, str]] = None):
+        """
+        Initialize the state.
+
+        Args:
+            profiles: EndpointProfile per endpoint name ("get", "export",
+                "batchUpdate", "generateContent", "cachedContents");
+                endpoints without one respond immediately.
+            days: History length of the synthetic documents created on first
+                access to an unknown document ID.
+            seed: Base seed; each document's log is seeded from it and its ID.
+            documents: Initial document texts by ID.
+        """
+        self.profiles = profiles or {}
+        self.days = days
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.documents: Dict[str, str] = dict(documents or {})
+        self.revisions: Dict[str, int] = {document_id: 1 for document_id in self.documents}
+        self.requests: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+        self.windows: Dict[str, deque] = {}
+        # (document ID, revision, fields) -> serialized documents.get response
+        self.payloads: Dict[tuple, bytes] = {}
+        # cachedContents/N -> {'model': ..., 'text': ...}
+        self.cached_contents: Dict[str, Dict] = {}
+
+    def document(self, document_id: str) -> str:
+        """Return a document's text, generating a synthetic log on first access."""
+        with self.lock:
+            if document_id not in self.documents:
+                seed = self.seed + zlib.crc32(document_id.encode('utf-8'))
+                self.documents[document_id] = generate_log_text(self.days, seed=seed)
+                self.revisions[document_id] = 1
+            return self.documents[document_id]
+
+    def document_payload(self, document_id: str, fields: str = '') -> bytes:
+        """
+        Return the serialized documents.get response for a document and field mask.
+
+        Responses are cached per revision so that, as with the real API, the
+        cost measured by clients is transfer and decoding, not server work.
+        """
+        text = self.document(document_id)
+        revision = self.revision(document_id)
+        key = (document_id, revision, fields)
+        with self.lock:
+            payload = self.payloads.get(key)
+        if payload is None:
+            resource = document_resource(document_id, text, revision)
+            payload = json.dumps(apply_field_mask(resource, fields) if fields else resource).encode('utf-8')
+            with self.lock:
+                self.payloads[key] = payload
+        return payload
+
+    def revision(self, document_id: str) -> str:
+        """Return a document's revision ID."""
+        with self.lock:
+            return f"rev-{self.revisions.get(document_id, 1)}"
+
+    def insert_text(self, document_id: str, index: int, text: str) -> None:
+        """Insert text at a Docs index (1 is the start of the body), counted in UTF-16 code units like the real API."""
+        self.document(document_id)
+        with self.lock:
+            content = self.documents[document_id].encode('utf-16-le')
+            position = 2 * min(max(index - 1, 0), len(content) // 2)
+            self.documents[document_id] = (content[:position] + text.encode('utf-16-le') + content[position:]).decode('utf-16-le')
+            self.revisions[document_id] += 1
+
+    def cache_content(self, model: str, text: str) -> str:
+        """Store a context cache's text and return its resource name."""
+        with self.lock:
+            name = f"cachedContents/{len(self.cached_contents) + 1}"
+            self.cached_contents[name] = {'model': model, 'text': text}
+            return name
+
+    def cached_content(self, name: str) -> Optional[Dict]:
+        """Return a context cache by resource name, or None."""
+        with self.lock:
+            return self.cached_contents.get(name)
+
+    def delete_cached_content(self, name: str) -> bool:
+        """Delete a context cache; return whether it existed."""
+        with self.lock:
+            return self.cached_contents.pop(name, None) is not None
+
+    def admit(self, endpoint: str) -> Optional[int]:
+        """
+        Count a request and apply the endpoint's latency, errors and quota.
+
+        Returns:
+            An HTTP error status to answer with, or None to serve the request.
+        """
+        profile = self.profiles.get(endpoint, EndpointProfile())
+        with self.lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            delay = profile.latency + self.rng.uniform(0, profile.jitter)
+            fail = self.rng.random() < profile.error_rate
+
+            status = None
+            if profile.quota_per_minute is not None:
+                window = self.windows.setdefault(endpoint, deque())
+                now = time.monotonic()
+                while window and now - window[0] >= 60:
+                    window.popleft()
+                if len(window) >= profile.quota_per_minute:
+                    status = 429
+                else:
+                    window.append(now)
+            if status is None and fail:
+                status = 503
+            if status is not None:
+                self.errors[endpoint] = self.errors.get(endpoint, 0) + 1
+
+        if delay:
+            time.sleep(delay)
+        return status
+
+    def stats(self) -> Dict:
+        """Return request and error counts per endpoint."""
+        with self.lock:
+            return {'requests': dict(self.requests), 'errors': dict(self.errors), 'documents': len(self.documents),
+                    'cached_contents': len(self.cached_contents)}
+
+def document_resource(document_id: str, text: str, revision: str) -> Dict:
+    """
+    Build a documents.get response for a text, one paragraph per line.
+
+    Runs carry the style metadata the real API returns, so response sizes
+    and decode costs are comparable.
+    """
+    content = [{'endIndex': 1, 'sectionBreak': {'sectionStyle': {'columnSeparatorStyle': 'NONE', 'contentDirection': 'LEFT_TO_RIGHT'}}}]
+    index = 1
+    for line in text.splitlines(keepends=True):
+        end = index + len(line)
+        content.append({
+            'startIndex': index,
+            'endIndex': end,
+            'paragraph': {
+                'elements': [{
+                    'startIndex': index,
+                    'endIndex': end,
+                    'textRun': {'content': line, 'textStyle': {}},
+                }],
+                'paragraphStyle': {'namedStyleType': 'NORMAL_TEXT', 'direction': 'LEFT_TO_RIGHT'},
+            },
+        })
+        index = end
+    return {
+        'title': f"Productivity log {document_id}",
+        'body': {'content': content},
+        'documentStyle': {'pageSize': {'height': {'magnitude': 792, 'unit': 'PT'}, 'width': {'magnitude': 612, 'unit': 'PT'}}},
+        'revisionId': revision,
+        'documentId': document_id,
+    }
+
+def apply_field_mask(resource, fields: str):
+    """
+    Apply a partial-response field mask such as "body/content/paragraph/elements/textRun/content".
+
+    Supports comma-separated, slash-delimited paths, which is what the
+    tracker sends; lists are filtered element-wise as the real API does.
+    """
+    paths = [path.strip().split('/') for path in fields.split(',') if path.strip()]
+    return _select(resource, paths)
+
+def _select(value, paths):
+    """Keep only the parts of a value selected by the remaining path segments."""
+    if any(not path for path in paths):
+        return value
+    if isinstance(value, list):
+        return [_select(item, paths) for item in value]
+    if isinstance(value, dict):
+        result = {}
+        for key in dict.fromkeys(path[0] for path in paths):
+            if key in value:
+                result[key] = _select(value[key], [path[1:] for path in paths if path[0] == key])
+        return result
+    return value
+
+def content_text(contents) -> str:
+    """Join the text parts of a Gemini contents list."""
+    return " ".join(part.get('text', '') for content in contents for part in content.get('parts', []))
+
+def cached_content_resource(name: str, cached: Dict) -> Dict:
+    """Return a cachedContents resource; it never expires while the server runs."""
+    return {
+        'name': name,
+        'model': cached['model'],
+        'createTime': '2024-01-01T00:00:00Z',
+        'updateTime': '2024-01-01T00:00:00Z',
+        'expireTime': '2099-01-01T00:00:00Z',
+        'usageMetadata': {'totalTokenCount': max(1, len(cached['text']) // 4)},
+    }
+
+def fake_analysis(prompt: str, generation_config: Dict) -> str:
+    """Answer a generateContent prompt with canned text, or JSON matching a response schema."""
+    words = len(prompt.split())
+    text = f"Analysis of a {words}-word prompt: mood and focus were steady; keep the morning deep work blocks."
+    schema = generation_config.get('responseSchema') or generation_config.get('response_schema')
+    if generation_config.get('responseMimeType') == 'application/json' and schema:
+        return json.dumps({name: text for name in schema.get('properties', {})})
+    return text
+
+def make_handler(state: FakeGoogleState):
+    """Build a request handler class bound to a fake state."""
+
+    class FakeGoogleRequestHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_json(self, status, body):
+            """Send a JSON response."""
+            self.send_payload(json.dumps(body).encode('utf-8'), status)
+
+        def send_payload(self, payload, status=200):
+            """Send an already serialized JSON response."""
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def send_status(self, status):
+            """Send a Google-style error response."""
+            reason = {429: 'RESOURCE_EXHAUSTED', 503: 'UNAVAILABLE', 404: 'NOT_FOUND'}.get(status, 'UNKNOWN')
+            self.send_json(status, {'error': {'code': status, 'message': f"Fake {reason}", 'status': reason}})
+
+        def read_body(self):
+            """Read and decode the JSON request body."""
+            length = int(self.headers.get('Content-Length') or 0)
+            return json.loads(self.rfile.read(length) or b'{}')
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            match = DOCUMENT_PATH.match(url.path)
+            if url.path == '/stats':
+                self.send_json(200, state.stats())
+                return
+            cached_match = CACHED_CONTENT_PATH.match(url.path)
+            if cached_match:
+                self.send_cached_content(cached_match.group(1))
+                return
+            export_match = EXPORT_PATH.match(url.path)
+            if export_match:
+                self.send_export(export_match.group(1))
+                return
+            if not match:
+                self.send_status(404)
+                return
+
+            status = state.admit('get')
+            if status:
+                self.send_status(status)
+                return
+            fields = parse_qs(url.query).get('fields', [''])[0]
+            self.send_payload(state.document_payload(match.group(1), fields))
+
+        def send_export(self, document_id):
+            """Serve a Drive text/plain export: a byte order mark and CRLF line endings, like Drive."""
+            status = state.admit('export')
+            if status:
+                self.send_status(status)
+                return
+            text = state.document(document_id)
+            payload = ('\ufeff' + text.replace('\n', '\r\n')).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; charset=UTF-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            body = self.read_body()
+
+            match = BATCH_UPDATE_PATH.match(url.path)
+            if match:
+                status = state.admit('batchUpdate')
+                if status:
+                    self.send_status(status)
+                    return
+                document_id = match.group(1)
+                for request in body.get('requests', []):
+                    insert = request.get('insertText')
+                    if insert:
+                        state.insert_text(document_id, insert['location']['index'], insert['text'])
+                self.send_json(200, {
+                    'documentId': document_id,
+                    'replies': [{} for _ in body.get('requests', [])],
+                    'writeControl': {'requiredRevisionId': state.revision(document_id)},
+                })
+                return
+
+            match = CACHED_CONTENT_PATH.match(url.path)
+            if match and match.group(1) == 'cachedContents':
+                status = state.admit('cachedContents')
+                if status:
+                    self.send_status(status)
+                    return
+                text = content_text(body.get('contents', []))
+                name = state.cache_content(body.get('model', ''), text)
+                self.send_json(200, cached_content_resource(name, state.cached_content(name)))
+                return
+
+            match = GENERATE_PATH.match(url.path)
+            if match:
+                status = state.admit('generateContent')
+                if status:
+                    self.send_status(status)
+                    return
+                prompt = content_text(body.get('contents', []))
+                cached_tokens = 0
+                if body.get('cachedContent'):
+                    cached = state.cached_content(body['cachedContent'])
+                    if cached is None:
+                        self.send_status(404)
+                        return
+                    cached_tokens = max(1, len(cached['text']) // 4)
+                    prompt = cached['text'] + " " + prompt
+                text = fake_analysis(prompt, body.get('generationConfig', {}))
+                prompt_tokens = max(1, len(prompt) // 4)
+                output_tokens = max(1, len(text) // 4)
+                usage = {
+                    'promptTokenCount': prompt_tokens,
+                    'candidatesTokenCount': output_tokens,
+                    'totalTokenCount': prompt_tokens + output_tokens,
+                }
+                if cached_tokens:
+                    usage['cachedContentTokenCount'] = cached_tokens
+                self.send_json(200, {
+                    'candidates': [{
+                        'content': {'parts': [{'text': text}], 'role': 'model'},
+                        'finishReason': 'STOP',
+                        'index': 0,
+                    }],
+                    'usageMetadata': usage,
+                    'modelVersion': match.group(1),
+                })
+                return
+
+            self.send_status(404)
+
+        def send_cached_content(self, name):
+            """Serve a cachedContents.get request."""
+            cached = state.cached_content(name)
+            if cached is None:
+                self.send_status(404)
+                return
+            self.send_json(200, cached_content_resource(name, cached))
+
+        def do_DELETE(self):
+            match = CACHED_CONTENT_PATH.match(urlparse(self.path).path)
+            if not match or not state.delete_cached_content(match.group(1)):
+                self.send_status(404)
+                return
+            self.send_json(200, {})
+
+        def log_message(self, format, *args):
+            # Load tests send thousands of requests; keep the console quiet
+            pass
+
+    return FakeGoogleRequestHandler
+
+class FakeGoogleServer:
+    """A local Docs + Gemini stand-in running on a background thread."""
+
+    def __init__(self, state: Optional[FakeGoogleState] = None, host: str = "127.0.0.1", port: int = 0):
+        """
+        Initialize the server.
+
+        Args:
+            state: The fake state; a default FakeGoogleState if None.
+            host: The interface to bind.
+            port: The port to listen on; 0 picks a free port.
+        """
+        self.state = state or FakeGoogleState()
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        """The base URL to point GOOGLE_DOCS_ENDPOINT and GEMINI_ENDPOINT at."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeGoogleServer":
+        """Start serving in the background."""
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and release the port."""
+        self.server.shutdown()
+        self.server.server_close()
+
+def main():
+    """Run the fake Docs + Gemini server in the foreground."""
+    parser = argparse.ArgumentParser(description="Local stand-in for the Google Docs and Gemini APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--days", type=int, default=365, help="History length of generated documents")
+    parser.add_argument("--seed", type=int, default=0)
+    for endpoint in ("get", "export", "batchUpdate", "generateContent"):
+        parser.add_argument(f"--{endpoint}-latency", type=float, default=0.0, help=f"Seconds per {endpoint} request")
+        parser.add_argument(f"--{endpoint}-error-rate", type=float, default=0.0, help=f"Fraction of {endpoint} requests failing with 503")
+        parser.add_argument(f"--{endpoint}-quota", type=int, help=f"{endpoint} requests allowed per minute before 429s")
+    args = parser.parse_args()
+
+    profiles = {
+        endpoint: EndpointProfile(
+            latency=getattr(args, f"{endpoint}_latency"),
+            error_rate=getattr(args, f"{endpoint}_error_rate"),
+            quota_per_minute=getattr(args, f"{endpoint}_quota"),
+        )
+        for endpoint in ("get", "export", "batchUpdate", "generateContent")
+    }
+    server = FakeGoogleServer(FakeGoogleState(profiles, days=args.days, seed=args.seed), args.host, args.port)
+    print(f"Fake Google APIs on {server.url} (Ctrl+C to stop)")
+    print(f"  export GOOGLE_DOCS_ENDPOINT={server.url} GEMINI_ENDPOINT={server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping fake server...")
+    finally:
+        server.server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import os
+import json
+import shutil
+import hashlib
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
+from snapshot import get_cache_root
+from metric_schema import load_metric_schema
+
+# Bump when chart rendering changes so stale images are not served
+RENDER_VERSION = 1
+
+def chart_inputs(chart_name: str, daily_logs: Union[List[Dict], np.ndarray], weekly_reviews: List[Dict]):
+    """
+    Return the data a chart is drawn from, and nothing else.
+
+    Keying each chart on only its own inputs means a new weekly review
+    invalidates the weekly overview but not the daily charts.
+
+    Args:
+        chart_name: One of dashboard.CHART_NAMES.
+        daily_logs: The daily logs, sorted by date, or an archive's
+            daily_logs structured array.
+        weekly_reviews: The weekly reviews.
+
+    Returns:
+        A JSON-serializable structure.
+    """
+    if isinstance(daily_logs, np.ndarray):
+        return _record_inputs(chart_name, daily_logs, weekly_reviews)
+    if chart_name in ('mood_focus', 'trends'):
+        return [(log.get('date'), log.get('mood'), log.get('focus')) for log in daily_logs]
+    if chart_name == 'achievements_challenges':
+        return [(log.get('date'), len(log.get('achievements', [])), len(log.get('challenges', []))) for log in daily_logs]
+    if chart_name == 'weekly_overview':
+        return {
+            'reviews': [(review.get('week'), review.get('overall_mood'), review.get('overall_productivity')) for review in weekly_reviews],
+            'daily_moods': [(log.get('date'), log.get('mood')) for log in daily_logs],
+        }
+    if chart_name == 'metrics':
+        # The schema decides which metrics are drawn and on what scale
+        schema = load_metric_schema()
+        return {
+            'schema': [metric.to_dict() for metric in schema.metrics],
+            'values': [[log.get('date')] + [log.get(name) for name in schema.names] for log in daily_logs],
+        }
+    raise ValueError(f"Unknown chart: {chart_name}")
+
+def _record_inputs(chart_name: str, records: np.ndarray, weekly_reviews: List[Dict]):
+    """chart_inputs for the daily_logs structured array of a log archive; NaN marks a missing value."""
+    def columns(*fields):
+        values = [records['date'].astype(str).tolist()]
+        values += [records[field].tolist() if field in records.dtype.names else [None] * len(records) for field in fields]
+        return list(zip(*values))
+
+    if chart_name in ('mood_focus', 'trends'):
+        return columns('mood', 'focus')
+    if chart_name == 'achievements_challenges':
+        return columns('achievements', 'challenges')
+    if chart_name == 'weekly_overview':
+        return {
+            'reviews': [(review.get('week'), review.get('overall_mood'), review.get('overall_productivity')) for review in weekly_reviews],
+            'daily_moods': columns('mood'),
+        }
+    if chart_name == 'metrics':
+        schema = load_metric_schema()
+        return {
+            'schema': [metric.to_dict() for metric in schema.metrics],
+            'values': columns(*schema.names),
+        }
+    raise ValueError(f"Unknown chart: {chart_name}")
+
+def chart_key(chart_name: str, inputs, options: Dict) -> str:
+    """
+    Hash a chart's inputs and options into a content address.
+
+    Args:
+        chart_name: The chart name.
+        inputs: The chart inputs from chart_inputs.
+        options: Rendering options such as the image format.
+
+    Returns:
+        A hex SHA-256 digest.
+    """
+    payload = json.dumps([RENDER_VERSION, chart_name, inputs, options], sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+class FigureCache:
+    """On-disk, content-addressed cache of rendered charts with LRU eviction."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_entries: int = 200, max_bytes: int = 100 * 1024 * 1024):
+        """
+        Initialize the cache.
+
+        Args:
+            cache_dir: The directory holding the cached images. Defaults to
+                "figures" under the cache root.
+            max_entries: The maximum number of cached images.
+            max_bytes: The maximum total size of the cached images.
+        """
+        self.cache_dir = cache_dir or os.path.join(get_cache_root(), "figures")
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def path_for(self, key: str, image_format: str) -> str:
+        """Return the cache path of an image."""
+        return os.path.join(self.cache_dir, f"{key}.{image_format}")
+
+    def lookup(self, key: str, image_format: str) -> Optional[str]:
+        """
+        Look an image up, marking it as recently used.
+
+        Args:
+            key: The content address from chart_key.
+            image_format: "png" or "svg".
+
+        Returns:
+            The cached path, or None on a miss.
+        """
+        path = self.path_for(key, image_format)
+        if os.path.exists(path):
+            # The modification time doubles as the LRU timestamp
+            os.utime(path)
+            self.hits += 1
+            return path
+        self.misses += 1
+        return None
+
+    def evict(self) -> int:
+        """
+        Remove the least recently used images until the cache fits its limits.
+
+        Returns:
+            The number of images removed.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.tmp') or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        removed = 0
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_bytes -= size
+            removed += 1
+        return removed
+
+    def export(self, cached_path: str, output_path: str) -> str:
+        """Copy a cached image to an output path."""
+        shutil.copyfile(cached_path, output_path)
+        return output_path
@@ -0,0 +1,277 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+
+from stats import parse_log_date
+from interval_index import parse_week_interval
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily_logs (
+    user TEXT NOT NULL,
+    date TEXT NOT NULL,
+    day_of_week TEXT,
+    mood REAL,
+    focus REAL,
+    notes TEXT,
+    PRIMARY KEY (user, date)
+);
+CREATE TABLE IF NOT EXISTS weekly_reviews (
+    user TEXT NOT NULL,
+    week_start TEXT NOT NULL,
+    week_end TEXT NOT NULL,
+    week TEXT NOT NULL,
+    overall_mood REAL,
+    overall_productivity REAL,
+    PRIMARY KEY (user, week_start)
+);
+CREATE INDEX IF NOT EXISTS weekly_reviews_user_end ON weekly_reviews (user, week_end);
+CREATE TABLE IF NOT EXISTS items (
+    user TEXT NOT NULL,
+    entry TEXT NOT NULL,
+    date TEXT NOT NULL,
+    field TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    PRIMARY KEY (user, entry, date, field, position)
+);
+CREATE INDEX IF NOT EXISTS items_user_date ON items (user, date);
+CREATE TABLE IF NOT EXISTS daily_metrics (
+    user TEXT NOT NULL,
+    date TEXT NOT NULL,
+    name TEXT NOT NULL,
+    value REAL NOT NULL,
+    PRIMARY KEY (user, date, name)
+);
+"""
+
+# List fields stored as items, by entry type; daily notes stay on the daily_logs row
+DAILY_ITEM_FIELDS = ('achievements', 'challenges')
+REVIEW_ITEM_FIELDS = ('key_achievements', 'challenges', 'goals_for_next_week')
+
+# Daily log columns; any other numeric field is a configured metric kept in daily_metrics
+DAILY_COLUMNS = ('mood', 'focus')
+
+class StoredHistory(NamedTuple):
+    """The daily logs and weekly reviews of one user, read from a HistoryStore."""
+    daily_logs: List[Dict]
+    weekly_reviews: List[Dict]
+
+def _iso(date: Optional[datetime]) -> Optional[str]:
+    """Return the ISO day of a datetime, or None."""
+    return date.strftime('%Y-%m-%d') if date else None
+
+def _display_date(iso_date: str) -> str:
+    """Format an ISO day the way the document writes it, e.g. "March 1, 2023"."""
+    date = datetime.strptime(iso_date, '%Y-%m-%d')
+    return f"{date:%B} {date.day}, {date.year}"
+
+class HistoryStore:
+    """
+    A SQLite store of parsed daily logs and weekly reviews for many users.
+
+    Every table is keyed by (user, date), so per-user date windows are
+    index range scans. A connection is shared between threads behind a lock.
+    """
+
+    def __init__(self, path: str):
+        """
+        Open the store, creating the database and tables if needed.
+
+        Args:
+            path: The SQLite database file (":memory:" for a temporary store).
+        """
+        self.path = path
+        if path != ":memory:" and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.executescript(SCHEMA)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.connection.close()
+
+    def upsert_document(self, user: str, daily_logs: List[Dict], weekly_reviews: List[Dict]) -> Dict:
+        """
+        Insert or update every entry of one parsed document in a single transaction.
+
+        The document is the user's whole history: the items and configured
+        metrics of each upserted entry are replaced, and entries no longer
+        in the document are deleted, as in snapshot.ParsedSnapshot.merge.
+        Daily logs without a valid date and reviews without a parseable
+        week are skipped; if a date or week appears twice, the later entry
+        wins.
+
+        Args:
+            user: The user the document belongs to.
+            daily_logs: The parsed daily logs.
+            weekly_reviews: The parsed weekly reviews.
+
+        Returns:
+            The number of daily logs, weekly reviews, items and metric values
+            written.
+        """
+        # Key the entries first, so a repeated date or week is written once
+        logs_by_date = {}
+        for log in daily_logs:
+            date = _iso(parse_log_date(log.get('date')))
+            if date is not None:
+                logs_by_date[date] = log
+        reviews_by_start = {}
+        for review in weekly_reviews:
+            interval = parse_week_interval(review.get('week'))
+            if interval is not None:
+                reviews_by_start[_iso(interval[0])] = (_iso(interval[1]), review)
+
+        log_rows, review_rows, item_rows, metric_rows = [], [], [], []
+        for date, log in logs_by_date.items():
+            log_rows.append((user, date, log.get('day_of_week'), log.get('mood'), log.get('focus'), log.get('notes')))
+            for field in DAILY_ITEM_FIELDS:
+                item_rows.extend((user, 'daily', date, field, position, text)
+                                 for position, text in enumerate(log.get(field, [])))
+            metric_rows.extend((user, date, name, value) for name, value in log.items()
+                               if name not in DAILY_COLUMNS and isinstance(value, (int, float)))
+
+        for start, (end, review) in reviews_by_start.items():
+            review_rows.append((user, start, end, review['week'],
+                                review.get('overall_mood'), review.get('overall_productivity')))
+            for field in REVIEW_ITEM_FIELDS:
+                item_rows.extend((user, 'review', start, field, position, text)
+                                 for position, text in enumerate(review.get(field, [])))
+
+        with self.lock, self.connection:
+            # Delete the entries removed from the document, with their items and metrics
+            stored_dates = self.connection.execute("SELECT date FROM daily_logs WHERE user = ?", (user,)).fetchall()
+            deleted_dates = [(user, date) for date, in stored_dates if date not in logs_by_date]
+            stored_starts = self.connection.execute("SELECT week_start FROM weekly_reviews WHERE user = ?", (user,)).fetchall()
+            deleted_starts = [(user, start) for start, in stored_starts if start not in reviews_by_start]
+            self.connection.executemany("DELETE FROM daily_logs WHERE user = ? AND date = ?", deleted_dates)
+            self.connection.executemany("DELETE FROM items WHERE user = ? AND entry = 'daily' AND date = ?", deleted_dates)
+            self.connection.executemany("DELETE FROM daily_metrics WHERE user = ? AND date = ?", deleted_dates)
+            self.connection.executemany("DELETE FROM weekly_reviews WHERE user = ? AND week_start = ?", deleted_starts)
+            self.connection.executemany("DELETE FROM items WHERE user = ? AND entry = 'review' AND date = ?", deleted_starts)
+
+            self.connection.executemany(
+                "INSERT INTO daily_logs (user, date, day_of_week, mood, focus, notes) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (user, date) DO UPDATE SET day_of_week = excluded.day_of_week, "
+                "mood = excluded.mood, focus = excluded.focus, notes = excluded.notes",
+                log_rows)
+            self.connection.executemany(
+                "INSERT INTO weekly_reviews (user, week_start, week_end, week, overall_mood, overall_productivity) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (user, week_start) DO UPDATE SET week_end = excluded.week_end, "
+                "week = excluded.week, overall_mood = excluded.overall_mood, "
+                "overall_productivity = excluded.overall_productivity",
+                review_rows)
+            # Replace the items of every upserted entry, so removed list entries disappear too
+            self.connection.executemany("DELETE FROM items WHERE user = ? AND entry = 'daily' AND date = ?",
+                                        [(user, row[1]) for row in log_rows])
+            self.connection.executemany("DELETE FROM items WHERE user = ? AND entry = 'review' AND date = ?",
+                                        [(user, row[1]) for row in review_rows])
+            self.connection.executemany("INSERT INTO items (user, entry, date, field, position, text) "
+                                        "VALUES (?, ?, ?, ?, ?, ?)", item_rows)
+            self.connection.executemany("DELETE FROM daily_metrics WHERE user = ? AND date = ?",
+                                        [(user, row[1]) for row in log_rows])
+            self.connection.executemany("INSERT INTO daily_metrics (user, date, name, value) VALUES (?, ?, ?, ?)",
+                                        metric_rows)
+
+        return {'daily_logs': len(log_rows), 'weekly_reviews': len(review_rows), 'items': len(item_rows),
+                'metrics': len(metric_rows)}
+
+    def _items(self, user: str, entry: str, start: str, end: str) -> Dict[str, Dict[str, List[str]]]:
+        """Return the items of one entry type in a date range, by date and field."""
+        items: Dict[str, Dict[str, List[str]]] = {}
+        rows = self.connection.execute(
+            "SELECT date, field, text FROM items WHERE user = ? AND entry = ? AND date BETWEEN ? AND ? "
+            "ORDER BY date, field, position",
+            (user, entry, start, end))
+        for date, field, text in rows:
+            items.setdefault(date, {}).setdefault(field, []).append(text)
+        return items
+
+    def _metrics(self, user: str, start: str, end: str) -> Dict[str, Dict[str, float]]:
+        """Return the configured metric values in a date range, by date, in the order they were logged."""
+        metrics: Dict[str, Dict[str, float]] = {}
+        rows = self.connection.execute(
+            "SELECT date, name, value FROM daily_metrics WHERE user = ? AND date BETWEEN ? AND ? ORDER BY date, rowid",
+            (user, start, end))
+        for date, name, value in rows:
+            metrics.setdefault(date, {})[name] = value
+        return metrics
+
+    def daily_logs(self, user: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict]:
+        """
+        Return a user's daily logs in a date window, in the parser's format.
+
+        Args:
+            user: The user.
+            start: The first day to include; the beginning of history if None.
+            end: The last day to include; the end of history if None.
+
+        Returns:
+            The daily logs, sorted by date. List fields are always present,
+            empty if nothing was listed.
+        """
+        start_key, end_key = _iso(start) or "0000-00-00", _iso(end) or "9999-99-99"
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT date, day_of_week, mood, focus, notes FROM daily_logs "
+                "WHERE user = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (user, start_key, end_key)).fetchall()
+            items = self._items(user, 'daily', start_key, end_key)
+            metrics = self._metrics(user, start_key, end_key)
+
+        logs = []
+        for date, day_of_week, mood, focus, notes in rows:
+            log = {'day_of_week': day_of_week, 'date': _display_date(date), 'mood': mood, 'focus': focus}
+            log.update(metrics.get(date, {}))
+            log.update((field, items.get(date, {}).get(field, [])) for field in DAILY_ITEM_FIELDS)
+            log['notes'] = notes
+            logs.append({key: value for key, value in log.items() if value is not None})
+        return logs
+
+    def weekly_reviews(self, user: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict]:
+        """
+        Return a user's weekly reviews that overlap a date window.
+
+        Args:
+            user: The user.
+            start: The first day of the window; the beginning of history if None.
+            end: The last day of the window; the end of history if None.
+
+        Returns:
+            The weekly reviews, sorted by week.
+        """
+        start_key, end_key = _iso(start) or "0000-00-00", _iso(end) or "9999-99-99"
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT week_start, week, overall_mood, overall_productivity FROM weekly_reviews "
+                "WHERE user = ? AND week_end >= ? AND week_start <= ? ORDER BY week_start",
+                (user, start_key, end_key)).fetchall()
+            items = self._items(user, 'review', rows[0][0], rows[-1][0]) if rows else {}
+
+        reviews = []
+        for week_start, week, overall_mood, overall_productivity in rows:
+            review = {'week': week, 'overall_mood': overall_mood, 'overall_productivity': overall_productivity}
+            review.update((field, items.get(week_start, {}).get(field, [])) for field in REVIEW_ITEM_FIELDS)
+            reviews.append({key: value for key, value in review.items() if value is not None})
+        return reviews
+
+    def history(self, user: str) -> StoredHistory:
+        """Return a user's whole history, for the dashboard."""
+        return StoredHistory(self.daily_logs(user), self.weekly_reviews(user))
+
+    def users(self) -> List[str]:
+        """Return every user with stored daily logs or weekly reviews."""
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT user FROM daily_logs UNION SELECT user FROM weekly_reviews ORDER BY user").fetchall()
+        return [row[0] for row in rows]
+
+def store_from_env() -> Optional[HistoryStore]:
+    """Return the HistoryStore at the HISTORY_DB environment variable, or None if it is unset."""
+    path = os.environ.get("HISTORY_DB")
+    return HistoryStore(path) if path else None
@@ -0,0 +1,181 @@
+import re
+import math
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from stats import RATING_METRICS, parse_log_date
+
+# The ordinal of the datetime64 epoch, to turn day counts into date ordinals
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+WEEK_RANGE_PATTERN = re.compile(r'([A-Za-z]+)\s+(\d{1,2})-(\d{1,2}),\s+(\d{4})')
+
+def parse_week_interval(week_str: Optional[str]) -> Optional[Tuple[datetime, datetime]]:
+    """
+    Parse the date interval of a weekly review.
+
+    Args:
+        week_str: A week string such as "March 1-7, 2023". An end day smaller
+            than the start day ("March 29-4, 2023") rolls into the next month.
+
+    Returns:
+        The (start, end) dates, both inclusive, or None if the string cannot
+        be parsed.
+    """
+    if not week_str:
+        return None
+
+    match = WEEK_RANGE_PATTERN.search(week_str)
+    if not match:
+        return None
+
+    month, start_day, end_day, year = match.groups()
+    try:
+        start = datetime.strptime(f"{month} {start_day}, {year}", '%B %d, %Y')
+        if int(end_day) >= int(start_day):
+            end = start.replace(day=int(end_day))
+        else:
+            next_month = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+            end = next_month.replace(day=int(end_day))
+    except ValueError:
+        return None
+
+    return start, end
+
+class IntervalIndex:
+    """
+    Sorted index of closed date intervals supporting overlap queries.
+
+    Intervals are kept sorted by start date. Since an interval overlapping
+    [a, b] must start within [a - longest interval, b], a query is two binary
+    searches plus a scan of that slice: O(log n + k) for intervals of bounded
+    length, such as weekly reviews.
+    """
+
+    def __init__(self, intervals: Optional[List[Tuple[datetime, datetime, Dict]]] = None):
+        """
+        Initialize the index.
+
+        Args:
+            intervals: (start, end, item) tuples to index.
+        """
+        entries = sorted(intervals or [], key=lambda entry: (entry[0], entry[1]))
+        self._starts = [start.toordinal() for start, _, _ in entries]
+        self._ends = [end.toordinal() for _, end, _ in entries]
+        self._items = [item for _, _, item in entries]
+        self._max_length = max((end - start for start, end in zip(self._starts, self._ends)), default=0)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def items(self) -> List[Dict]:
+        """Return all indexed items in start-date order."""
+        return list(self._items)
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Dict]:
+        """
+        Return the items whose interval overlaps [start, end].
+
+        Args:
+            start: The first date of the window (inclusive).
+            end: The last date of the window (inclusive).
+
+        Returns:
+            The overlapping items in start-date order.
+        """
+        first, last = start.toordinal(), end.toordinal()
+        lower = bisect_left(self._starts, first - self._max_length)
+        upper = bisect_right(self._starts, last)
+        return [self._items[i] for i in range(lower, upper) if self._ends[i] >= first]
+
+    def containing(self, date: datetime) -> List[Dict]:
+        """
+        Return the items whose interval contains a date.
+
+        Args:
+            date: The date to look up.
+
+        Returns:
+            The matching items in start-date order.
+        """
+        return self.overlapping(date, date)
+
+class DailyLogIndex:
+    """Sorted index of daily logs by date for O(log n + k) range lookups."""
+
+    def __init__(self, daily_logs: Union[List[Dict], np.ndarray]):
+        """
+        Initialize the index.
+
+        Args:
+            daily_logs: A list of dictionaries, each representing a daily log,
+                or the daily_logs structured array of a log archive, whose
+                rows are indexed as dictionaries holding only their mood and
+                focus. Logs without a valid date are left out.
+        """
+        if isinstance(daily_logs, np.ndarray):
+            records = daily_logs[~np.isnat(daily_logs['date'])]
+            records = records[np.argsort(records['date'], kind='stable')]
+            self._days = (records['date'].astype('datetime64[D]').astype(int) + EPOCH_ORDINAL).tolist()
+            ratings = zip(*(records[metric].tolist() for metric in RATING_METRICS))
+            self._logs = [{metric: value for metric, value in zip(RATING_METRICS, values) if not math.isnan(value)}
+                          for values in ratings]
+            return
+
+        dated = [(parse_log_date(log.get('date')), log) for log in daily_logs]
+        dated = sorted(((date, log) for date, log in dated if date is not None), key=lambda item: item[0])
+        self._days = [date.toordinal() for date, _ in dated]
+        self._logs = [log for _, log in dated]
+
+    def between(self, start: datetime, end: datetime) -> List[Dict]:
+        """
+        Return the logs dated within [start, end].
+
+        Args:
+            start: The first date (inclusive).
+            end: The last date (inclusive).
+
+        Returns:
+            The matching logs in date order.
+        """
+        lower = bisect_left(self._days, start.toordinal())
+        upper = bisect_right(self._days, end.toordinal())
+        return self._logs[lower:upper]
+
+def build_review_index(weekly_reviews: List[Dict]) -> IntervalIndex:
+    """
+    Build an interval index over weekly reviews.
+
+    Args:
+        weekly_reviews: A list of dictionaries, each representing a weekly
+            review. Reviews without a parseable week are left out.
+
+    Returns:
+        The interval index.
+    """
+    intervals = []
+    for review in weekly_reviews:
+        interval = parse_week_interval(review.get('week'))
+        if interval:
+            intervals.append((interval[0], interval[1], review))
+    return IntervalIndex(intervals)
+
+def logs_for_review(review: Dict, day_index: DailyLogIndex) -> List[Dict]:
+    """
+    Return the daily logs covered by a weekly review.
+
+    Args:
+        review: A dictionary representing a weekly review.
+        day_index: The index of daily logs.
+
+    Returns:
+        The daily logs within the review's week, or an empty list if its week
+        cannot be parsed.
+    """
+    interval = parse_week_interval(review.get('week'))
+    if not interval:
+        return []
+    return day_index.between(*interval)
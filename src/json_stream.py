@@ -0,0 +1,127 @@
+import re
+import time
+import codecs
+from json.decoder import JSONDecodeError, scanstring
+from typing import Iterable, Iterator
+
+# One token after optional whitespace: punctuation, the start of a string, or a scalar
+_TOKEN = re.compile(r'[ \t\n\r]*(?:([{}\[\],:])|(")|(-?[0-9][0-9.eE+\-]*|true|false|null))')
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+def iter_string_values(chunks: Iterable[bytes], parent_key: str, key: str) -> Iterator[str]:
+    """
+    Incrementally decode a JSON byte stream, yielding selected string values.
+
+    Yields every string stored under `key` in an object that is itself
+    stored under `parent_key`, e.g. parent_key="textRun", key="content"
+    yields each text run of a Docs response. Nothing but the container
+    nesting and the current chunk is kept in memory, so the full document
+    tree is never built.
+
+    Args:
+        chunks: The response body, in chunks of any size.
+        parent_key: The key of the enclosing object.
+        key: The key of the string values to yield.
+
+    Yields:
+        The matching string values, in document order.
+
+    Raises:
+        ValueError: If the stream is not valid JSON.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    # One entry per open container: [is_object, current key, expecting a key]
+    stack = []
+    buffer = ""
+    position = 0
+
+    def parse(final: bool) -> Iterator[str]:
+        nonlocal buffer, position
+        length = len(buffer)
+        while True:
+            match = _TOKEN.match(buffer, position)
+            if match is None:
+                end = _WHITESPACE.match(buffer, position).end()
+                if end == length:
+                    position = end
+                    return
+                if not final and length - end < 5:
+                    # A literal such as "true" or "-1" may continue in the next chunk
+                    return
+                raise ValueError(f"Invalid JSON at offset {end}: {buffer[end:end + 20]!r}")
+
+            punctuation, quote, scalar = match.groups()
+            if punctuation:
+                position = match.end()
+                if punctuation == '{':
+                    stack.append([True, None, True])
+                elif punctuation == '[':
+                    stack.append([False, None, False])
+                elif punctuation in '}]':
+                    if not stack:
+                        raise ValueError(f"Unbalanced {punctuation!r} in JSON stream")
+                    stack.pop()
+                elif punctuation == ',' and stack and stack[-1][0]:
+                    stack[-1][2] = True
+            elif quote:
+                try:
+                    value, end = scanstring(buffer, match.end())
+                except JSONDecodeError:
+                    if final:
+                        raise ValueError("Unterminated string in JSON stream")
+                    # The string continues in the next chunk
+                    return
+                position = end
+                top = stack[-1] if stack else None
+                if top is not None and top[0] and top[2]:
+                    top[1], top[2] = value, False
+                elif (top is not None and top[1] == key and len(stack) >= 2
+                      and stack[-2][0] and stack[-2][1] == parent_key):
+                    yield value
+            else:
+                if match.end() == length and not final:
+                    # A number may continue in the next chunk
+                    return
+                position = match.end()
+
+    for chunk in chunks:
+        buffer = buffer[position:] + decoder.decode(chunk)
+        position = 0
+        yield from parse(final=False)
+    buffer = buffer[position:] + decoder.decode(b'', final=True)
+    position = 0
+    yield from parse(final=True)
+    if stack:
+        raise ValueError("Truncated JSON stream")
+
+class CountingChunks:
+    """Wraps a chunk iterator, counting bytes and the time spent waiting for chunks."""
+
+    def __init__(self, chunks: Iterable[bytes], clock=None):
+        """
+        Initialize the wrapper.
+
+        Args:
+            chunks: The chunks to pass through.
+            clock: A function returning seconds; time.perf_counter if None.
+        """
+        self.chunks = iter(chunks)
+        self.clock = clock or time.perf_counter
+        self.bytes = 0
+        self.wait_seconds = 0.0
+
+    def __iter__(self) -> "CountingChunks":
+        return self
+
+    def __next__(self) -> bytes:
+        start = self.clock()
+        try:
+            chunk = next(self.chunks)
+        finally:
+            self.wait_seconds += self.clock() - start
+        self.bytes += len(chunk)
+        return chunk
+
+def iter_text_runs(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Yield the textRun contents of a streamed documents.get response."""
+    return iter_string_values(chunks, 'textRun', 'content')
@@ -0,0 +1,329 @@
+import os
+import sys
+import json
+import time
+import contextlib
+from datetime import datetime
+from typing import Dict, IO, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from stats import parse_log_date
+from interval_index import parse_week_interval
+
+ARCHIVE_VERSION = 1
+
+# One row per dated daily log; list fields live in the items table and
+# configured metrics (see metric_schema) add f8 fields after focus
+DAILY_LOG_DTYPE = np.dtype([
+    ('date', 'datetime64[D]'),
+    ('mood', 'f8'),
+    ('focus', 'f8'),
+    ('achievements', 'i4'),
+    ('challenges', 'i4'),
+    ('items_start', 'i8'),
+    ('items_end', 'i8'),
+])
+
+# One row per weekly review with a parseable week
+WEEKLY_REVIEW_DTYPE = np.dtype([
+    ('week_start', 'datetime64[D]'),
+    ('week_end', 'datetime64[D]'),
+    ('overall_mood', 'f8'),
+    ('overall_productivity', 'f8'),
+    ('items_start', 'i8'),
+    ('items_end', 'i8'),
+])
+
+# One row per list entry or note: a byte span of the UTF-8 text blob
+ITEM_DTYPE = np.dtype([
+    ('kind', 'u1'),
+    ('start', 'i8'),
+    ('end', 'i8'),
+])
+
+# Item kinds, by record type: (dictionary key, is a list)
+DAILY_ITEM_FIELDS = (('achievements', True), ('challenges', True), ('notes', False))
+REVIEW_ITEM_FIELDS = (('key_achievements', True), ('challenges', True), ('goals_for_next_week', True))
+
+ARRAY_FILES = {
+    'daily_logs': "daily_logs.npy",
+    'weekly_reviews': "weekly_reviews.npy",
+    'items': "items.npy",
+    'text': "text.npy",
+}
+MANIFEST_FILE = "manifest.json"
+
+def daily_log_dtype(metrics: Sequence[str] = ()) -> np.dtype:
+    """Return the daily log dtype with an f8 field for each metric it does not already have."""
+    fields = DAILY_LOG_DTYPE.descr
+    extra = [(name, 'f8') for name in metrics if name not in DAILY_LOG_DTYPE.names]
+    return np.dtype(fields[:3] + extra + fields[3:])
+
+def iter_records(daily_logs: List[Dict], weekly_reviews: List[Dict]) -> Iterator[Dict]:
+    """Yield the parsed logs as typed records, daily logs first."""
+    for log in daily_logs:
+        yield {'type': 'DailyLog', **log}
+    for review in weekly_reviews:
+        yield {'type': 'WeeklyReview', **review}
+
+def write_ndjson(daily_logs: List[Dict], weekly_reviews: List[Dict], stream: IO[str]) -> int:
+    """
+    Write the parsed logs as newline-delimited JSON, one record per line.
+
+    Records are written as they are produced, so the output never exists as
+    one string in memory.
+
+    Args:
+        daily_logs: The parsed daily logs.
+        weekly_reviews: The parsed weekly reviews.
+        stream: A text stream to write to.
+
+    Returns:
+        The number of records written.
+    """
+    count = 0
+    for record in iter_records(daily_logs, weekly_reviews):
+        stream.write(json.dumps(record, ensure_ascii=False))
+        stream.write("\n")
+        count += 1
+    return count
+
+class _TextBlob:
+    """Accumulates item text as one UTF-8 byte string with per-item spans."""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+        self.items = []
+
+    def add(self, kind: int, text: str) -> None:
+        data = text.encode('utf-8')
+        self.items.append((kind, self.size, self.size + len(data)))
+        self.chunks.append(data)
+        self.size += len(data)
+
+    def add_fields(self, record: Dict, fields: Tuple[Tuple[str, bool], ...], kind_offset: int) -> Tuple[int, int]:
+        """Add the item fields of a record and return its (items_start, items_end)."""
+        start = len(self.items)
+        for index, (key, is_list) in enumerate(fields):
+            value = record.get(key)
+            if not value:
+                continue
+            for text in (value if is_list else [value]):
+                self.add(kind_offset + index, text)
+        return start, len(self.items)
+
+def write_archive(daily_logs: List[Dict], weekly_reviews: List[Dict], path: str, metrics: Sequence[str] = ()) -> Dict:
+    """
+    Write the parsed logs as a directory of NumPy structured arrays.
+
+    Every array is a plain .npy file without Python objects, so the archive
+    opens with np.load(mmap_mode='r') in constant time, whatever its size.
+    Daily logs without a valid date and weekly reviews without a parseable
+    week are skipped; both are ignored by the statistics and charts anyway.
+
+    Args:
+        daily_logs: The parsed daily logs.
+        weekly_reviews: The parsed weekly reviews.
+        path: The archive directory, created if needed.
+        metrics: The configured metric names to store a column for, besides
+            mood and focus.
+
+    Returns:
+        The archive manifest.
+    """
+    blob = _TextBlob()
+    dtype = daily_log_dtype(metrics)
+    extra_metrics = [name for name in dtype.names if name not in DAILY_LOG_DTYPE.names]
+
+    daily_rows = []
+    for log in daily_logs:
+        date = parse_log_date(log.get('date'))
+        if date is None:
+            continue
+        items_start, items_end = blob.add_fields(log, DAILY_ITEM_FIELDS, 0)
+        daily_rows.append((
+            np.datetime64(date.date(), 'D'),
+            log.get('mood', np.nan),
+            log.get('focus', np.nan),
+            *(log.get(name, np.nan) for name in extra_metrics),
+            len(log.get('achievements', [])),
+            len(log.get('challenges', [])),
+            items_start,
+            items_end,
+        ))
+
+    review_rows = []
+    for review in weekly_reviews:
+        interval = parse_week_interval(review.get('week'))
+        if interval is None:
+            continue
+        items_start, items_end = blob.add_fields(review, REVIEW_ITEM_FIELDS, len(DAILY_ITEM_FIELDS))
+        review_rows.append((
+            np.datetime64(interval[0].date(), 'D'),
+            np.datetime64(interval[1].date(), 'D'),
+            review.get('overall_mood', np.nan),
+            review.get('overall_productivity', np.nan),
+            items_start,
+            items_end,
+        ))
+
+    arrays = {
+        'daily_logs': np.array(daily_rows, dtype=dtype),
+        'weekly_reviews': np.array(review_rows, dtype=WEEKLY_REVIEW_DTYPE),
+        'items': np.array(blob.items, dtype=ITEM_DTYPE),
+        'text': np.frombuffer(b"".join(blob.chunks), dtype=np.uint8),
+    }
+
+    os.makedirs(path, exist_ok=True)
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(path, ARRAY_FILES[name]), array)
+
+    manifest = {
+        'version': ARCHIVE_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'daily_logs': len(daily_rows),
+        'weekly_reviews': len(review_rows),
+        'items': len(blob.items),
+        'text_bytes': blob.size,
+        'metrics': extra_metrics,
+    }
+    # The manifest goes last, so a readable manifest means a complete archive
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+class LogArchive:
+    """
+    A memory-mapped archive of parsed logs written by write_archive.
+
+    The structured arrays are used in place: `daily_logs` can be passed
+    straight to stats.build_daily_series, stats.compute_trend_stats,
+    anomalies.detect_anomalies and the dashboard charts, and the dashboard
+    accepts the archive itself. daily_log_dicts() and
+    weekly_review_dicts() rebuild the parser's dictionaries when needed.
+    """
+
+    def __init__(self, path: str, mmap_mode: Optional[str] = 'r'):
+        """
+        Open an archive.
+
+        Args:
+            path: The archive directory.
+            mmap_mode: Passed to np.load; None reads the arrays into memory.
+
+        Raises:
+            FileNotFoundError: If the directory holds no complete archive.
+            ValueError: If the archive was written by an unsupported version.
+        """
+        manifest_path = os.path.join(path, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            raise FileNotFoundError(f"No log archive at {path}")
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            self.manifest = json.load(f)
+        if self.manifest.get('version') != ARCHIVE_VERSION:
+            raise ValueError(f"Unsupported log archive version {self.manifest.get('version')} in {path}")
+
+        self.path = path
+        self.daily_logs = np.load(os.path.join(path, ARRAY_FILES['daily_logs']), mmap_mode=mmap_mode)
+        self.weekly_reviews = np.load(os.path.join(path, ARRAY_FILES['weekly_reviews']), mmap_mode=mmap_mode)
+        self.items = np.load(os.path.join(path, ARRAY_FILES['items']), mmap_mode=mmap_mode)
+        self.text = np.load(os.path.join(path, ARRAY_FILES['text']), mmap_mode=mmap_mode)
+
+        # Mood, focus and the configured metrics the archive was written with
+        self.metrics = ['mood', 'focus'] + self.manifest.get('metrics', [])
+
+    def item_text(self, index: int) -> str:
+        """Return the text of one item."""
+        item = self.items[index]
+        return self.text[item['start']:item['end']].tobytes().decode('utf-8')
+
+    def _item_fields(self, row, fields: Tuple[Tuple[str, bool], ...], kind_offset: int) -> Dict:
+        """Rebuild the list and text fields of one record from its items."""
+        record = {}
+        for index in range(int(row['items_start']), int(row['items_end'])):
+            key, is_list = fields[int(self.items[index]['kind']) - kind_offset]
+            if is_list:
+                record.setdefault(key, []).append(self.item_text(index))
+            else:
+                record[key] = self.item_text(index)
+        return record
+
+    def daily_log_dicts(self) -> List[Dict]:
+        """Rebuild the daily logs in the parser's dictionary format."""
+        logs = []
+        for row in self.daily_logs:
+            date = row['date'].astype(datetime)
+            log = {'day_of_week': date.strftime('%A'), 'date': f"{date:%B} {date.day}, {date.year}"}
+            for key in self.metrics:
+                if not np.isnan(row[key]):
+                    log[key] = float(row[key])
+            log.update(self._item_fields(row, DAILY_ITEM_FIELDS, 0))
+            logs.append(log)
+        return logs
+
+    def weekly_review_dicts(self, with_items: bool = True) -> List[Dict]:
+        """Rebuild the weekly reviews in the parser's dictionary format; with_items=False leaves out the list fields."""
+        reviews = []
+        for row in self.weekly_reviews:
+            start = row['week_start'].astype(datetime)
+            end = row['week_end'].astype(datetime)
+            review = {'week': f"{start:%B} {start.day}-{end.day}, {start.year}"}
+            for key in ('overall_mood', 'overall_productivity'):
+                if not np.isnan(row[key]):
+                    review[key] = float(row[key])
+            if with_items:
+                review.update(self._item_fields(row, REVIEW_ITEM_FIELDS, len(DAILY_ITEM_FIELDS)))
+            reviews.append(review)
+        return reviews
+
+def main(export_format: str, output: Optional[str] = None):
+    """
+    Export the parsed logs of the Google Doc in GOOGLE_DOC_ID.
+
+    Args:
+        export_format: "ndjson" or "archive".
+        output: The output file for "ndjson" ('-' or None for stdout), or the
+            output directory for "archive".
+    """
+    from data_parser import ProductivityDataParser
+
+    if export_format == "archive" and not output:
+        print("Error: --export archive requires --export-output DIR.")
+        return
+
+    document_id = os.environ.get("GOOGLE_DOC_ID")
+    if not document_id:
+        document_id = input("Enter your Google Doc ID: ")
+
+    # Progress goes to stderr so NDJSON on stdout stays clean
+    log = sys.stderr if export_format == "ndjson" and output in (None, "-") else sys.stdout
+    with contextlib.redirect_stdout(log):
+        from productivity_tracker import read_google_doc
+        doc_content = read_google_doc(document_id)
+    if not doc_content:
+        print("Failed to read the Google Doc. Please check your credentials and document ID.", file=log)
+        return
+
+    parser = ProductivityDataParser()
+    daily_logs = parser.parse_daily_logs(doc_content)
+    weekly_reviews = parser.parse_weekly_reviews(doc_content)
+
+    start = time.perf_counter()
+    if export_format == "ndjson":
+        if output in (None, "-"):
+            count = write_ndjson(daily_logs, weekly_reviews, sys.stdout)
+        else:
+            with open(output, 'w', encoding='utf-8') as f:
+                count = write_ndjson(daily_logs, weekly_reviews, f)
+        print(f"Exported {count} records in {time.perf_counter() - start:.2f}s", file=log)
+    elif export_format == "archive":
+        manifest = write_archive(daily_logs, weekly_reviews, output, parser.schema.names)
+        print(f"Archived {manifest['daily_logs']} daily logs and {manifest['weekly_reviews']} weekly reviews "
+              f"to {output} in {time.perf_counter() - start:.2f}s")
+    else:
+        raise ValueError(f"Unknown export format: {export_format}")
@@ -14,13 +14,88 @@ def main():
     parser.add_argument("--analyze", action="store_true", help="Run the productivity tracker to analyze your data")
     parser.add_argument("--dashboard", action="store_true", help="Run the dashboard to visualize your data")
     parser.add_argument("--doc-id", type=str, help="Google Doc ID to analyze")
-    parser.add_argument("--analysis-type", type=str, choices=["weekly", "monthly", "both"], default="both",
-                        help="Type of analysis to generate (weekly, monthly, or both)")
+    parser.add_argument("--analysis-type", type=str, choices=["weekly", "monthly", "quarterly", "yearly", "both"], default="both",
+                        help="Type of analysis to generate (weekly, monthly, quarterly, yearly, or both)")
     parser.add_argument("--write-to-doc", action="store_true", help="Write the analysis back to the Google Doc")
     parser.add_argument("--automated", action="store_true", help="Run in automated mode without user prompts")
+    parser.add_argument("--combined", action="store_true",
+                        help="With --analysis-type both, generate the weekly and monthly analyses in a single Gemini request")
+    parser.add_argument("--search", type=str, metavar="QUERY",
+                        help="Search achievements, challenges and notes in the locally indexed logs")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of search results")
+    parser.add_argument("--output", type=str, metavar="DIR",
+                        help="Render the dashboard headlessly to this directory instead of showing it")
+    parser.add_argument("--format", type=str, choices=["png", "svg"], default="png",
+                        help="Image format for --output (png or svg)")
+    parser.add_argument("--batch", type=str, metavar="FILE",
+                        help="Render dashboards for every 'name,doc_id' line in FILE (requires --output)")
+    parser.add_argument("--workers", type=int, help="Number of worker processes for headless rendering")
+    parser.add_argument("--serve", action="store_true", help="Serve the dashboard and statistics over a local HTTP server")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Interface for --serve to bind")
+    parser.add_argument("--port", type=int, default=8050, help="Port for --serve to listen on")
+    parser.add_argument("--poll-interval", type=int, default=60,
+                        help="Seconds between document revision checks for --serve and --watch")
+    parser.add_argument("--watch", action="store_true",
+                        help="Run as a long-lived daemon that polls the document and runs analyses on a schedule")
+    parser.add_argument("--weekly-at", type=str, default="fri 04:23",
+                        help="When --watch runs the weekly analysis, as 'DAY HH:MM' in UTC ('none' to disable)")
+    parser.add_argument("--monthly-at", type=str, default="none",
+                        help="When --watch runs the monthly analysis, as 'DAY_OF_MONTH HH:MM' in UTC ('none' to disable)")
+    parser.add_argument("--on-change", type=str, nargs="+", choices=["weekly", "monthly"], default=[],
+                        help="Analyses --watch runs whenever new entries appear in the document")
+    parser.add_argument("--backfill", action="store_true",
+                        help="Generate weekly/monthly analyses for every past period since --since")
+    parser.add_argument("--since", type=str, metavar="YYYY-MM-DD", help="First day covered by --backfill")
+    parser.add_argument("--until", type=str, metavar="YYYY-MM-DD", help="Last day covered by --backfill (default: today)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                        help="Maximum number of periods --backfill analyzes at once")
+    parser.add_argument("--backfill-output", type=str, metavar="FILE",
+                        help="Write the combined --backfill results to FILE")
+    parser.add_argument("--fetch-strategy", type=str, choices=["full", "fields", "export", "stream"],
+                        help="How documents are downloaded: the full Docs resource, only its text runs (default), "
+                             "a Drive text/plain export, or the text runs decoded as they stream in")
+    parser.add_argument("--export", type=str, choices=["ndjson", "archive"],
+                        help="Export the parsed logs as NDJSON records or as a memory-mappable NumPy archive")
+    parser.add_argument("--export-output", type=str, metavar="PATH",
+                        help="Output file for --export ndjson (default: stdout) or directory for --export archive")
+    parser.add_argument("--archive", type=str, metavar="DIR",
+                        help="Build the --dashboard from a log archive written by --export archive instead of the Google Doc")
+    parser.add_argument("--history-db", type=str, metavar="FILE",
+                        help="Keep every parsed entry in this SQLite history store (shared by all documents)")
+    parser.add_argument("--from-history", action="store_true",
+                        help="Run --analyze or --dashboard on the entries in --history-db instead of fetching the document")
+    parser.add_argument("--cohort", type=str, metavar="FILE",
+                        help="Summarize the team in a 'name,doc_id' batch FILE (chart saved to --output if given)")
+    parser.add_argument("--window", type=int, default=28,
+                        help="Trailing days compared against the team baseline by --cohort")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help="Bound an --analyze run: fetch, parse, Gemini and write each get a share of SECONDS, "
+                             "falling back to the cached snapshot or statistics-only output when one runs out")
+    parser.add_argument("--metric-schema", type=str, metavar="FILE",
+                        help="JSON list of extra metrics (name, scale, aliases) to parse from daily logs besides mood and focus")
+    parser.add_argument("--metrics", type=str, metavar="FILE",
+                        help="Append the per-stage timing record of --analyze/--dashboard runs to FILE ('-' for stdout)")
+    parser.add_argument("--profile", type=str, nargs="?", const="profiles", metavar="DIR",
+                        help="Write a cProfile dump per stage of --analyze/--dashboard runs to DIR (default: profiles)")
     
     args = parser.parse_args()
     
+    # Metrics, profiling, fetch, history store, metric schema and deadline settings are read by the tracker and dashboard from the environment
+    if args.metrics:
+        os.environ["METRICS_FILE"] = args.metrics
+    if args.profile:
+        os.environ["PROFILE_DIR"] = args.profile
+    if args.fetch_strategy:
+        os.environ["DOC_FETCH_STRATEGY"] = args.fetch_strategy
+    if args.history_db:
+        os.environ["HISTORY_DB"] = args.history_db
+    if args.from_history:
+        os.environ["FROM_HISTORY"] = "true"
+    if args.metric_schema:
+        os.environ["HABIT_METRICS_FILE"] = args.metric_schema
+    if args.deadline:
+        os.environ["RUN_DEADLINE"] = str(args.deadline)
+    
     if args.setup:
         # Import and run the setup script
         from setup_credentials import main as setup_main
@@ -47,6 +122,10 @@ def main():
         if args.write_to_doc:
             os.environ["WRITE_TO_DOC"] = "true"
         
+        # If combined was provided, set it as an environment variable
+        if args.combined:
+            os.environ["COMBINED_ANALYSIS"] = "true"
+        
         # Run the tracker with automated flag if specified
         if args.automated:
             tracker_main(automated=True)
@@ -54,6 +133,10 @@ def main():
             tracker_main()
     
     elif args.dashboard:
+        # Headless rendering must select the Agg backend before pyplot is imported
+        if args.output:
+            os.environ["MPLBACKEND"] = "Agg"
+        
         # Import and run the dashboard
         from dashboard import main as dashboard_main
         
@@ -61,7 +144,80 @@ def main():
         if args.doc_id:
             os.environ["GOOGLE_DOC_ID"] = args.doc_id
         
-        dashboard_main()
+        dashboard_main(output_dir=args.output, image_format=args.format, batch_file=args.batch, workers=args.workers,
+                       archive_path=args.archive, from_history=args.from_history)
+    
+    elif args.watch:
+        # Import and run the watch daemon
+        from watcher import main as watch_main
+        
+        # If a doc ID was provided, set it as an environment variable
+        if args.doc_id:
+            os.environ["GOOGLE_DOC_ID"] = args.doc_id
+        
+        watch_main(
+            poll_interval=args.poll_interval,
+            weekly_at=None if args.weekly_at.lower() == "none" else args.weekly_at,
+            monthly_at=None if args.monthly_at.lower() == "none" else args.monthly_at,
+            on_change=args.on_change,
+            write_to_doc=args.write_to_doc or args.automated,
+        )
+    
+    elif args.serve:
+        # The server renders headlessly, so select the Agg backend before pyplot is imported
+        os.environ["MPLBACKEND"] = "Agg"
+        
+        from dashboard_server import main as server_main
+        
+        # If a doc ID was provided, set it as an environment variable
+        if args.doc_id:
+            os.environ["GOOGLE_DOC_ID"] = args.doc_id
+        
+        server_main(host=args.host, port=args.port, poll_interval=args.poll_interval, image_format=args.format)
+    
+    elif args.backfill:
+        if not args.since:
+            parser.error("--backfill requires --since")
+        
+        # Import and run the backfill
+        from backfill import main as backfill_main
+        
+        # If a doc ID was provided, set it as an environment variable
+        if args.doc_id:
+            os.environ["GOOGLE_DOC_ID"] = args.doc_id
+        
+        backfill_main(
+            since=args.since,
+            until=args.until,
+            analysis_type=args.analysis_type,
+            concurrency=args.concurrency,
+            output_file=args.backfill_output,
+            write_to_doc=args.write_to_doc,
+        )
+    
+    elif args.export:
+        # Import and run the export
+        from log_archive import main as export_main
+        
+        # If a doc ID was provided, set it as an environment variable
+        if args.doc_id:
+            os.environ["GOOGLE_DOC_ID"] = args.doc_id
+        
+        export_main(args.export, output=args.export_output)
+    
+    elif args.cohort:
+        # The chart is rendered headlessly, so select the Agg backend before pyplot is imported
+        os.environ["MPLBACKEND"] = "Agg"
+        
+        from cohort import main as cohort_main
+        
+        cohort_main(args.cohort, output_dir=args.output, from_history=args.from_history, window=args.window)
+    
+    elif args.search:
+        # Import and run the search over the local index (no Google Doc fetch)
+        from search_index import main as search_main
+        
+        search_main(args.search, document_id=args.doc_id or os.environ.get("GOOGLE_DOC_ID"), limit=args.limit)
     
     else:
         # If no arguments were provided, show the help message
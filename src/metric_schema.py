@@ -0,0 +1,162 @@
+import os
+import re
+import json
+from typing import Dict, List, Optional, Sequence
+
+class MetricDefinition:
+    """One numeric value people log on a line such as "Sleep: 7.5" or "Mood: 7/10"."""
+
+    def __init__(self, name: str, label: Optional[str] = None, scale: Optional[float] = 10,
+                 aliases: Sequence[str] = (), unit: Optional[str] = None):
+        """
+        Initialize the metric.
+
+        Args:
+            name: The key the value is stored under in parsed logs, e.g. "sleep".
+            label: The name used in prompts and charts; derived from the name
+                if None.
+            scale: The top of the rating scale. Scaled values must be written
+                as "value/scale" (e.g. "7/10"); None accepts any number,
+                optionally followed by a unit word (e.g. "30 min").
+            aliases: The labels recognized in the document, case-sensitive.
+                Defaults to the label.
+            unit: The unit shown after unscaled values, e.g. "min".
+        """
+        self.name = name
+        self.label = label or name.replace('_', ' ').capitalize()
+        self.scale = scale
+        self.aliases = list(aliases) or [self.label]
+        self.unit = unit
+
+    def to_dict(self) -> Dict:
+        """Return the definition as a JSON-serializable dict of its arguments."""
+        return {'name': self.name, 'label': self.label, 'scale': self.scale, 'aliases': self.aliases, 'unit': self.unit}
+
+# The metrics every document has always been parsed for
+DEFAULT_METRICS = [
+    {'name': 'mood', 'label': 'Mood', 'scale': 10},
+    {'name': 'focus', 'label': 'Focus', 'scale': 10},
+]
+
+# Metrics whose keys other modules depend on
+CORE_METRICS = ('mood', 'focus')
+
+class MetricSchema:
+    """
+    A set of metrics compiled into one alternation pattern and a dispatch table.
+
+    Every alias of every metric is one branch of a single regular
+    expression, so an entry is scanned once however many metrics are
+    configured; the matched alias then selects the metric from the table.
+    """
+
+    def __init__(self, metrics: List[MetricDefinition]):
+        """
+        Compile the schema.
+
+        Args:
+            metrics: The metric definitions; names and aliases must be unique.
+
+        Raises:
+            ValueError: If a name or an alias is used twice.
+        """
+        self.metrics = metrics
+        self._names = tuple(metric.name for metric in metrics)
+        self.dispatch: Dict[str, MetricDefinition] = {}
+        names = set()
+        for metric in metrics:
+            if metric.name in names:
+                raise ValueError(f"Duplicate metric name '{metric.name}'")
+            names.add(metric.name)
+            for alias in metric.aliases:
+                if alias in self.dispatch:
+                    raise ValueError(f"Metric alias '{alias}' is used by both '{self.dispatch[alias].name}' and '{metric.name}'")
+                self.dispatch[alias] = metric
+
+        # Longer aliases first, so "Sleep quality" is not read as "Sleep". A
+        # leading \b would stop re from skipping ahead on the aliases' first
+        # characters, so extract checks the word boundary itself.
+        aliases = sorted(self.dispatch, key=len, reverse=True)
+        self.pattern = re.compile(
+            r'(?P<label>' + '|'.join(re.escape(alias) for alias in aliases) + r'):\s*'
+            r'(?P<value>\d+(?:\.\d+)?)(?:/(?P<scale>\d+(?:\.\d+)?))?'
+        )
+
+    @property
+    def names(self) -> List[str]:
+        """The metric names, in schema order."""
+        return list(self._names)
+
+    def get(self, name: str) -> Optional[MetricDefinition]:
+        """Return the metric with a name, or None."""
+        for metric in self.metrics:
+            if metric.name == name:
+                return metric
+        return None
+
+    def extract(self, text: str) -> Dict[str, float]:
+        """
+        Extract every metric from one entry in a single scan.
+
+        The first valid value of each metric wins. A scaled metric only
+        accepts values written on its scale ("7/10" for a 0-10 metric).
+
+        Args:
+            text: The text of one entry.
+
+        Returns:
+            The values by metric name, in schema order.
+        """
+        values = {}
+        remaining = len(self.metrics)
+        for match in self.pattern.finditer(text):
+            start = match.start()
+            if start and (text[start - 1].isalnum() or text[start - 1] == '_'):
+                continue
+            label, value, scale = match.groups()
+            metric = self.dispatch[label]
+            if metric.name in values:
+                continue
+            if metric.scale is not None and (scale is None or float(scale) != metric.scale):
+                continue
+            values[metric.name] = float(value)
+            remaining -= 1
+            if not remaining:
+                break
+        if len(values) < 2:
+            return values
+        return {name: values[name] for name in self._names if name in values}
+
+    def format_value(self, name: str, value) -> str:
+        """Format a value for a prompt, e.g. "7/10" or "30 min"; "N/A" if missing."""
+        if value is None:
+            return 'N/A'
+        metric = self.get(name)
+        if metric is not None and metric.scale is not None:
+            return f"{value:g}/{metric.scale:g}"
+        if metric is not None and metric.unit:
+            return f"{value:g} {metric.unit}"
+        return f"{value:g}"
+
+def load_metric_schema(path: Optional[str] = None) -> MetricSchema:
+    """
+    Load the configured metric schema.
+
+    Args:
+        path: A JSON file holding a list of MetricDefinition keyword dicts.
+            Defaults to the HABIT_METRICS_FILE environment variable;
+            DEFAULT_METRICS is used when neither is set. Mood and focus are
+            always included, with their defaults unless the file redefines
+            them.
+
+    Returns:
+        The compiled schema.
+    """
+    path = path or os.environ.get("HABIT_METRICS_FILE")
+    configs = []
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+    configured = {config['name'] for config in configs}
+    configs = [config for config in DEFAULT_METRICS if config['name'] not in configured] + configs
+    return MetricSchema([MetricDefinition(**config) for config in configs])
@@ -0,0 +1,132 @@
+import os
+import sys
+import json
+import time
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+class Span:
+    """One timed stage of a run, with the sizes recorded while it ran."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.sizes: Dict[str, float] = {}
+        self.error: Optional[str] = None
+
+    def record(self, key: str, value) -> None:
+        """Record a size (e.g. characters fetched) for this stage."""
+        self.sizes[key] = value
+
+    def to_dict(self) -> Dict:
+        """Return the span as a JSON-serializable dict."""
+        result = {'name': self.name, 'seconds': round(self.seconds, 6)}
+        result.update(self.sizes)
+        if self.error:
+            result['error'] = self.error
+        return result
+
+class RunMetrics:
+    """
+    Stage timings and sizes for one run, emitted as a single JSON record.
+
+    Wrap each stage in `with metrics.span("stage") as span:` and record sizes
+    on the span. With a profile directory, every outermost span is also run
+    under cProfile and dumped to "<run>-<stage>.prof" for pstats/snakeviz.
+    """
+
+    def __init__(self, run: str, profile_dir: Optional[str] = None):
+        """
+        Initialize the run metrics.
+
+        Args:
+            run: The run name, e.g. "analyze" or "dashboard".
+            profile_dir: Directory for per-stage cProfile dumps; no profiling
+                if None.
+        """
+        self.run = run
+        self.profile_dir = profile_dir
+        self.started = datetime.now()
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+        self.sizes: Dict[str, float] = {}
+        self.depth = 0
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Time a stage.
+
+        Args:
+            name: The stage name. Nested spans are recorded separately, so
+                use dotted names such as "weekly.gemini" to group them.
+
+        Yields:
+            The Span, for recording sizes.
+        """
+        span = Span(name)
+        self.spans.append(span)
+        # cProfile cannot nest, so only outermost stages are profiled
+        profiler = cProfile.Profile() if self.profile_dir and self.depth == 0 else None
+        self.depth += 1
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            span.seconds = time.perf_counter() - start
+            self.depth -= 1
+            if profiler:
+                profiler.dump_stats(os.path.join(self.profile_dir, f"{self.run}-{name}.prof"))
+
+    def record(self, key: str, value) -> None:
+        """Record a run-level size or outcome."""
+        self.sizes[key] = value
+
+    def to_dict(self) -> Dict:
+        """Return the run as a JSON-serializable dict."""
+        result = {
+            'run': self.run,
+            'started': self.started.isoformat(timespec='seconds'),
+            'total_seconds': round(time.perf_counter() - self.start, 6),
+            'stages': [span.to_dict() for span in self.spans],
+        }
+        result.update(self.sizes)
+        return result
+
+    def emit(self, path: Optional[str] = None) -> Dict:
+        """
+        Write the metrics record as one JSON line, if a destination is configured.
+
+        Args:
+            path: A file to append the record to, "-" for stdout, or None to
+                write nothing.
+
+        Returns:
+            The record.
+        """
+        record = self.to_dict()
+        if not path:
+            return record
+        line = json.dumps(record, separators=(',', ':'))
+        if path != '-':
+            with open(path, 'a', encoding='utf-8') as f:
+                f.write(line + "\n")
+        else:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+        return record
+
+def metrics_from_env(run: str) -> RunMetrics:
+    """Create run metrics, profiling when the PROFILE_DIR environment variable is set."""
+    return RunMetrics(run, profile_dir=os.environ.get("PROFILE_DIR") or None)
@@ -0,0 +1,533 @@
+import os
+import json
+import math
+import time
+import random
+import threading
+import contextlib
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
+
+from deadline import DeadlineExceeded
+
+# Fallback ratio for estimating tokens before any response has been measured
+DEFAULT_CHARS_PER_TOKEN = 4.0
+
+# How long a registered prompt prefix is kept by the server if a batch never releases it
+CONTEXT_CACHE_TTL = timedelta(hours=1)
+
+# Gemini rejects cached content below a model-dependent minimum size; shorter
+# prefixes are not registered unless GEMINI_CACHE_MIN_TOKENS says otherwise
+GEMINI_MIN_CACHED_TOKENS = 4096
+
+# Tried in order; the first model whose limits and estimates fit the budgets is used.
+# Prices are USD per million tokens; latencies are rough first estimates that
+# are replaced by observed latencies as calls complete.
+DEFAULT_MODELS = [
+    {
+        'name': 'gemini-2.0-flash-lite',
+        'max_input_tokens': 4000,
+        'input_cost': 0.075,
+        'output_cost': 0.30,
+        'base_latency': 1.0,
+        'latency_per_1k_tokens': 0.03,
+    },
+    {
+        'name': 'gemini-2.0-flash',
+        'max_input_tokens': 1000000,
+        'input_cost': 0.10,
+        'output_cost': 0.40,
+        'base_latency': 1.5,
+        'latency_per_1k_tokens': 0.05,
+    },
+    {
+        'name': 'gemini-2.5-flash',
+        'max_input_tokens': 1000000,
+        'input_cost': 0.30,
+        'output_cost': 2.50,
+        'base_latency': 3.0,
+        'latency_per_1k_tokens': 0.08,
+    },
+]
+
+class ModelOption:
+    """One configured model, with its limits, prices and latency estimate."""
+
+    def __init__(self, name: str, max_input_tokens: int = 1000000, input_cost: float = 0.0,
+                 output_cost: float = 0.0, base_latency: float = 1.0, latency_per_1k_tokens: float = 0.0):
+        """
+        Initialize the model option.
+
+        Args:
+            name: The model name passed to the client factory.
+            max_input_tokens: The largest prompt routed to this model.
+            input_cost: USD per million prompt tokens.
+            output_cost: USD per million response tokens.
+            base_latency: Estimated seconds per call, excluding prompt size.
+            latency_per_1k_tokens: Estimated extra seconds per 1000 prompt tokens.
+        """
+        self.name = name
+        self.max_input_tokens = max_input_tokens
+        self.input_cost = input_cost
+        self.output_cost = output_cost
+        self.base_latency = base_latency
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+
+    def estimate_latency(self, tokens: int) -> float:
+        """Estimate the seconds a call with a prompt of this size takes."""
+        return self.base_latency + self.latency_per_1k_tokens * tokens / 1000
+
+    def estimate_cost(self, tokens: int, output_tokens: int) -> float:
+        """Estimate the USD cost of a call."""
+        return (self.input_cost * tokens + self.output_cost * output_tokens) / 1e6
+
+    def observe(self, tokens: int, latency: float, weight: float = 0.3) -> None:
+        """Move the base latency estimate towards an observed call latency."""
+        observed_base = max(latency - self.latency_per_1k_tokens * tokens / 1000, 0.0)
+        self.base_latency += weight * (observed_base - self.base_latency)
+
+def load_models(path: Optional[str] = None) -> List[ModelOption]:
+    """
+    Load the configured model list.
+
+    Args:
+        path: A JSON file holding a list of ModelOption keyword dicts. Defaults
+            to the GEMINI_MODELS_FILE environment variable; DEFAULT_MODELS is
+            used when neither is set.
+
+    Returns:
+        The model options in preference order.
+    """
+    path = path or os.environ.get("GEMINI_MODELS_FILE")
+    configs = DEFAULT_MODELS
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            configs = json.load(f)
+    return [ModelOption(**config) for config in configs]
+
+class ContextCache:
+    """
+    Prompt prefixes registered once per model for the length of a batch.
+
+    The register function (model name, prefix) -> client returns a client
+    that answers prompts as if they were preceded by the prefix, which the
+    server then holds instead of receiving it with every call (see
+    gemini_context_client and StubModel.cache_prefix). A prefix shorter
+    than min_tokens is never registered, and one that fails to register is
+    remembered, so each is tried at most once per model; their calls simply
+    send the whole prompt.
+    """
+
+    def __init__(self, register: Callable, min_tokens: int = 0):
+        """
+        Initialize the cache.
+
+        Args:
+            register: Function (model name, prefix) -> client with
+                generate_content(prompt, **kwargs) and optionally release().
+            min_tokens: The shortest prefix worth registering.
+        """
+        self.register = register
+        self.min_tokens = min_tokens
+        self.lock = threading.Lock()
+        # (model name, prefix) -> registered client, or None if it could not be registered
+        self.clients: Dict[tuple, object] = {}
+        self.registrations = 0
+        self.too_short = 0
+        self.failures = 0
+        self.hits = 0
+        self.misses = 0
+        self.cached_tokens = 0
+
+    def client(self, model_name: str, prefix: str, tokens: int):
+        """
+        Return the client holding a prefix, registering it on first use.
+
+        Args:
+            model_name: The model the call goes to.
+            prefix: The prompt prefix.
+            tokens: The prefix's estimated token count.
+
+        Returns:
+            The registered client, or None if the prefix is not cached.
+        """
+        key = (model_name, prefix)
+        with self.lock:
+            if key not in self.clients:
+                client = None
+                if tokens >= self.min_tokens:
+                    try:
+                        client = self.register(model_name, prefix)
+                        self.registrations += 1
+                        print(f"Registered a {tokens}-token prompt prefix with {model_name}")
+                    except Exception as e:
+                        self.failures += 1
+                        print(f"Could not register the prompt prefix with {model_name}: {e}")
+                else:
+                    self.too_short += 1
+                self.clients[key] = client
+            client = self.clients[key]
+            if client is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return client
+
+    def observe(self, response) -> None:
+        """Count the prompt tokens a response reports as served from a cache."""
+        usage = getattr(response, 'usage_metadata', None)
+        cached = getattr(usage, 'cached_content_token_count', None)
+        if cached:
+            with self.lock:
+                self.cached_tokens += cached
+
+    def close(self) -> None:
+        """Release every registered prefix."""
+        with self.lock:
+            clients = [client for client in self.clients.values() if client is not None]
+            self.clients.clear()
+        for client in clients:
+            release = getattr(client, 'release', None)
+            if release is None:
+                continue
+            try:
+                release()
+            except Exception as e:
+                print(f"Could not release a cached prompt prefix: {e}")
+
+    def stats(self) -> Dict:
+        """Return the registration and hit counts, for batch reports."""
+        with self.lock:
+            return {
+                'registrations': self.registrations,
+                'too_short': self.too_short,
+                'min_tokens': self.min_tokens,
+                'failures': self.failures,
+                'hits': self.hits,
+                'misses': self.misses,
+                'cached_tokens': self.cached_tokens,
+            }
+
+def format_cache_stats(stats: Dict) -> str:
+    """Format ContextCache.stats() as one report line."""
+    calls = stats['hits'] + stats['misses']
+    line = (f"Prompt cache: {stats['registrations']} prefix(es) registered, "
+            f"{stats['hits']}/{calls} calls served from a cached prefix, "
+            f"{stats['cached_tokens']} prompt tokens reported cached")
+    if stats['too_short']:
+        line += f", {stats['too_short']} prefix(es) below the {stats['min_tokens']}-token minimum sent in full"
+    if stats['failures']:
+        line += f", {stats['failures']} registration(s) failed"
+    return line
+
+class ModelRouter:
+    """
+    Picks a Gemini model per prompt from its size and a latency/cost budget.
+
+    The preferred model is the first configured one that accepts the prompt
+    size and whose estimated latency and cost fit the budgets. Every other
+    model that accepts the prompt is kept as a fallback, fastest first, and
+    is tried when a call times out or fails.
+    """
+
+    def __init__(self, models: Optional[List[ModelOption]] = None, latency_budget: float = 20.0,
+                 cost_budget: float = 0.01, expected_output_tokens: int = 300,
+                 client_factory: Optional[Callable] = None, timeout: Optional[float] = None,
+                 context_factory: Optional[Callable] = None):
+        """
+        Initialize the router.
+
+        Args:
+            models: The model options in preference order; load_models() if None.
+            latency_budget: Seconds a call is expected to take at most.
+            cost_budget: USD a call is expected to cost at most.
+            expected_output_tokens: Response size assumed for cost estimates.
+            client_factory: Function (model name) -> object with
+                generate_content(prompt, **kwargs). Defaults to
+                google.generativeai.GenerativeModel.
+            timeout: Seconds before a call is abandoned and the next model is
+                tried. Defaults to the latency budget. Each attempt waits
+                max(timeout, 1.5 * the model's estimated latency), so a model
+                expected to be slow is not cut off early.
+            context_factory: Function (model name, prefix) -> client bound to
+                the cached prefix, used by context_caching(). Defaults to
+                gemini_context_client.
+        """
+        self.models = models if models is not None else load_models()
+        self.latency_budget = latency_budget
+        self.cost_budget = cost_budget
+        self.expected_output_tokens = expected_output_tokens
+        self.client_factory = client_factory or _gemini_client
+        self.context_factory = context_factory or gemini_context_client
+        self.context_cache: Optional[ContextCache] = None
+        self.timeout = timeout or latency_budget
+        self.chars_per_token = DEFAULT_CHARS_PER_TOKEN
+        self.lock = threading.Lock()
+        # (model name, prompt tokens, seconds, outcome) per attempted call
+        self.history: List[tuple] = []
+
+    @classmethod
+    def from_env(cls, **kwargs) -> "ModelRouter":
+        """Build a router from GEMINI_LATENCY_BUDGET, GEMINI_COST_BUDGET and GEMINI_MODELS_FILE."""
+        kwargs.setdefault('latency_budget', float(os.environ.get("GEMINI_LATENCY_BUDGET", 20.0)))
+        kwargs.setdefault('cost_budget', float(os.environ.get("GEMINI_COST_BUDGET", 0.01)))
+        return cls(**kwargs)
+
+    def count_tokens(self, prompt: str) -> int:
+        """Estimate a prompt's token count from the measured characters per token."""
+        return math.ceil(len(prompt) / self.chars_per_token)
+
+    def candidates(self, tokens: int) -> List[ModelOption]:
+        """
+        Order the models to try for a prompt.
+
+        Args:
+            tokens: The prompt token count.
+
+        Returns:
+            The chosen model followed by the fallbacks; empty if no model
+            accepts a prompt this large.
+        """
+        eligible = [model for model in self.models if tokens <= model.max_input_tokens]
+        within_budget = [
+            model for model in eligible
+            if model.estimate_latency(tokens) <= self.latency_budget
+            and model.estimate_cost(tokens, self.expected_output_tokens) <= self.cost_budget
+        ]
+        # Over budget everywhere: the fastest model is the least bad choice
+        first = within_budget[0] if within_budget else min(eligible, key=lambda m: m.estimate_latency(tokens), default=None)
+        if first is None:
+            return []
+        fallbacks = sorted((model for model in eligible if model is not first), key=lambda m: m.estimate_latency(tokens))
+        return [first] + fallbacks
+
+    @contextlib.contextmanager
+    def context_caching(self, min_tokens: Optional[int] = None):
+        """
+        Register shared prompt prefixes once for the calls made inside the block.
+
+        Every generate() call given a prefix then sends only its suffix to a
+        model the prefix is registered with. The prefixes are released when
+        the block ends.
+
+        Args:
+            min_tokens: The shortest prefix worth registering. Defaults to the
+                GEMINI_CACHE_MIN_TOKENS environment variable, or
+                GEMINI_MIN_CACHED_TOKENS, below which Gemini rejects the
+                cached content anyway.
+
+        Yields:
+            The ContextCache, whose stats() reports registrations and hits.
+        """
+        if min_tokens is None:
+            min_tokens = int(os.environ.get("GEMINI_CACHE_MIN_TOKENS", GEMINI_MIN_CACHED_TOKENS))
+        cache = ContextCache(self.context_factory, min_tokens)
+        previous = self.context_cache
+        self.context_cache = cache
+        try:
+            yield cache
+        finally:
+            self.context_cache = previous
+            cache.close()
+
+    def call_with_timeout(self, model: ModelOption, prompt: str, timeout: float, client=None, **kwargs):
+        """Call a model (or a given client for it), raising TimeoutError if it takes longer than the timeout."""
+        client = client or self.client_factory(model.name)
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(client.generate_content, prompt, **kwargs)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"{model.name} did not respond within {timeout:.1f}s")
+        finally:
+            # Don't wait for an abandoned call; its result is simply discarded
+            executor.shutdown(wait=False)
+
+    def record(self, model: ModelOption, tokens: int, seconds: float, outcome: str) -> None:
+        """Log an attempted call and keep it in the history."""
+        with self.lock:
+            self.history.append((model.name, tokens, seconds, outcome))
+        print(f"Model {model.name}: {outcome} in {seconds:.2f}s ({tokens} prompt tokens)")
+
+    def measure(self, prompt: str, response) -> Optional[int]:
+        """Calibrate the token estimate from a response's usage metadata."""
+        usage = getattr(response, 'usage_metadata', None)
+        prompt_tokens = getattr(usage, 'prompt_token_count', None)
+        if prompt_tokens:
+            with self.lock:
+                self.chars_per_token += 0.3 * (len(prompt) / prompt_tokens - self.chars_per_token)
+        return prompt_tokens
+
+    def generate(self, prompt: str, timeout: Optional[float] = None, prefix: Optional[str] = None, **kwargs):
+        """
+        Generate a response with the routed model, falling back on timeouts and errors.
+
+        Args:
+            prompt: The prompt text, or its per-call suffix if a prefix is given.
+            timeout: Seconds all attempts together may take. Each attempt's
+                timeout is capped by what is left, is passed on to the client
+                as request_options, and no fallback is tried once it is
+                spent. Unbounded if None.
+            prefix: A static prompt prefix shared by many calls. Inside
+                context_caching() it is registered once per model and only
+                the suffix is sent; otherwise it is prepended to the prompt.
+            **kwargs: Passed through to generate_content (e.g. generation_config).
+
+        Returns:
+            The response of the first model that answered.
+
+        Raises:
+            RuntimeError: If no model accepts the prompt or every attempt failed.
+            DeadlineExceeded: If the timeout ran out before a model answered.
+        """
+        full_prompt = prefix + prompt if prefix else prompt
+        tokens = self.count_tokens(full_prompt)
+        models = self.candidates(tokens)
+        if not models:
+            raise RuntimeError(f"No configured model accepts a prompt of {tokens} tokens")
+
+        first = models[0]
+        print(f"Routing {tokens}-token prompt to {first.name} "
+              f"(estimated {first.estimate_latency(tokens):.1f}s, "
+              f"${first.estimate_cost(tokens, self.expected_output_tokens):.5f})")
+
+        end = time.perf_counter() + timeout if timeout is not None else None
+        errors = []
+        for model in models:
+            attempt_timeout = max(self.timeout, 1.5 * model.estimate_latency(tokens))
+            if end is not None:
+                remaining = end - time.perf_counter()
+                if remaining <= 0:
+                    raise DeadlineExceeded(f"No model answered within {timeout:.1f}s: " + "; ".join(errors))
+                attempt_timeout = min(attempt_timeout, remaining)
+                # The client gives up too, so an abandoned call does not hold its connection open
+                kwargs['request_options'] = dict(kwargs.get('request_options') or {}, timeout=attempt_timeout)
+            cache = self.context_cache
+            client = cache.client(model.name, prefix, self.count_tokens(prefix)) if prefix and cache else None
+            start = time.perf_counter()
+            try:
+                if client is not None:
+                    response = self.call_with_timeout(model, prompt, attempt_timeout, client, **kwargs)
+                else:
+                    response = self.call_with_timeout(model, full_prompt, attempt_timeout, **kwargs)
+            except Exception as e:
+                self.record(model, tokens, time.perf_counter() - start, f"failed ({e})")
+                errors.append(f"{model.name}: {e}")
+                continue
+            seconds = time.perf_counter() - start
+            if cache is not None:
+                cache.observe(response)
+            measured = self.measure(full_prompt, response)
+            # Concurrent calls (e.g. backfill periods) update the same estimates
+            with self.lock:
+                model.observe(measured or tokens, seconds)
+            self.record(model, measured or tokens, seconds, "ok")
+            return response
+
+        if end is not None and time.perf_counter() >= end:
+            raise DeadlineExceeded(f"No model answered within {timeout:.1f}s: " + "; ".join(errors))
+        raise RuntimeError("All models failed: " + "; ".join(errors))
+
+def _gemini_client(name: str):
+    """Build a Gemini client for a model name."""
+    import google.generativeai as genai
+    return genai.GenerativeModel(name)
+
+class CachedContextClient:
+    """A client bound to a registered prompt prefix, with a way to release it."""
+
+    def __init__(self, client, release: Callable):
+        self.client = client
+        self.release = release
+
+    def generate_content(self, prompt: str, **kwargs):
+        return self.client.generate_content(prompt, **kwargs)
+
+def gemini_context_client(name: str, prefix: str) -> CachedContextClient:
+    """Register a prompt prefix as Gemini cached content and return a model bound to it."""
+    import google.generativeai as genai
+    cache = genai.caching.CachedContent.create(model=name, contents=[prefix], ttl=CONTEXT_CACHE_TTL)
+    return CachedContextClient(genai.GenerativeModel.from_cached_content(cache), cache.delete)
+
+class StubResponse:
+    """A canned response with the attributes the router and callers read."""
+
+    def __init__(self, text: str, prompt_token_count: int, cached_content_token_count: int = 0):
+        self.text = text
+        self.usage_metadata = type('UsageMetadata', (), {
+            'prompt_token_count': prompt_token_count,
+            'cached_content_token_count': cached_content_token_count,
+        })()
+
+class StubModel:
+    """
+    Local stand-in for a Gemini model with a configurable latency profile.
+
+    Useful for exercising routing, timeouts and fallbacks without network
+    access or API costs.
+    """
+
+    def __init__(self, name: str, base_latency: float = 0.0, latency_per_1k_tokens: float = 0.0,
+                 jitter: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None,
+                 cached_token_ratio: float = 0.1):
+        """
+        Initialize the stub.
+
+        Args:
+            name: The model name, echoed in responses.
+            base_latency: Seconds every call sleeps.
+            latency_per_1k_tokens: Extra seconds per 1000 prompt tokens.
+            jitter: Maximum extra random seconds per call.
+            failure_rate: Probability that a call raises an error.
+            seed: Seed for the jitter and failures.
+            cached_token_ratio: The latency of a cached prefix token relative
+                to a token sent with the call.
+        """
+        self.name = name
+        self.base_latency = base_latency
+        self.latency_per_1k_tokens = latency_per_1k_tokens
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.cached_token_ratio = cached_token_ratio
+        self.rng = random.Random(seed)
+        self.calls = 0
+        self.registrations = 0
+
+    def generate_content(self, prompt: str, cached_prefix: Optional[str] = None, **kwargs) -> StubResponse:
+        """Sleep for the modelled latency and return a canned response."""
+        self.calls += 1
+        tokens = math.ceil(len(prompt) / DEFAULT_CHARS_PER_TOKEN)
+        cached_tokens = math.ceil(len(cached_prefix) / DEFAULT_CHARS_PER_TOKEN) if cached_prefix else 0
+        processed = tokens + self.cached_token_ratio * cached_tokens
+        time.sleep(self.base_latency + self.latency_per_1k_tokens * processed / 1000 + self.rng.uniform(0, self.jitter))
+        if self.rng.random() < self.failure_rate:
+            raise RuntimeError(f"{self.name} stub failure")
+        return StubResponse(f"[{self.name}] analysis of a {tokens + cached_tokens}-token prompt",
+                            tokens + cached_tokens, cached_tokens)
+
+    def cache_prefix(self, prefix: str) -> "StubCachedContext":
+        """Hold a prompt prefix, the local equivalent of registering Gemini cached content."""
+        self.registrations += 1
+        return StubCachedContext(self, prefix)
+
+class StubCachedContext:
+    """A stub model with a prompt prefix it already holds."""
+
+    def __init__(self, model: StubModel, prefix: str):
+        self.model = model
+        self.prefix = prefix
+
+    def generate_content(self, prompt: str, **kwargs) -> StubResponse:
+        return self.model.generate_content(prompt, cached_prefix=self.prefix, **kwargs)
+
+    def release(self) -> None:
+        self.prefix = None
+
+def stub_client_factory(stubs: Dict[str, StubModel]) -> Callable:
+    """Return a client factory serving the given stubs by model name."""
+    return lambda name: stubs[name]
+
+def stub_context_factory(stubs: Dict[str, StubModel]) -> Callable:
+    """Return a context factory registering prefixes with the given stubs by model name."""
+    return lambda name, prefix: stubs[name].cache_prefix(prefix)
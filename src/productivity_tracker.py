@@ -1,12 +1,24 @@
 import os
 import sys
+import json
+import time
+import contextlib
 import google.auth
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import google.generativeai as genai
 from dotenv import load_dotenv
 from data_parser import ProductivityDataParser
+from snapshot import get_cache_dir
+from model_router import ModelRouter
+from metrics import RunMetrics, metrics_from_env
+from history_store import store_from_env
+from deadline import DeadlineExceeded, deadline_from_env
 from google.oauth2 import service_account
+from google.auth.credentials import AnonymousCredentials
+from google.auth.transport.requests import AuthorizedSession
+import requests
+from json_stream import CountingChunks, iter_text_runs
 
 # Load environment variables from .env file
 load_dotenv()
@@ -20,13 +32,23 @@ if not GOOGLE_API_KEY:
 # Print the API key (first few characters) for debugging
 print(f"Gemini API key found: {GOOGLE_API_KEY[:10]}...")
 
-# Configure the Gemini API
-genai.configure(api_key=GOOGLE_API_KEY)
+# Configure the Gemini API; GEMINI_ENDPOINT points it at another server, such as the local fake
+GEMINI_ENDPOINT = os.environ.get("GEMINI_ENDPOINT")
+if GEMINI_ENDPOINT:
+    print(f"Using Gemini API endpoint {GEMINI_ENDPOINT}")
+    genai.configure(api_key=GOOGLE_API_KEY, transport="rest", client_options={"api_endpoint": GEMINI_ENDPOINT})
+else:
+    genai.configure(api_key=GOOGLE_API_KEY)
 
-def authenticate_google_docs_api():
-    """Authenticates with the Google Docs API and returns the service."""
-    creds = None
+# The only part of a document the parser reads: the text of each paragraph run
+TEXT_FIELDS = 'body/content/paragraph/elements/textRun/content'
+
+FETCH_STRATEGIES = ("full", "fields", "export", "stream")
+
+STREAM_CHUNK_SIZE = 64 * 1024
 
+def get_google_credentials():
+    """Returns service account or Application Default Credentials, or None on failure."""
     try:
         # Check if service account key file exists
         if os.path.exists('key.json'):
@@ -41,6 +63,7 @@ def authenticate_google_docs_api():
             print("Service account key file not found, falling back to Application Default Credentials")
             creds, project = google.auth.default()
             print(f"Using Application Default Credentials for project: {project}")
+        return creds
     except Exception as e:
         print(f"Authentication error: {e}")
         # Print more details about the error
@@ -48,139 +71,724 @@ def authenticate_google_docs_api():
         print(traceback.format_exc())
         return None
 
+def build_google_service(api_name, api_version, display_name):
+    """
+    Authenticates and builds a Google API service.
+
+    Args:
+        api_name: The API name, e.g. "docs".
+        api_version: The API version, e.g. "v1".
+        display_name: The API name used in log messages.
+
+    Returns:
+        The service, or None on failure.
+    """
+    # GOOGLE_DOCS_ENDPOINT points the client at another server, such as the local fake, without credentials
+    docs_endpoint = os.environ.get("GOOGLE_DOCS_ENDPOINT")
+    if docs_endpoint:
+        print(f"Using {display_name} endpoint {docs_endpoint}")
+        return build(api_name, api_version, credentials=AnonymousCredentials(),
+                     client_options={'api_endpoint': docs_endpoint}, static_discovery=True)
+
+    creds = get_google_credentials()
+    if creds is None:
+        return None
+
     try:
-        print("Building Google Docs API service")
-        service = build('docs', 'v1', credentials=creds)
-        print("Google Docs API service built successfully")
+        print(f"Building {display_name} service")
+        service = build(api_name, api_version, credentials=creds)
+        print(f"{display_name} service built successfully")
         return service
     except HttpError as err:
-        print(f"Error building Google Docs API service: {err}")
+        print(f"Error building {display_name} service: {err}")
         print(f"Error details: {err.content.decode()}")
         return None
     except Exception as e:
-        print(f"Unexpected error building Google Docs API service: {e}")
+        print(f"Unexpected error building {display_name} service: {e}")
         import traceback
         print(traceback.format_exc())
         return None
 
-def read_google_doc(document_id):
-    """Reads the content of a Google Doc and returns it as a string."""
-    service = authenticate_google_docs_api()
+def authenticate_google_docs_api():
+    """Authenticates with the Google Docs API and returns the service."""
+    return build_google_service('docs', 'v1', "Google Docs API")
+
+def authenticate_google_drive_api():
+    """Authenticates with the Google Drive API and returns the service."""
+    return build_google_service('drive', 'v3', "Google Drive API")
+
+def stage_timeout(deadline, stage):
+    """Returns the seconds left in a stage of a run Deadline, or None without a deadline."""
+    return deadline.remaining(stage) if deadline is not None else None
+
+@contextlib.contextmanager
+def http_timeout(http, timeout):
+    """
+    Temporarily sets the socket timeout of an API client's httplib2 connection pool.
+
+    The timeout bounds every connect and read of the requests made inside
+    the block; open keep-alive connections are updated too.
+
+    Args:
+        http: The request's http object (an httplib2.Http, possibly wrapped
+            in an authorizing google_auth_httplib2.AuthorizedHttp).
+        timeout: Seconds, or None to leave the timeout unchanged.
+    """
+    http = getattr(http, 'http', http)
+    if timeout is None or not hasattr(http, 'connections'):
+        yield
+        return
+    previous = http.timeout
+    http.timeout = timeout
+    for connection in http.connections.values():
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+    try:
+        yield
+    finally:
+        http.timeout = previous
+        for connection in http.connections.values():
+            connection.timeout = previous
+            if connection.sock is not None:
+                connection.sock.settimeout(previous)
+
+def _execute_raw(request, timeout=None):
+    """Executes an API request and returns the undecoded response body."""
+    with http_timeout(request.http, timeout):
+        response, content = request.http.request(request.uri, method=request.method,
+                                                 body=request.body, headers=request.headers)
+    if response.status >= 300:
+        raise HttpError(response, content, uri=request.uri)
+    return content
+
+def open_stream_session():
+    """Returns an authorized requests session for streamed downloads, or None on failure."""
+    if os.environ.get("GOOGLE_DOCS_ENDPOINT"):
+        return AuthorizedSession(AnonymousCredentials())
+    creds = get_google_credentials()
+    if creds is None:
+        return None
+    return AuthorizedSession(creds)
+
+def iter_document_chunks(document_id, service, session, chunk_size=STREAM_CHUNK_SIZE, timeout=None, request=None):
+    """
+    Yields the field-masked documents.get response body in chunks as it downloads.
+
+    With a timeout, the download is abandoned (and its connection closed)
+    by raising DeadlineExceeded once the whole transfer has taken longer,
+    even if every single read was fast enough. A prebuilt request (see
+    build_fetch_request) is downloaded instead of building one from the service.
+    """
+    if request is None:
+        request = service.documents().get(documentId=document_id, fields=TEXT_FIELDS)
+    end = time.perf_counter() + timeout if timeout is not None else None
+    with session.get(request.uri, stream=True, timeout=timeout) as response:
+        response.raise_for_status()
+        for chunk in response.iter_content(chunk_size):
+            if end is not None and time.perf_counter() > end:
+                raise DeadlineExceeded(f"Downloading the document took longer than {timeout:.1f}s")
+            yield chunk
+
+def stream_text_runs(document_id, service=None, session=None, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Streams the text runs of a Google Doc without building the document tree.
+
+    The field-masked documents.get response is downloaded in chunks and
+    decoded incrementally, so memory use is bounded by the chunk size and
+    the longest text run rather than the size of the document.
+
+    Args:
+        document_id: The Google Doc ID.
+        service: An authenticated Docs API service used to build the request
+            URL; a new one is built when None.
+        session: An authorized requests session; a new one is opened when None.
+        chunk_size: The download chunk size in bytes.
+
+    Yields:
+        The content of each text run, in document order.
+
+    Raises:
+        requests.HTTPError: If the request fails.
+        ValueError: If the response is not valid JSON.
+    """
+    if service is None:
+        service = authenticate_google_docs_api()
+    if session is None:
+        session = open_stream_session()
+    if not service or session is None:
+        return
+    yield from iter_text_runs(iter_document_chunks(document_id, service, session, chunk_size))
+
+def document_text(document):
+    """Joins the paragraph text runs of a documents.get response."""
+    parts = []
+    for element in document.get('body', {}).get('content', []):
+        if 'paragraph' in element:
+            for run in element['paragraph'].get('elements', []):
+                if 'textRun' in run:
+                    parts.append(run['textRun'].get('content', ''))
+    return "".join(parts)
+
+def build_fetch_request(document_id, strategy, service=None, drive_service=None):
+    """
+    Builds the API request a fetch strategy sends, without executing it.
+
+    Building a request constructs the client's resource and method objects,
+    which allocates more than the "stream" strategy needs to decode a large
+    document; benchmarks build it beforehand to measure only the download.
+
+    Args:
+        document_id: The Google Doc ID.
+        strategy: One of FETCH_STRATEGIES.
+        service: An authenticated Docs API service; a new one is built when
+            None and the strategy needs it.
+        drive_service: An authenticated Drive API service for "export"; a new
+            one is built when None.
+
+    Returns:
+        The googleapiclient HttpRequest, or None if the service could not be built.
+    """
+    if strategy == "export":
+        if drive_service is None:
+            drive_service = authenticate_google_drive_api()
+        if not drive_service:
+            return None
+        return drive_service.files().export_media(fileId=document_id, mimeType='text/plain')
+    if service is None:
+        service = authenticate_google_docs_api()
     if not service:
         return None
+    fields = None if strategy == "full" else TEXT_FIELDS
+    return service.documents().get(documentId=document_id, fields=fields)
+
+def fetch_document_text(document_id, service=None, strategy=None, drive_service=None, timeout=None, request=None):
+    """
+    Fetches the text of a Google Doc with a configurable strategy.
+
+    Strategies:
+        "full": the whole documents.get resource, styles and all.
+        "fields": documents.get with a field mask selecting only the text
+            runs, so the response carries no styles or indexes.
+        "export": a Drive export of the document as text/plain.
+        "stream": the "fields" response, downloaded in chunks and decoded
+            incrementally without building the document tree.
+
+    Args:
+        document_id: The Google Doc ID.
+        service: An authenticated Docs API service to reuse; a new one is
+            built when None.
+        strategy: One of FETCH_STRATEGIES. Defaults to the DOC_FETCH_STRATEGY
+            environment variable, or "fields".
+        drive_service: An authenticated Drive API service for "export"; a new
+            one is built when None.
+        timeout: Seconds the download may take; unbounded if None.
+        request: The strategy's request, already built with
+            build_fetch_request; built here when None.
+
+    Returns:
+        A (text, stats) tuple. stats has the strategy, the response bytes,
+        the fetch and decode times in seconds, and whether the fetch timed
+        out. text is None on failure.
+    """
+    strategy = strategy or os.environ.get("DOC_FETCH_STRATEGY", "fields")
+    if strategy not in FETCH_STRATEGIES:
+        raise ValueError(f"Unknown fetch strategy '{strategy}'. Must be one of {', '.join(FETCH_STRATEGIES)}.")
+    stats = {'strategy': strategy, 'bytes': 0, 'fetch_seconds': 0.0, 'decode_seconds': 0.0, 'timed_out': False}
+    began = time.perf_counter()
 
     try:
-        document = service.documents().get(documentId=document_id).execute()
-        content = document.get('body').get('content')
+        if request is None:
+            request = build_fetch_request(document_id, strategy, service, drive_service)
+        if request is None:
+            return None, stats
+        if strategy == "stream":
+            return _fetch_streamed_text(request, stats, timeout)
+
+        start = time.perf_counter()
+        content = _execute_raw(request, timeout)
+        stats['fetch_seconds'] = time.perf_counter() - start
+        stats['bytes'] = len(content)
+
+        start = time.perf_counter()
+        if strategy == "export":
+            # Drive's plain-text export starts with a byte order mark and ends lines with CRLF
+            text = content.decode('utf-8-sig').replace('\r\n', '\n')
+        else:
+            text = document_text(json.loads(content))
+        stats['decode_seconds'] = time.perf_counter() - start
+        return text, stats
+
+    except (HttpError, requests.RequestException, ValueError, TimeoutError) as err:
+        # A read timeout inside a streamed body surfaces as a plain connection error
+        stats['timed_out'] = (isinstance(err, (TimeoutError, requests.Timeout))
+                              or (timeout is not None and time.perf_counter() - began >= timeout))
+        if stats['timed_out']:
+            print(f"Fetching the document timed out after {time.perf_counter() - began:.1f}s: {err}")
+        else:
+            print(f"An error occurred: {err}")
+        return None, stats
 
-        text = ""
-        for element in content:
-            if 'paragraph' in element:
-                for run in element['paragraph']['elements']:
-                    if 'textRun' in run:
-                        text += run['textRun']['content']
-        return text
+def _fetch_streamed_text(request, stats, timeout=None):
+    """Implements the "stream" strategy of fetch_document_text for a built request."""
+    session = open_stream_session()
+    if session is None:
+        return None, stats
+    with session:
+        chunks = CountingChunks(iter_document_chunks(None, None, session, timeout=timeout, request=request))
+        start = time.perf_counter()
+        text = "".join(iter_text_runs(chunks))
+        total = time.perf_counter() - start
+    # Downloading and decoding interleave; time spent waiting for chunks counts as fetch time
+    stats['bytes'] = chunks.bytes
+    stats['fetch_seconds'] = chunks.wait_seconds
+    stats['decode_seconds'] = total - chunks.wait_seconds
+    return text, stats
 
+def read_google_doc(document_id, service=None, strategy=None):
+    """
+    Reads the content of a Google Doc and returns it as a string.
+
+    Args:
+        document_id: The Google Doc ID.
+        service: An authenticated Docs API service to reuse; a new one is
+            built when None.
+        strategy: The fetch strategy (see fetch_document_text).
+    """
+    return fetch_document_text(document_id, service, strategy)[0]
+
+def get_document_revision(document_id, service=None):
+    """
+    Returns the current revision ID of a Google Doc without fetching its content.
+
+    Args:
+        document_id: The Google Doc ID.
+        service: An authenticated Docs API service to reuse; a new one is
+            built when None.
+
+    Returns:
+        The revision ID string, or None if it could not be fetched.
+    """
+    if service is None:
+        service = authenticate_google_docs_api()
+    if not service:
+        return None
+
+    try:
+        document = service.documents().get(documentId=document_id, fields='revisionId').execute()
+        return document.get('revisionId')
     except HttpError as err:
-        print(f"An error occurred: {err}")
+        print(f"An error occurred while fetching the document revision: {err}")
         return None
 
-def generate_analysis_with_gemini(data, analysis_type="weekly"):
+_model_router = None
+
+def get_model_router():
+    """Returns the shared model router, configured from the environment on first use."""
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter.from_env()
+    return _model_router
+
+# The instructions of each analysis type. They make up the start of every prompt, ahead of any
+# shared background and the period's data, so a batch of analyses shares one static prefix
+# that can be cached.
+ANALYSIS_INSTRUCTIONS = {
+    "weekly": "Analyze the weekly productivity and mood data below. Provide a concise summary of achievements, "
+              "challenges, patterns in mood/focus, and adjustments for the next week. Be specific and offer "
+              "actionable advice for improvements. Provide a short analysis of around 50-75 words only.",
+    "monthly": "Analyze the monthly productivity and mood data below. Provide an overall summary of achievements, "
+               "key patterns/observations, biggest lessons learned, and goals for the next month. Be specific and "
+               "offer actionable advice for continued progress. Provide a short analysis of around 75-100 words only.",
+    "quarterly": "Analyze the quarterly productivity and mood rollup data below. Compare this quarter with the "
+                 "previous one, highlight recurring achievements and challenges, long-term trends in mood/focus, and "
+                 "priorities for the next quarter. Be specific and offer actionable advice. Provide a short analysis "
+                 "of around 100-150 words only.",
+    "yearly": "Analyze the yearly productivity and mood rollup data below. Compare this year with the previous one, "
+              "highlight recurring achievements and challenges, long-term trends in mood/focus, and priorities for "
+              "the next year. Be specific and offer actionable advice. Provide a short analysis of around 100-150 "
+              "words only.",
+}
+
+def build_analysis_prompt(data, analysis_type, reference_date=None, background=None):
+    """
+    Builds an analysis prompt as a static prefix and a per-period suffix.
+
+    Args:
+        data: The formatted data.
+        analysis_type: "weekly", "monthly", "quarterly" or "yearly".
+        reference_date: The last day of the analyzed period, for analyses of
+            past periods. The suffix then says which period it covers.
+        background: Formatted history shared by a batch of analyses (see
+            ProductivityDataParser.format_history), added to the prefix.
+
+    Returns:
+        A (prefix, suffix) tuple; the prompt is their concatenation. The
+        prefix depends only on the analysis type and the background.
+    """
+    prefix = ANALYSIS_INSTRUCTIONS[analysis_type] + "\n\n"
+    if background:
+        prefix += f"Background, for comparison only; analyze the data after it:\n\n{background}\n\n"
+    suffix = f"Data:\n\n{data}"
+    if reference_date is not None:
+        suffix += f"\n\nThis analysis covers the period ending {reference_date.strftime('%B %d, %Y')}; write about that period rather than the present."
+    return prefix, suffix
+
+def generate_analysis_with_gemini(data, analysis_type="weekly", reference_date=None, timeout=None, background=None):
     """
     Generates weekly or monthly analysis using the Gemini API.
 
+    The instructions and background are sent as a prompt prefix, which is
+    registered once and reused when the call runs inside the router's
+    context_caching() and is long enough to be cached.
+
     Args:
         data: The data (e.g., daily logs) as a string.
-        analysis_type: "weekly" or "monthly" (string)
+        analysis_type: "weekly", "monthly", "quarterly" or "yearly" (string)
+        reference_date: The last day of the analyzed period, for analyses of
+            past periods. The prompt then says which period it covers.
+        timeout: Seconds the call, including model fallbacks, may take;
+            unbounded if None.
+        background: Formatted history shared by a batch of analyses.
 
     Returns:
         A string containing the analysis from Gemini.
     """
-    if analysis_type == "weekly":
-        prompt = f"""Analyze the following weekly productivity and mood data:
+    if analysis_type not in ANALYSIS_INSTRUCTIONS:
+        return "Error: Invalid analysis_type. Must be 'weekly', 'monthly', 'quarterly' or 'yearly'."
+
+    prefix, suffix = build_analysis_prompt(data, analysis_type, reference_date, background)
+
+    try:
+        response = get_model_router().generate(suffix, timeout=timeout, prefix=prefix)
+        return response.text
 
-        {data}
+    except Exception as e:
+        print(f"Error during Gemini API call: {e}")
+        return None
 
-        Provide a concise summary of achievements, challenges, patterns in mood/focus, and adjustments for the next week. Be specific and offer actionable advice for improvements. Provide a short analysis of around 50-75 words only."""
+# Structured-output schema for the combined weekly+monthly request
+COMBINED_RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "weekly": {"type": "string"},
+        "monthly": {"type": "string"},
+    },
+    "required": ["weekly", "monthly"],
+}
 
-    elif analysis_type == "monthly":
-        prompt = f"""Analyze the following monthly productivity and mood data:
+# The static prefix of the combined request; the weekly and monthly data follow it
+COMBINED_INSTRUCTIONS = (
+    "Analyze the productivity and mood data below, once for the past week and once for the past month.\n\n"
+    "For \"weekly\": Provide a concise summary of achievements, challenges, patterns in mood/focus, and "
+    "adjustments for the next week. Be specific and offer actionable advice for improvements. Provide a short "
+    "analysis of around 50-75 words only.\n\n"
+    "For \"monthly\": Provide an overall summary of achievements, key patterns/observations, biggest lessons "
+    "learned, and goals for the next month. Be specific and offer actionable advice for continued progress. "
+    "Provide a short analysis of around 75-100 words only.\n\n"
+    "Respond with a JSON object with the fields \"weekly\" and \"monthly\", each containing the analysis as "
+    "plain text.\n\n"
+)
 
-        {data}
+def parse_combined_analysis(text):
+    """
+    Validates a combined weekly+monthly response.
 
-        Provide an overall summary of achievements, key patterns/observations, biggest lessons learned, and goals for the next month. Be specific and offer actionable advice for continued progress. Provide a short analysis of around 75-100 words only."""
-    else:
-        return "Error: Invalid analysis_type. Must be 'weekly' or 'monthly'."
+    Args:
+        text: The raw response text, expected to be a JSON object with
+            non-empty string "weekly" and "monthly" fields.
 
+    Returns:
+        A dict with "weekly" and "monthly" analysis texts, or None if the
+        response does not match the schema.
+    """
     try:
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        response = model.generate_content(prompt)
-        return response.text
+        result = json.loads(text)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(result, dict):
+        return None
+
+    analyses = {}
+    for analysis_type in ("weekly", "monthly"):
+        analysis = result.get(analysis_type)
+        if not isinstance(analysis, str) or not analysis.strip():
+            return None
+        analyses[analysis_type] = analysis.strip()
+    return analyses
+
+def generate_combined_analysis_with_gemini(weekly_data, monthly_data, timeout=None):
+    """
+    Generates the weekly and monthly analyses with a single Gemini request.
+
+    Both datasets go into one prompt after the COMBINED_INSTRUCTIONS prefix
+    and the response is constrained to COMBINED_RESPONSE_SCHEMA, which saves
+    a round trip and the repeated prompt overhead of two separate calls.
+
+    Args:
+        weekly_data: The formatted weekly data.
+        monthly_data: The formatted monthly data.
+        timeout: Seconds the call, including model fallbacks, may take;
+            unbounded if None.
+
+    Returns:
+        A dict with "weekly" and "monthly" analysis texts, or None if the
+        call failed or the response did not validate.
+    """
+    suffix = f"Weekly data:\n\n{weekly_data}\n\nMonthly data:\n\n{monthly_data}"
+
+    try:
+        response = get_model_router().generate(
+            suffix,
+            timeout=timeout,
+            prefix=COMBINED_INSTRUCTIONS,
+            generation_config=genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=COMBINED_RESPONSE_SCHEMA,
+            ),
+        )
+        analyses = parse_combined_analysis(response.text)
+        if analyses is None:
+            print("Combined Gemini response did not match the expected schema")
+        return analyses
 
     except Exception as e:
-        print(f"Error during Gemini API call: {e}")
+        print(f"Error during combined Gemini API call: {e}")
         return None
 
-def write_analysis_to_doc(document_id, analysis, analysis_type):
-    """Writes the Gemini-generated analysis to the Google Doc."""
+def generate_combined_period_analysis(parser, doc_content, metrics=None, deadline=None):
+    """
+    Generates the weekly and monthly analyses, in one request when possible.
+
+    Falls back to two separate requests if the combined request fails or
+    its response does not validate, and to statistics-only analyses if the
+    Gemini budget of the deadline runs out.
+
+    Args:
+        parser: The ProductivityDataParser to use.
+        doc_content: The text of the Google Doc, or None to read the
+            parser's history store.
+        metrics: RunMetrics to record the stages in.
+        deadline: The run's Deadline; Gemini calls are bounded by its
+            "gemini" stage. Unbounded if None.
+
+    Returns:
+        A dict with "weekly" and "monthly" analysis texts (either may be
+        None if generation failed).
+    """
+    metrics = metrics or RunMetrics("combined")
+
+    data = {}
+    formatted = {}
+    for analysis_type in ("weekly", "monthly"):
+        with metrics.span(f"{analysis_type}.extract") as span:
+            data[analysis_type] = parser.extract_data_for_analysis(doc_content, analysis_type)
+            span.record('entries', len(data[analysis_type].get('daily_logs', [])))
+        with metrics.span(f"{analysis_type}.format") as span:
+            formatted[analysis_type] = parser.format_data_for_gemini(data[analysis_type], analysis_type)
+            span.record('chars', len(formatted[analysis_type]))
 
-    service = authenticate_google_docs_api()
+    router = get_model_router()
+    with metrics.span("combined.gemini") as span:
+        attempts_before = len(router.history)
+        analyses = None
+        if not gemini_budget_spent(deadline):
+            analyses = generate_combined_analysis_with_gemini(formatted["weekly"], formatted["monthly"],
+                                                              timeout=stage_timeout(deadline, "gemini"))
+        record_model_attempts(span, router.history[attempts_before:])
+        span.record('valid', analyses is not None)
+    if analyses is not None:
+        return analyses
+
+    if not gemini_budget_spent(deadline):
+        print("Falling back to separate weekly and monthly requests...")
+    analyses = {}
+    for analysis_type in ("weekly", "monthly"):
+        with metrics.span(f"{analysis_type}.gemini") as span:
+            attempts_before = len(router.history)
+            analyses[analysis_type] = analyze_within_deadline(parser, data[analysis_type], formatted[analysis_type],
+                                                              analysis_type, None, deadline, span)
+            record_model_attempts(span, router.history[attempts_before:])
+    return analyses
+
+def gemini_budget_spent(deadline):
+    """Returns whether the Gemini stage of a run Deadline is over (never without a deadline)."""
+    return deadline is not None and deadline.expired("gemini")
+
+def analyze_within_deadline(parser, data, formatted_data, analysis_type, reference_date, deadline, span, background=None):
+    """
+    Calls Gemini within the deadline's Gemini budget, degrading to statistics only.
+
+    When the budget is already spent the call is skipped; when it runs out
+    during the call the partial attempt is abandoned. Either way the
+    analysis is replaced by the numeric summary of the data, so the run
+    still writes something useful.
+
+    Args:
+        parser: The ProductivityDataParser that extracted the data.
+        data: The extracted data.
+        formatted_data: The data formatted for Gemini.
+        analysis_type: "weekly", "monthly", "quarterly" or "yearly".
+        reference_date: The last day of the analyzed period, or None.
+        deadline: The run's Deadline, or None for an unbounded call.
+        span: The metrics span of the Gemini stage.
+        background: Formatted history shared by a batch of analyses.
+
+    Returns:
+        The analysis text, or None if generation failed for another reason.
+    """
+    analysis = None
+    if not gemini_budget_spent(deadline):
+        analysis = generate_analysis_with_gemini(formatted_data, analysis_type, reference_date,
+                                                 timeout=stage_timeout(deadline, "gemini"), background=background)
+    if analysis is None and gemini_budget_spent(deadline):
+        print(f"Gemini did not finish the {analysis_type} analysis within the run deadline; using statistics only")
+        analysis = parser.format_stats_only(data, analysis_type)
+        span.record('stats_only', True)
+    return analysis
+
+def generate_period_analysis(parser, doc_content, analysis_type, reference_date=None, metrics=None, deadline=None,
+                             period_start=None, background=None):
+    """
+    Extracts, formats and analyzes the data for one analysis type.
+
+    Args:
+        parser: The ProductivityDataParser to use.
+        doc_content: The text of the Google Doc, or None to read the
+            parser's history store.
+        analysis_type: "weekly", "monthly", "quarterly" or "yearly".
+        reference_date: The last day of the period to analyze; now if None.
+        metrics: RunMetrics to record the extract, format and Gemini stages in.
+        deadline: The run's Deadline; the Gemini call is bounded by its
+            "gemini" stage and replaced by statistics only once that is
+            spent. Unbounded if None.
+        period_start: The first day of the period; see
+            ProductivityDataParser.extract_data_for_analysis.
+        background: Formatted history shared by a batch of analyses, sent
+            ahead of the period's data.
+
+    Returns:
+        The analysis text, or None if generation failed.
+    """
+    metrics = metrics or RunMetrics(analysis_type)
+
+    with metrics.span(f"{analysis_type}.extract") as span:
+        data = parser.extract_data_for_analysis(doc_content, analysis_type, reference_date, period_start)
+        span.record('entries', len(data.get('daily_logs', [])))
+
+    with metrics.span(f"{analysis_type}.format") as span:
+        formatted_data = parser.format_data_for_gemini(data, analysis_type)
+        span.record('chars', len(formatted_data))
+
+    with metrics.span(f"{analysis_type}.gemini") as span:
+        router = get_model_router()
+        attempts_before = len(router.history)
+        analysis = analyze_within_deadline(parser, data, formatted_data, analysis_type, reference_date, deadline, span,
+                                           background)
+        record_model_attempts(span, router.history[attempts_before:])
+
+    return analysis
+
+def record_model_attempts(span, attempts):
+    """Records the model, prompt tokens and attempt count of a Gemini stage."""
+    if attempts:
+        model, prompt_tokens, _, _ = attempts[-1]
+        span.record('model', model)
+        span.record('prompt_tokens', prompt_tokens)
+        span.record('attempts', len(attempts))
+
+def docs_length(text):
+    """Returns the length of a text in the Docs API's indexes, which count UTF-16 code units."""
+    return len(text.encode('utf-16-le')) // 2
+
+def section_requests(section_title, text, index=1):
+    """
+    Returns the batchUpdate requests inserting a bold heading and its text.
+
+    Args:
+        section_title: The heading.
+        text: The text below the heading.
+        index: The document index the section starts at (1 is the beginning).
+
+    Returns:
+        A (requests, next index) tuple; the next index is just after the section.
+    """
+    text_index = index + docs_length(section_title) + 1
+    requests = [
+        {
+            'insertText': {
+                'location': {
+                    'index': index
+                },
+                'text': section_title + "\n",
+            }
+        },
+        {
+            'updateTextStyle': {  # Style the title as a heading
+                'range': {
+                    'startIndex': index,
+                    'endIndex': text_index,
+                },
+                'textStyle': {
+                    'bold': True,
+                    'fontSize': {
+                        'magnitude': 16,
+                        'unit': 'PT'
+                    }
+                },
+                'fields': 'bold,fontSize'  # only the requested modifications
+            }
+        },
+        {
+            'insertText': {
+                'location': {
+                    'index': text_index  # After the title
+                },
+                'text': text + "\n\n",
+            }
+        },
+    ]
+    return requests, text_index + docs_length(text) + 2
+
+def write_sections_to_doc(document_id, sections, service=None, timeout=None, description="analysis"):
+    """
+    Writes titled sections to the beginning of the Google Doc in a single batchUpdate.
+
+    Args:
+        document_id: The Google Doc ID.
+        sections: (section title, text) pairs, in the order they should appear.
+        service: An authenticated Docs API service to reuse; a new one is
+            built when None.
+        timeout: Seconds the request may take; unbounded if None. Nothing is
+            written when it is already spent.
+        description: What is written, for log messages.
+
+    Returns:
+        The batchUpdate response, or None on failure.
+    """
+    if timeout is not None and timeout <= 0:
+        print(f"Skipping writing the {description}: the run deadline is spent")
+        return None
+    if service is None:
+        service = authenticate_google_docs_api()
     if not service:
-        print(f"Error: Failed to authenticate with Google Docs API for writing {analysis_type} analysis")
-        return
+        print(f"Error: Failed to authenticate with Google Docs API for writing {description}")
+        return None
 
     try:
-        print(f"Attempting to write {analysis_type} analysis to document {document_id}")
-        
-        # Create structured analysis by type to append as a section of content.
-        if analysis_type == "weekly":
-            section_title = "Weekly Analysis"
-        elif analysis_type == "monthly":
-            section_title = "Monthly Analysis"
-        else:
-            print(f"Error: Invalid analysis_type '{analysis_type}'. Must be 'weekly' or 'monthly'.")
-            return "Error: Invalid analysis_type. Must be 'weekly' or 'monthly'."
-
-        # Basic structure to contain the title as a heading and the analysis text below the title.
-        requests = [
-            {
-                'insertText': {
-                    'location': {
-                        'index': 1  # Beginning of the document. Adjust if needed.
-                    },
-                    'text': section_title + "\n",
-                }
-            },
-            {
-                'updateTextStyle': {  # Add this new request for title as heading
-                    'range': {
-                        'startIndex': 1,
-                        'endIndex': len(section_title) + 2,
-                    },
-                    'textStyle': {
-                        'bold': True,
-                        'fontSize': {
-                            'magnitude': 16,
-                            'unit': 'PT'
-                        }
-                    },
-                    'fields': 'bold,fontSize'  # only the requested modifications
-                }
-            },
-            {
-                'insertText': {
-                    'location': {
-                        'index': len(section_title) + 2  # After the title
-                    },
-                    'text': analysis + "\n\n",
-                }
-            },
-        ]
-        
-        print(f"Sending batchUpdate request to Google Docs API for {analysis_type} analysis")
-        result = service.documents().batchUpdate(documentId=document_id,
-                                                body={'requests': requests}).execute()
-        print(f"Successfully updated document {document_id} with {analysis_type} analysis")
+        print(f"Attempting to write {description} to document {document_id}")
+
+        requests = []
+        index = 1  # Beginning of the document
+        for section_title, text in sections:
+            section, index = section_requests(section_title, text, index)
+            requests.extend(section)
+
+        print(f"Sending batchUpdate request to Google Docs API for {description}")
+        request = service.documents().batchUpdate(documentId=document_id, body={'requests': requests})
+        with http_timeout(request.http, timeout):
+            result = request.execute()
+        print(f"Successfully updated document {document_id} with {description}")
         return result
     except HttpError as err:
         print(f"Error writing to Google Doc: {err}")
@@ -191,6 +799,28 @@ def write_analysis_to_doc(document_id, analysis, analysis_type):
         print(f"Unexpected error writing to Google Doc: {e}")
         return None
 
+def write_analysis_to_doc(document_id, analysis, analysis_type, service=None, section_title=None, timeout=None):
+    """
+    Writes the Gemini-generated analysis to the Google Doc.
+
+    Args:
+        document_id: The Google Doc ID.
+        analysis: The analysis text.
+        analysis_type: "weekly", "monthly", "quarterly" or "yearly".
+        service: An authenticated Docs API service to reuse; a new one is
+            built when None.
+        section_title: The heading to write above the analysis. Defaults to
+            the analysis type's title, e.g. "Weekly Analysis".
+        timeout: Seconds the request may take; unbounded if None. Nothing is
+            written when it is already spent.
+    """
+    if analysis_type not in ("weekly", "monthly", "quarterly", "yearly"):
+        print(f"Error: Invalid analysis_type '{analysis_type}'. Must be 'weekly', 'monthly', 'quarterly' or 'yearly'.")
+        return "Error: Invalid analysis_type. Must be 'weekly', 'monthly', 'quarterly' or 'yearly'."
+    section_title = section_title or f"{analysis_type.capitalize()} Analysis"
+    return write_sections_to_doc(document_id, [(section_title, analysis)], service, timeout,
+                                 description=f"{analysis_type} analysis")
+
 def main(automated=False):
     """Main function to run the productivity tracker."""
     print("Productivity and Mood Tracker")
@@ -206,22 +836,70 @@ def main(automated=False):
             return
         document_id = input("Enter your Google Doc ID: ")
     
-    # Read the Google Doc
-    print("Reading Google Doc...")
-    doc_content = read_google_doc(document_id)
+    # Time each stage; the record is written to METRICS_FILE ("-" for stdout), if set
+    metrics = metrics_from_env("analyze")
+    metrics_file = os.environ.get("METRICS_FILE")
     
-    if not doc_content:
-        print("Failed to read the Google Doc. Please check your credentials and document ID.")
-        return
+    # An optional RUN_DEADLINE bounds the whole run, split into fetch, parse, Gemini and write budgets
+    deadline = deadline_from_env()
+    
+    # Authenticate once and reuse the service for reading and writing
+    with metrics.span("auth"):
+        service = authenticate_google_docs_api()
+    
+    # Parsed entries are also kept in the optional history store at HISTORY_DB
+    history_store = store_from_env()
+    from_history = os.environ.get("FROM_HISTORY", "").lower() == "true"
     
-    # Create a parser instance
-    parser = ProductivityDataParser()
+    # Create a parser instance; the snapshot and rollups are cached per document
+    parser = ProductivityDataParser(cache_dir=get_cache_dir(document_id), store=history_store, user=document_id)
+    
+    if from_history:
+        # Analyze the stored entries instead of fetching the document
+        if history_store is None:
+            print("Error: reading from the history store requires HISTORY_DB (--history-db).")
+            metrics.record('outcome', 'no_history_store')
+            metrics.emit(metrics_file)
+            return
+        print(f"Reading stored history from {history_store.path}...")
+        doc_content = None
+        metrics.record('source', 'history')
+    else:
+        # Read the Google Doc
+        print("Reading Google Doc...")
+        with metrics.span("fetch") as span:
+            if deadline is not None and deadline.expired("fetch"):
+                doc_content, fetch_stats = None, {'timed_out': True}
+            elif service:
+                doc_content, fetch_stats = fetch_document_text(document_id, service, timeout=stage_timeout(deadline, "fetch"))
+            else:
+                doc_content, fetch_stats = None, {}
+            for key, value in fetch_stats.items():
+                span.record(key, value)
+            span.record('chars', len(doc_content or ""))
+        
+        if not doc_content and fetch_stats.get('timed_out') and parser.use_cached_snapshot():
+            # Analyze the last successfully parsed state rather than nothing
+            print("Fetching the Google Doc timed out; analyzing the cached snapshot instead.")
+            metrics.record('source', 'snapshot')
+        elif not doc_content:
+            print("Failed to read the Google Doc. Please check your credentials and document ID.")
+            metrics.record('outcome', 'fetch_timeout' if fetch_stats.get('timed_out') else 'fetch_failed')
+            metrics.emit(metrics_file)
+            return
+        else:
+            # Keep the local snapshot, rollups, search index and history store in sync with the document
+            with metrics.span("parse") as span:
+                snapshot, _, _ = parser.refresh_snapshot(doc_content)
+                span.record('daily_logs', len(snapshot.daily_logs))
+                span.record('weekly_reviews', len(snapshot.weekly_reviews))
+                span.record('new_entries', parser.new_entries)
     
     # Check if analysis type is provided as an environment variable
     analysis_type = os.environ.get("ANALYSIS_TYPE", "both")
     
     # If not, prompt the user for it
-    if analysis_type not in ["weekly", "monthly", "both"]:
+    if analysis_type not in ["weekly", "monthly", "quarterly", "yearly", "both"]:
         if automated:
             analysis_type = "both"
         else:
@@ -229,13 +907,19 @@ def main(automated=False):
             print("1. Weekly Analysis")
             print("2. Monthly Analysis")
             print("3. Both")
+            print("4. Quarterly Analysis")
+            print("5. Yearly Analysis")
             
-            choice = input("Enter your choice (1-3): ")
+            choice = input("Enter your choice (1-5): ")
             
             if choice == "1":
                 analysis_type = "weekly"
             elif choice == "2":
                 analysis_type = "monthly"
+            elif choice == "4":
+                analysis_type = "quarterly"
+            elif choice == "5":
+                analysis_type = "yearly"
             else:
                 analysis_type = "both"
     
@@ -246,15 +930,20 @@ def main(automated=False):
     if automated:
         write_to_doc = True
     
+    # Optionally generate both analyses with one structured request
+    combined_analyses = None
+    if analysis_type == "both" and os.environ.get("COMBINED_ANALYSIS", "").lower() == "true":
+        print("\nGenerating weekly and monthly analyses in one request...")
+        combined_analyses = generate_combined_period_analysis(parser, doc_content, metrics, deadline)
+    
     if analysis_type == "weekly" or analysis_type == "both":
         print("\nGenerating weekly analysis...")
         
-        # Extract and format data for weekly analysis
-        weekly_data = parser.extract_data_for_analysis(doc_content, "weekly")
-        formatted_weekly_data = parser.format_data_for_gemini(weekly_data, "weekly")
-        
-        # Generate weekly analysis
-        weekly_analysis = generate_analysis_with_gemini(formatted_weekly_data, "weekly")
+        # Extract, format and analyze data for weekly analysis
+        if combined_analyses is not None:
+            weekly_analysis = combined_analyses["weekly"]
+        else:
+            weekly_analysis = generate_period_analysis(parser, doc_content, "weekly", metrics=metrics, deadline=deadline)
         
         if weekly_analysis:
             print("\nWeekly Analysis:")
@@ -265,18 +954,19 @@ def main(automated=False):
                 write_to_doc = write_to_doc_input.lower() == "y"
             
             if write_to_doc:
-                write_analysis_to_doc(document_id, weekly_analysis, "weekly")
+                with metrics.span("weekly.write"):
+                    write_analysis_to_doc(document_id, weekly_analysis, "weekly", service,
+                                          timeout=stage_timeout(deadline, "write"))
                 print("Weekly analysis written to document.")
     
     if analysis_type == "monthly" or analysis_type == "both":
         print("\nGenerating monthly analysis...")
         
-        # Extract and format data for monthly analysis
-        monthly_data = parser.extract_data_for_analysis(doc_content, "monthly")
-        formatted_monthly_data = parser.format_data_for_gemini(monthly_data, "monthly")
-        
-        # Generate monthly analysis
-        monthly_analysis = generate_analysis_with_gemini(formatted_monthly_data, "monthly")
+        # Extract, format and analyze data for monthly analysis
+        if combined_analyses is not None:
+            monthly_analysis = combined_analyses["monthly"]
+        else:
+            monthly_analysis = generate_period_analysis(parser, doc_content, "monthly", metrics=metrics, deadline=deadline)
         
         if monthly_analysis:
             print("\nMonthly Analysis:")
@@ -287,10 +977,37 @@ def main(automated=False):
                 write_to_doc = write_to_doc_input.lower() == "y"
             
             if write_to_doc:
-                write_analysis_to_doc(document_id, monthly_analysis, "monthly")
+                with metrics.span("monthly.write"):
+                    write_analysis_to_doc(document_id, monthly_analysis, "monthly", service,
+                                          timeout=stage_timeout(deadline, "write"))
                 print("Monthly analysis written to document.")
     
+    if analysis_type in ("quarterly", "yearly"):
+        print(f"\nGenerating {analysis_type} analysis...")
+        
+        # Quarterly and yearly data come from the incrementally maintained rollups
+        period_analysis = generate_period_analysis(parser, doc_content, analysis_type, metrics=metrics, deadline=deadline)
+        
+        if period_analysis:
+            print(f"\n{analysis_type.capitalize()} Analysis:")
+            print(period_analysis)
+            
+            if not write_to_doc and not automated:
+                write_to_doc_input = input("\nWould you like to write this analysis to your Google Doc? (y/n): ")
+                write_to_doc = write_to_doc_input.lower() == "y"
+            
+            if write_to_doc:
+                with metrics.span(f"{analysis_type}.write"):
+                    write_analysis_to_doc(document_id, period_analysis, analysis_type, service,
+                                          timeout=stage_timeout(deadline, "write"))
+                print(f"{analysis_type.capitalize()} analysis written to document.")
+    
     print("\nAnalysis complete!")
+    metrics.record('analysis_type', analysis_type)
+    if deadline is not None:
+        metrics.record('deadline', deadline.summary())
+    metrics.record('outcome', 'ok')
+    metrics.emit(metrics_file)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,248 @@
+import os
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from snapshot import ParsedSnapshot, load_json, save_json
+
+PERIODS = ('week', 'month', 'quarter')
+
+def bucket_keys(date: datetime) -> Dict[str, str]:
+    """
+    Return the rollup bucket keys a date belongs to.
+
+    Args:
+        date: The date of a daily log.
+
+    Returns:
+        A dictionary mapping each period to its key, e.g.
+        {'week': '2023-W09', 'month': '2023-03', 'quarter': '2023-Q1'}.
+    """
+    iso_year, iso_week, _ = date.isocalendar()
+    return {
+        'week': f"{iso_year}-W{iso_week:02d}",
+        'month': f"{date.year}-{date.month:02d}",
+        'quarter': f"{date.year}-Q{(date.month - 1) // 3 + 1}",
+    }
+
+def bucket_dates(period: str, key: str) -> List[datetime]:
+    """
+    Return every date in a rollup bucket.
+
+    Args:
+        period: "week", "month" or "quarter".
+        key: The bucket key as returned by bucket_keys.
+
+    Returns:
+        The dates of the bucket, in order.
+    """
+    if period == 'week':
+        start = datetime.strptime(key + '-1', '%G-W%V-%u')
+        end = start + timedelta(days=7)
+    elif period == 'month':
+        start = datetime.strptime(key, '%Y-%m')
+        end = (start + timedelta(days=32)).replace(day=1)
+    elif period == 'quarter':
+        year, quarter = key.split('-Q')
+        start = datetime(int(year), 3 * (int(quarter) - 1) + 1, 1)
+        end = datetime(int(year) + 1, 1, 1) if quarter == '4' else datetime(int(year), 3 * int(quarter) + 1, 1)
+    else:
+        raise ValueError(f"Unknown rollup period: {period}")
+    return [start + timedelta(days=i) for i in range((end - start).days)]
+
+def new_bucket() -> Dict:
+    """Return an empty rollup bucket."""
+    return {
+        'days': 0,
+        'mood': {'count': 0, 'sum': 0.0, 'min': None, 'max': None},
+        'focus': {'count': 0, 'sum': 0.0, 'min': None, 'max': None},
+        'achievements': 0,
+        'challenges': 0,
+        'achievement_items': {},
+        'challenge_items': {},
+    }
+
+def add_to_bucket(bucket: Dict, log: Dict) -> None:
+    """
+    Add a daily log to a rollup bucket in place.
+
+    Args:
+        bucket: The bucket to update.
+        log: A dictionary representing a daily log.
+    """
+    bucket['days'] += 1
+
+    for metric in ('mood', 'focus'):
+        if metric in log:
+            value = log[metric]
+            aggregate = bucket[metric]
+            aggregate['count'] += 1
+            aggregate['sum'] += value
+            aggregate['min'] = value if aggregate['min'] is None else min(aggregate['min'], value)
+            aggregate['max'] = value if aggregate['max'] is None else max(aggregate['max'], value)
+
+    for field, items_field in (('achievements', 'achievement_items'), ('challenges', 'challenge_items')):
+        items = log.get(field, [])
+        bucket[field] += len(items)
+        for item in items:
+            bucket[items_field][item] = bucket[items_field].get(item, 0) + 1
+
+def merge_buckets(buckets: List[Dict]) -> Dict:
+    """
+    Combine several rollup buckets into one.
+
+    Args:
+        buckets: The buckets to combine.
+
+    Returns:
+        A new bucket holding the combined aggregates.
+    """
+    merged = new_bucket()
+    for bucket in buckets:
+        merged['days'] += bucket['days']
+        for metric in ('mood', 'focus'):
+            source, target = bucket[metric], merged[metric]
+            target['count'] += source['count']
+            target['sum'] += source['sum']
+            for bound, pick in (('min', min), ('max', max)):
+                if source[bound] is not None:
+                    target[bound] = source[bound] if target[bound] is None else pick(target[bound], source[bound])
+        for field in ('achievements', 'challenges'):
+            merged[field] += bucket[field]
+        for items_field in ('achievement_items', 'challenge_items'):
+            counts = Counter(merged[items_field])
+            counts.update(bucket[items_field])
+            merged[items_field] = dict(counts)
+    return merged
+
+def summarize_bucket(bucket: Dict, top_n: int = 5) -> Dict:
+    """
+    Turn a rollup bucket into a compact summary.
+
+    Args:
+        bucket: The bucket to summarize.
+        top_n: How many of the most frequent items to keep.
+
+    Returns:
+        A dictionary with means, ranges, counts and top items.
+    """
+    summary = {'days': bucket['days']}
+    for metric in ('mood', 'focus'):
+        aggregate = bucket[metric]
+        summary[metric] = {
+            'mean': round(aggregate['sum'] / aggregate['count'], 2) if aggregate['count'] else None,
+            'min': aggregate['min'],
+            'max': aggregate['max'],
+        }
+    summary['achievements'] = bucket['achievements']
+    summary['challenges'] = bucket['challenges']
+    summary['top_achievements'] = Counter(bucket['achievement_items']).most_common(top_n)
+    summary['top_challenges'] = Counter(bucket['challenge_items']).most_common(top_n)
+    return summary
+
+class RollupStore:
+    """Materialized per-week, per-month and per-quarter aggregates of the daily logs."""
+
+    FILENAME = "rollups.json"
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize the store.
+
+        Args:
+            cache_dir: The directory the rollups are persisted in, next to the
+                parsed snapshot. If None, the rollups only live in memory.
+        """
+        self.cache_dir = cache_dir
+        self.buckets: Dict[str, Dict[str, Dict]] = {period: {} for period in PERIODS}
+
+    @classmethod
+    def load(cls, cache_dir: Optional[str] = None) -> 'RollupStore':
+        """
+        Load the rollups from their cache directory.
+
+        Args:
+            cache_dir: The directory the rollups are persisted in.
+
+        Returns:
+            The loaded store, or an empty one if none was saved yet.
+        """
+        store = cls(cache_dir)
+        if cache_dir:
+            data = load_json(os.path.join(cache_dir, cls.FILENAME), {})
+            for period in PERIODS:
+                store.buckets[period] = data.get(period, {})
+        return store
+
+    def save(self) -> None:
+        """Persist the rollups, if the store has a cache directory."""
+        if self.cache_dir:
+            save_json(os.path.join(self.cache_dir, self.FILENAME), self.buckets)
+
+    def update(self, changed_logs: Dict, snapshot: ParsedSnapshot) -> int:
+        """
+        Update only the buckets touched by new, changed or deleted daily logs.
+
+        New days are added to their buckets directly. A changed or deleted
+        day cannot be subtracted (min/max are not reversible), so its buckets
+        are rebuilt from the snapshot's logs for just those buckets' dates;
+        a bucket left without logs is dropped.
+
+        Args:
+            changed_logs: The changed daily logs as returned by
+                ParsedSnapshot.merge, keyed by ISO date.
+            snapshot: The merged snapshot holding every parsed daily log.
+
+        Returns:
+            The number of buckets touched.
+        """
+        touched = set()
+        rebuild = set()
+
+        for key, (previous, log) in changed_logs.items():
+            keys = bucket_keys(datetime.strptime(key, '%Y-%m-%d'))
+            for period, bucket_key in keys.items():
+                touched.add((period, bucket_key))
+                if previous is None and (period, bucket_key) not in rebuild:
+                    bucket = self.buckets[period].setdefault(bucket_key, new_bucket())
+                    add_to_bucket(bucket, log)
+                else:
+                    rebuild.add((period, bucket_key))
+
+        for period, bucket_key in rebuild:
+            bucket = new_bucket()
+            for date in bucket_dates(period, bucket_key):
+                log = snapshot.daily_logs.get(date.strftime('%Y-%m-%d'))
+                if log is not None:
+                    add_to_bucket(bucket, log)
+            if bucket['days']:
+                self.buckets[period][bucket_key] = bucket
+            else:
+                self.buckets[period].pop(bucket_key, None)
+
+        return len(touched)
+
+    def get(self, period: str, key: str) -> Dict:
+        """
+        Return a bucket, or an empty bucket if nothing was logged in it.
+
+        Args:
+            period: "week", "month" or "quarter".
+            key: The bucket key.
+
+        Returns:
+            The rollup bucket.
+        """
+        return self.buckets[period].get(key, new_bucket())
+
+    def year(self, year: int) -> Dict:
+        """
+        Combine the four quarter buckets of a year.
+
+        Args:
+            year: The calendar year.
+
+        Returns:
+            The combined rollup bucket.
+        """
+        return merge_buckets([self.get('quarter', f"{year}-Q{quarter}") for quarter in range(1, 5)])
@@ -0,0 +1,233 @@
+import os
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+from snapshot import ParsedSnapshot, get_cache_dir, load_json, save_json
+from interval_index import parse_week_interval
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+STOPWORDS = {
+    'a', 'an', 'and', 'at', 'by', 'for', 'from', 'in', 'into', 'is', 'it', 'of',
+    'on', 'or', 'the', 'to', 'was', 'were', 'with',
+}
+
+# Fields indexed for each kind of entry
+DAILY_FIELDS = ('achievements', 'challenges', 'notes')
+REVIEW_FIELDS = ('key_achievements', 'challenges')
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase search tokens, dropping stopwords.
+
+    Args:
+        text: The text to tokenize.
+
+    Returns:
+        The tokens in order of appearance.
+    """
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in STOPWORDS]
+
+def entry_texts(entry: Dict, fields: Tuple[str, ...]) -> List[Tuple[str, str]]:
+    """
+    Return the searchable (field, text) pairs of a log or review.
+
+    Args:
+        entry: A daily log or weekly review dictionary.
+        fields: The fields to include.
+
+    Returns:
+        A list of (field, text) pairs, one per item or note.
+    """
+    texts = []
+    for field in fields:
+        value = entry.get(field)
+        if isinstance(value, list):
+            texts.extend((field, item) for item in value)
+        elif value:
+            texts.append((field, value))
+    return texts
+
+class SearchIndex:
+    """Persistent inverted index from tokens to the dated entries mentioning them."""
+
+    FILENAME = "search_index.json"
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize the index.
+
+        Args:
+            cache_dir: The directory the index is persisted in, next to the
+                parsed snapshot. If None, the index only lives in memory.
+        """
+        self.cache_dir = cache_dir
+        # token -> {entry_id: [fields the token appears in]}
+        self.postings: Dict[str, Dict[str, List[str]]] = {}
+        # entry_id -> ISO date used to order results
+        self.entry_dates: Dict[str, str] = {}
+
+    @classmethod
+    def load(cls, cache_dir: Optional[str] = None) -> 'SearchIndex':
+        """
+        Load the index from its cache directory.
+
+        Args:
+            cache_dir: The directory the index is persisted in.
+
+        Returns:
+            The loaded index, or an empty one if none was saved yet.
+        """
+        index = cls(cache_dir)
+        if cache_dir:
+            data = load_json(os.path.join(cache_dir, cls.FILENAME), {})
+            index.postings = data.get('postings', {})
+            index.entry_dates = data.get('entry_dates', {})
+        return index
+
+    def save(self) -> None:
+        """Persist the index, if it has a cache directory."""
+        if self.cache_dir:
+            save_json(os.path.join(self.cache_dir, self.FILENAME), {
+                'postings': self.postings,
+                'entry_dates': self.entry_dates,
+            })
+
+    def _add(self, entry_id: str, entry: Dict, fields: Tuple[str, ...]) -> None:
+        """Add the postings of one entry."""
+        for field, text in entry_texts(entry, fields):
+            for token in set(tokenize(text)):
+                entry_fields = self.postings.setdefault(token, {}).setdefault(entry_id, [])
+                if field not in entry_fields:
+                    entry_fields.append(field)
+
+    def _remove(self, entry_id: str, entry: Dict, fields: Tuple[str, ...]) -> None:
+        """Remove the postings of one entry, using its previously indexed content."""
+        for _, text in entry_texts(entry, fields):
+            for token in set(tokenize(text)):
+                postings = self.postings.get(token)
+                if postings and entry_id in postings:
+                    del postings[entry_id]
+                    if not postings:
+                        del self.postings[token]
+
+    def update(self, changed_logs: Dict, changed_reviews: Dict) -> int:
+        """
+        Re-index only new or changed entries, and drop deleted ones.
+
+        Args:
+            changed_logs: The changed daily logs as returned by
+                ParsedSnapshot.merge, keyed by ISO date.
+            changed_reviews: The changed weekly reviews, keyed by week.
+
+        Returns:
+            The number of entries re-indexed.
+        """
+        for date_key, (previous, log) in changed_logs.items():
+            entry_id = f"day:{date_key}"
+            if previous is not None:
+                self._remove(entry_id, previous, DAILY_FIELDS)
+            if log is None:
+                self.entry_dates.pop(entry_id, None)
+                continue
+            self._add(entry_id, log, DAILY_FIELDS)
+            self.entry_dates[entry_id] = date_key
+
+        for week, (previous, review) in changed_reviews.items():
+            entry_id = f"week:{week}"
+            if previous is not None:
+                self._remove(entry_id, previous, REVIEW_FIELDS)
+            if review is None:
+                self.entry_dates.pop(entry_id, None)
+                continue
+            self._add(entry_id, review, REVIEW_FIELDS)
+            interval = parse_week_interval(week)
+            self.entry_dates[entry_id] = interval[1].strftime('%Y-%m-%d') if interval else ''
+
+        return len(changed_logs) + len(changed_reviews)
+
+    def search(self, query: str) -> List[Tuple[str, List[str]]]:
+        """
+        Find the entries containing every token of a query.
+
+        Args:
+            query: The search query.
+
+        Returns:
+            (entry_id, matching fields) pairs, most recent first.
+        """
+        tokens = set(tokenize(query))
+        if not tokens:
+            return []
+
+        # Intersect the rarest postings first
+        posting_lists = sorted((self.postings.get(token, {}) for token in tokens), key=len)
+        matches = set(posting_lists[0])
+        for postings in posting_lists[1:]:
+            matches &= postings.keys()
+            if not matches:
+                return []
+
+        results = []
+        for entry_id in matches:
+            fields = sorted({field for postings in posting_lists for field in postings[entry_id]})
+            results.append((entry_id, fields))
+
+        results.sort(key=lambda result: self.entry_dates.get(result[0], ''), reverse=True)
+        return results
+
+def search_entries(query: str, cache_dir: str, limit: Optional[int] = 20) -> List[Dict]:
+    """
+    Search the persisted index and look the matches up in the parsed snapshot.
+
+    Args:
+        query: The search query.
+        cache_dir: The document's cache directory.
+        limit: The maximum number of results, or None for all.
+
+    Returns:
+        A list of results, most recent first, each with the entry id, date,
+        matching field texts and the entry itself.
+    """
+    index = SearchIndex.load(cache_dir)
+    snapshot = ParsedSnapshot.load(cache_dir)
+    tokens = set(tokenize(query))
+
+    results = []
+    for entry_id, fields in index.search(query)[:limit]:
+        kind, key = entry_id.split(':', 1)
+        entry = snapshot.daily_logs.get(key) if kind == 'day' else snapshot.weekly_reviews.get(key)
+        if entry is None:
+            continue
+
+        # Keep only the item or note texts that actually contain a query token
+        texts = [
+            (field, text)
+            for field, text in entry_texts(entry, tuple(fields))
+            if tokens & set(tokenize(text))
+        ]
+        results.append({
+            'id': entry_id,
+            'date': entry.get('date') or f"Week of {key}",
+            'matches': texts,
+            'entry': entry,
+        })
+
+    return results
+
+def main(query: str, document_id: Optional[str] = None, limit: int = 20):
+    """Search the locally indexed logs of a document and print the matches."""
+    cache_dir = get_cache_dir(document_id)
+    if not os.path.exists(os.path.join(cache_dir, SearchIndex.FILENAME)):
+        print("No search index found. Run an analysis first to build it from your Google Doc.")
+        return
+
+    start = time.perf_counter()
+    results = search_entries(query, cache_dir, limit)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    print(f"Found {len(results)} matching entries for '{query}' in {elapsed_ms:.1f} ms")
+    for result in results:
+        print(f"\n{result['date']}")
+        for field, text in result['matches']:
+            print(f"- {field.replace('_', ' ').capitalize()}: {text}")
@@ -0,0 +1,151 @@
+import os
+import json
+from typing import Dict, List, Optional, Tuple
+
+from stats import parse_log_date
+
+DEFAULT_CACHE_DIR = ".habit_cache"
+
+def get_cache_root() -> str:
+    """
+    Return the root of the local cache.
+
+    Defaults to .habit_cache and can be overridden with the HABIT_CACHE_DIR
+    environment variable.
+    """
+    return os.environ.get("HABIT_CACHE_DIR", DEFAULT_CACHE_DIR)
+
+def get_cache_dir(document_id: Optional[str] = None) -> str:
+    """
+    Return the local cache directory for a document, creating it if needed.
+
+    Args:
+        document_id: The Google Doc ID the cache belongs to.
+
+    Returns:
+        The path of the cache directory.
+    """
+    path = os.path.join(get_cache_root(), document_id or "default")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def daily_log_key(log: Dict) -> Optional[str]:
+    """Return the ISO date key of a daily log, or None if it has no valid date."""
+    date = parse_log_date(log.get('date'))
+    return date.strftime('%Y-%m-%d') if date else None
+
+def save_json(path: str, data) -> None:
+    """Write JSON atomically so an interrupted run never leaves a torn file."""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+def load_json(path: str, default):
+    """Read JSON from a file, returning the default if it is missing or corrupt."""
+    if not os.path.exists(path):
+        return default
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: ignoring unreadable cache file {path}: {e}")
+        return default
+
+class ParsedSnapshot:
+    """The last parsed state of a document, keyed for incremental updates."""
+
+    FILENAME = "parsed_snapshot.json"
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Initialize the snapshot.
+
+        Args:
+            cache_dir: The directory the snapshot is persisted in. If None,
+                the snapshot only lives in memory.
+        """
+        self.cache_dir = cache_dir
+        self.daily_logs: Dict[str, Dict] = {}
+        self.weekly_reviews: Dict[str, Dict] = {}
+
+    @classmethod
+    def load(cls, cache_dir: Optional[str] = None) -> 'ParsedSnapshot':
+        """
+        Load the snapshot from its cache directory.
+
+        Args:
+            cache_dir: The directory the snapshot is persisted in.
+
+        Returns:
+            The loaded snapshot, or an empty one if none was saved yet.
+        """
+        snapshot = cls(cache_dir)
+        if cache_dir:
+            data = load_json(os.path.join(cache_dir, cls.FILENAME), {})
+            snapshot.daily_logs = data.get('daily_logs', {})
+            snapshot.weekly_reviews = data.get('weekly_reviews', {})
+        return snapshot
+
+    def save(self) -> None:
+        """Persist the snapshot, if it has a cache directory."""
+        if self.cache_dir:
+            save_json(os.path.join(self.cache_dir, self.FILENAME), {
+                'daily_logs': self.daily_logs,
+                'weekly_reviews': self.weekly_reviews,
+            })
+
+    def merge(self, daily_logs: List[Dict], weekly_reviews: List[Dict]) -> Tuple[Dict[str, Tuple[Optional[Dict], Optional[Dict]]], Dict[str, Tuple[Optional[Dict], Optional[Dict]]]]:
+        """
+        Merge freshly parsed entries into the snapshot.
+
+        The parsed entries are the whole document, so entries the snapshot
+        holds but the document no longer has are removed. When a key is
+        repeated in the document its last entry wins, and it is reported once,
+        against the entry from before the merge.
+
+        Args:
+            daily_logs: The parsed daily logs.
+            weekly_reviews: The parsed weekly reviews.
+
+        Returns:
+            Two dictionaries (daily logs by ISO date, weekly reviews by week)
+            mapping each new, changed or deleted entry to a (previous,
+            current) pair. previous is None for new entries and current is
+            None for deleted ones.
+        """
+        changed_logs = {}
+        present = set()
+        for log in daily_logs:
+            key = daily_log_key(log)
+            if key is None:
+                continue
+            present.add(key)
+            # A repeated key is compared with the entry from before this merge
+            previous = changed_logs[key][0] if key in changed_logs else self.daily_logs.get(key)
+            if previous != log:
+                changed_logs[key] = (previous, log)
+            else:
+                changed_logs.pop(key, None)
+            self.daily_logs[key] = log
+        for key in [key for key in self.daily_logs if key not in present]:
+            changed_logs[key] = (self.daily_logs.pop(key), None)
+
+        changed_reviews = {}
+        present = set()
+        for review in weekly_reviews:
+            key = review.get('week')
+            if not key:
+                continue
+            present.add(key)
+            # A repeated key is compared with the entry from before this merge
+            previous = changed_reviews[key][0] if key in changed_reviews else self.weekly_reviews.get(key)
+            if previous != review:
+                changed_reviews[key] = (previous, review)
+            else:
+                changed_reviews.pop(key, None)
+            self.weekly_reviews[key] = review
+        for key in [key for key in self.weekly_reviews if key not in present]:
+            changed_reviews[key] = (self.weekly_reviews.pop(key), None)
+
+        return changed_logs, changed_reviews
@@ -0,0 +1,321 @@
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Union
+
+DAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# The rated metrics every series has; configured metrics (see metric_schema) are added after them
+RATING_METRICS = ('mood', 'focus')
+
+def parse_log_date(date_str: Optional[str]) -> Optional[datetime]:
+    """
+    Parse the date string of a daily log.
+
+    Args:
+        date_str: A date string such as "March 1, 2023".
+
+    Returns:
+        The parsed datetime, or None if the string is missing or invalid.
+    """
+    if not date_str:
+        return None
+    try:
+        return datetime.strptime(date_str, '%B %d, %Y')
+    except ValueError:
+        return None
+
+def build_daily_series(daily_logs: Union[List[Dict], np.ndarray], metrics: Sequence[str] = RATING_METRICS) -> Dict:
+    """
+    Build a contiguous, date-indexed daily series from parsed logs.
+
+    Days without a log (or without a rating) are filled with NaN so that
+    every statistic can be computed with vectorized NumPy operations.
+    If the same date is logged twice, the later log wins.
+
+    Args:
+        daily_logs: A list of dictionaries, each representing a daily log,
+            or the daily_logs structured array of a log archive (see
+            log_archive.LogArchive), which is read without conversion.
+        metrics: The numeric log fields to build series for; mood and focus
+            are always included.
+
+    Returns:
+        A dictionary of equally long arrays: dates (datetime64[D]), one per
+        metric, achievements, challenges and logged (bool).
+    """
+    metrics = list(RATING_METRICS) + [metric for metric in metrics if metric not in RATING_METRICS]
+    if isinstance(daily_logs, np.ndarray):
+        return _series_from_records(daily_logs, metrics)
+
+    # Keep only logs with a valid date
+    rows = []
+    for log in daily_logs:
+        date = parse_log_date(log.get('date'))
+        if date is not None:
+            rows.append((date, log))
+
+    if not rows:
+        empty = np.array([], dtype=float)
+        series = {'dates': np.array([], dtype='datetime64[D]')}
+        series.update((name, empty) for name in metrics + ['achievements', 'challenges'])
+        series['logged'] = np.array([], dtype=bool)
+        return series
+
+    dates = np.array([np.datetime64(date.date(), 'D') for date, _ in rows])
+    start = dates.min()
+    length = int((dates.max() - start).astype(int)) + 1
+    positions = (dates - start).astype(int)
+
+    # Allocate the calendar-aligned arrays
+    values = {metric: np.full(length, np.nan) for metric in metrics}
+    achievements = np.full(length, np.nan)
+    challenges = np.full(length, np.nan)
+    logged = np.zeros(length, dtype=bool)
+
+    # Scatter the logs into their calendar slots
+    for position, (_, log) in zip(positions, rows):
+        logged[position] = True
+        for metric, array in values.items():
+            array[position] = log.get(metric, np.nan)
+        achievements[position] = len(log.get('achievements', []))
+        challenges[position] = len(log.get('challenges', []))
+
+    return {
+        'dates': start + np.arange(length),
+        **values,
+        'achievements': achievements,
+        'challenges': challenges,
+        'logged': logged,
+    }
+
+def _series_from_records(records: np.ndarray, metrics: List[str]) -> Dict:
+    """Build the daily series from a structured array with date, metric, achievements and challenges fields."""
+    # Metrics the array has no field for are left out rather than filled with NaN
+    metrics = [metric for metric in metrics if metric in records.dtype.names]
+    records = records[~np.isnat(records['date'])]
+    if len(records) == 0:
+        return build_daily_series([], metrics)
+
+    dates = records['date'].astype('datetime64[D]')
+    start = dates.min()
+    length = int((dates.max() - start).astype(int)) + 1
+    positions = (dates - start).astype(int)
+
+    # Scatter every column at once; with repeated dates the later row is written last
+    series = {'dates': start + np.arange(length)}
+    for metric in metrics + ['achievements', 'challenges']:
+        values = np.full(length, np.nan)
+        values[positions] = records[metric]
+        series[metric] = values
+    logged = np.zeros(length, dtype=bool)
+    logged[positions] = True
+    series['logged'] = logged
+    return series
+
+def rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Compute a trailing rolling mean that ignores missing (NaN) days.
+
+    Args:
+        values: The daily values, with NaN for missing days.
+        window: The window length in days.
+
+    Returns:
+        An array of the same length; NaN where the window holds no values.
+    """
+    present = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(present, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(present)))
+
+    # Window sums and counts via differences of the prefix sums
+    upper = np.arange(1, len(values) + 1)
+    lower = np.maximum(upper - window, 0)
+    window_sums = sums[upper] - sums[lower]
+    window_counts = counts[upper] - counts[lower]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(window_counts > 0, window_sums / window_counts, np.nan)
+
+def day_of_week_profile(dates: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Compute the mean value for each day of the week.
+
+    Args:
+        dates: The datetime64[D] dates of the series.
+        values: The daily values, with NaN for missing days.
+
+    Returns:
+        An array of seven means (Monday first); NaN for days never logged.
+    """
+    present = ~np.isnan(values)
+    # 1970-01-01 was a Thursday, so shift by 3 to make Monday == 0
+    weekdays = (dates.astype('datetime64[D]').astype(int) + 3) % 7
+    sums = np.bincount(weekdays[present], weights=values[present], minlength=7)
+    counts = np.bincount(weekdays[present], minlength=7)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+def weekly_means(dates: np.ndarray, values: np.ndarray) -> Dict:
+    """
+    Compute the mean value for each calendar week (Monday to Sunday).
+
+    Args:
+        dates: The datetime64[D] dates of the series.
+        values: The daily values, with NaN for missing days.
+
+    Returns:
+        A dictionary with the week start dates and the weekly means.
+    """
+    if len(dates) == 0:
+        return {'week_starts': np.array([], dtype='datetime64[D]'), 'means': np.array([], dtype=float)}
+
+    days = dates.astype('datetime64[D]').astype(int)
+    week_starts = days - (days + 3) % 7
+    week_index = (week_starts - week_starts[0]) // 7
+
+    present = ~np.isnan(values)
+    n_weeks = int(week_index[-1]) + 1
+    sums = np.bincount(week_index[present], weights=values[present], minlength=n_weeks)
+    counts = np.bincount(week_index[present], minlength=n_weeks)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = np.where(counts > 0, sums / counts, np.nan)
+
+    return {
+        'week_starts': (week_starts[0] + 7 * np.arange(n_weeks)).astype('datetime64[D]'),
+        'means': means,
+    }
+
+def correlation(x: np.ndarray, y: np.ndarray) -> float:
+    """
+    Compute the Pearson correlation over the days where both values exist.
+
+    Args:
+        x: The first daily series.
+        y: The second daily series.
+
+    Returns:
+        The correlation coefficient, or NaN with fewer than three paired days
+        or a constant series.
+    """
+    paired = ~np.isnan(x) & ~np.isnan(y)
+    if paired.sum() < 3:
+        return float('nan')
+
+    xs = x[paired] - x[paired].mean()
+    ys = y[paired] - y[paired].mean()
+    denominator = np.sqrt((xs * xs).sum() * (ys * ys).sum())
+    if denominator == 0:
+        return float('nan')
+    return float((xs * ys).sum() / denominator)
+
+def _last_valid(values: np.ndarray) -> Optional[float]:
+    """Return the last non-NaN value of an array as a float, or None."""
+    valid = values[~np.isnan(values)]
+    return float(valid[-1]) if len(valid) else None
+
+def _rounded(value) -> Optional[float]:
+    """Round a NumPy or Python number for display, mapping NaN to None."""
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), 2)
+
+def compute_trend_stats(daily_logs: Union[List[Dict], np.ndarray], series: Optional[Dict] = None,
+                        metrics: Sequence[str] = RATING_METRICS) -> Dict:
+    """
+    Compute the trend statistics for a set of daily logs.
+
+    Args:
+        daily_logs: A list of dictionaries, each representing a daily log,
+            or the daily_logs array of a log archive.
+        series: An already built daily series (see build_daily_series), to
+            avoid rebuilding it.
+        metrics: The numeric log fields to compute trends for; mood and
+            focus are always included. Metrics never logged are left out.
+
+    Returns:
+        A JSON-serializable dictionary of statistics.
+    """
+    if series is None:
+        series = build_daily_series(daily_logs, metrics)
+
+    dates = series['dates']
+    stats = {
+        'days_logged': int(series['logged'].sum()),
+        'days_in_range': int(len(dates)),
+        'first_date': str(dates[0]) if len(dates) else None,
+        'last_date': str(dates[-1]) if len(dates) else None,
+    }
+
+    # Configured metrics appear only once someone has logged them
+    extra_metrics = [metric for metric in metrics if metric not in RATING_METRICS
+                     and metric in series and (~np.isnan(series[metric])).any()]
+    stats['metrics'] = list(RATING_METRICS) + extra_metrics
+
+    for metric in stats['metrics']:
+        values = series[metric]
+        weekly = weekly_means(dates, values)['means']
+        valid_weeks = weekly[~np.isnan(weekly)]
+
+        stats[metric] = {
+            'mean': _rounded(np.nanmean(values)) if (~np.isnan(values)).any() else None,
+            'rolling_7': _rounded(_last_valid(rolling_mean(values, 7))),
+            'rolling_28': _rounded(_last_valid(rolling_mean(values, 28))),
+            'week_over_week': _rounded(valid_weeks[-1] - valid_weeks[-2]) if len(valid_weeks) >= 2 else None,
+            'by_day_of_week': {
+                DAY_NAMES[i]: _rounded(value)
+                for i, value in enumerate(day_of_week_profile(dates, values))
+                if not np.isnan(value)
+            },
+        }
+
+    stats['mood_focus_correlation'] = _rounded(correlation(series['mood'], series['focus']))
+
+    # Rates are per logged day
+    logged = series['logged']
+    for metric in ('achievements', 'challenges'):
+        counts = series[metric][logged]
+        stats[f'{metric}_per_day'] = _rounded(counts.mean()) if len(counts) else None
+        stats[f'days_with_{metric}'] = _rounded((counts > 0).mean()) if len(counts) else None
+
+    return stats
+
+def format_stats_summary(stats: Dict, title: str = "Statistics") -> str:
+    """
+    Format trend statistics as a compact numeric summary for a prompt.
+
+    Args:
+        stats: The statistics returned by compute_trend_stats.
+        title: The heading, which should say which logs the statistics cover.
+
+    Returns:
+        A short, line-oriented summary.
+    """
+    if not stats.get('days_logged'):
+        return ""
+
+    def show(value):
+        return 'n/a' if value is None else f"{value:g}"
+
+    lines = [f"{title}:"]
+    lines.append(f"- Days logged: {stats['days_logged']}/{stats['days_in_range']} ({stats['first_date']} to {stats['last_date']})")
+
+    for metric in stats.get('metrics', RATING_METRICS):
+        metric_stats = stats[metric]
+        lines.append(
+            f"- {metric.replace('_', ' ').capitalize()}: mean {show(metric_stats['mean'])}, "
+            f"7d {show(metric_stats['rolling_7'])}, 28d {show(metric_stats['rolling_28'])}, "
+            f"WoW {show(metric_stats['week_over_week'])}"
+        )
+        profile = metric_stats['by_day_of_week']
+        if profile:
+            lines.append("  by weekday: " + " ".join(f"{day[:3]} {show(value)}" for day, value in profile.items()))
+
+    lines.append(f"- Mood-focus correlation: {show(stats['mood_focus_correlation'])}")
+    lines.append(
+        f"- Achievements/day: {show(stats['achievements_per_day'])}, "
+        f"challenges/day: {show(stats['challenges_per_day'])}"
+    )
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,141 @@
+import random
+import argparse
+from datetime import date, timedelta
+from typing import Optional
+
+# Preset history lengths, in days
+SIZES = {
+    'week': 7,
+    'month': 30,
+    'quarter': 91,
+    'year': 365,
+    '3years': 3 * 365,
+    '10years': 3652,
+}
+
+PROJECTS = ['the onboarding flow', 'the quarterly report', 'the API client', 'the billing migration',
+            'the mobile release', 'the data pipeline', 'the design review', 'the search feature',
+            'the hiring plan', 'the documentation site']
+ACHIEVEMENT_TEMPLATES = ['Finished {project}', 'Made progress on {project}', 'Reviewed two pull requests',
+                         'Wrote tests for {project}', 'Presented {project} to the team', 'Cleared my inbox',
+                         'Fixed a bug in {project}', 'Planned the next sprint', 'Went for a run',
+                         'Read for an hour', 'Paired with a colleague on {project}', 'Shipped {project}']
+CHALLENGE_TEMPLATES = ['Distracted by social media', 'Too many meetings', 'Slept badly',
+                       'Blocked on feedback for {project}', 'Struggled with focus in the afternoon',
+                       'Underestimated {project}', 'Context switching between tasks', 'Felt tired after lunch',
+                       'Unexpected support requests', 'Procrastinated on {project}']
+NOTES = ['Felt more productive in the morning', 'Need to improve time management',
+         'Good energy after exercise', 'Quiet day overall', 'Long day but satisfying',
+         'Should take more breaks', 'Deep work block helped a lot', 'Too much time in chat']
+GOALS = ['Finish {project}', 'Improve morning routine', 'Limit meetings to the afternoon',
+         'Start {project}', 'Exercise three times', 'Go to bed earlier']
+
+def _fill(rng: random.Random, template: str) -> str:
+    """Fill a template's project placeholder."""
+    return template.format(project=rng.choice(PROJECTS))
+
+def _score(rng: random.Random, level: float) -> str:
+    """Turn a latent level into a "N/10" score, sometimes with a half point."""
+    value = min(max(level + rng.gauss(0, 0.8), 1), 10)
+    value = round(value * 2) / 2 if rng.random() < 0.15 else round(value)
+    return f"{value:g}"
+
+def _format_date(day: date) -> str:
+    """Format a date the way the logs do, e.g. "March 6, 2023"."""
+    return f"{day:%B} {day.day}, {day.year}"
+
+def generate_log_text(days: int, seed: int = 0, start: Optional[date] = None, skip_rate: float = 0.1) -> str:
+    """
+    Generate a productivity log in the format ProductivityDataParser reads.
+
+    Daily entries run oldest first, with a weekly review after every
+    Sunday. Mood and focus follow a slow random walk with a weekend lift,
+    so trends, streaks and anomalies are present as in real logs. Item
+    text never contains "-", which the parser treats as a list separator.
+
+    Args:
+        days: The number of calendar days covered.
+        seed: The random seed; the same seed always yields the same text.
+        start: The first day. Defaults to the day that makes the history
+            end on December 31, 2023.
+        skip_rate: The fraction of days without an entry.
+
+    Returns:
+        The log text.
+    """
+    rng = random.Random(seed)
+    if start is None:
+        start = date(2024, 1, 1) - timedelta(days=days)
+
+    entries = []
+    mood_level, focus_level = 6.5, 6.0
+    week_moods, week_focus = [], []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        mood_level = min(max(mood_level + rng.gauss(0, 0.4) + 0.05 * (6.5 - mood_level), 2), 9.5)
+        focus_level = min(max(0.7 * focus_level + 0.3 * mood_level + rng.gauss(0, 0.4), 2), 9.5)
+        weekend = 0.5 if day.weekday() >= 5 else 0.0
+
+        if rng.random() >= skip_rate:
+            mood = _score(rng, mood_level + weekend)
+            focus = _score(rng, focus_level - weekend)
+            week_moods.append(float(mood))
+            week_focus.append(float(focus))
+            achievements = [_fill(rng, rng.choice(ACHIEVEMENT_TEMPLATES)) for _ in range(rng.randint(1, 4))]
+            challenges = [_fill(rng, rng.choice(CHALLENGE_TEMPLATES)) for _ in range(rng.randint(0, 3))]
+            lines = [
+                f"{day:%A}, {_format_date(day)}",
+                f"- Mood: {mood}/10",
+                f"- Focus: {focus}/10",
+                "- Achievements:",
+            ]
+            lines += [f"- {item}" for item in achievements]
+            lines.append("- Challenges:")
+            lines += [f"- {item}" for item in challenges]
+            lines.append(f"- Notes: {rng.choice(NOTES)}")
+            entries.append("\n".join(lines))
+
+        if day.weekday() == 6:
+            monday = day - timedelta(days=6)
+            if week_moods:
+                # Week labels use the end day alone, even when it is in the next month
+                week = f"{monday:%B} {monday.day}-{day.day}, {monday.year}"
+                lines = [
+                    f"Week of {week}",
+                    f"- Overall mood: {round(sum(week_moods) / len(week_moods))}/10",
+                    f"- Overall productivity: {round(sum(week_focus) / len(week_focus))}/10",
+                    "- Key achievements:",
+                ]
+                lines += [f"- {_fill(rng, rng.choice(ACHIEVEMENT_TEMPLATES))}" for _ in range(rng.randint(1, 3))]
+                lines.append("- Challenges:")
+                lines += [f"- {_fill(rng, rng.choice(CHALLENGE_TEMPLATES))}" for _ in range(rng.randint(1, 2))]
+                lines.append(f"- Goals for next week: {_fill(rng, rng.choice(GOALS))}")
+                entries.append("\n".join(lines))
+            week_moods, week_focus = [], []
+
+    return "\n\n".join(entries) + "\n"
+
+def history_end(days: int, start: Optional[date] = None) -> date:
+    """Return the last day covered by generate_log_text with the same arguments."""
+    if start is None:
+        start = date(2024, 1, 1) - timedelta(days=days)
+    return start + timedelta(days=days - 1)
+
+def main():
+    """Write a synthetic log to stdout or a file."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic productivity log")
+    parser.add_argument("--size", choices=sorted(SIZES), default="month", help="Preset history length")
+    parser.add_argument("--days", type=int, help="History length in days (overrides --size)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--output", type=str, help="Write to this file instead of stdout")
+    args = parser.parse_args()
+
+    text = generate_log_text(args.days or SIZES[args.size], seed=args.seed)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+    else:
+        print(text, end="")
+
+if __name__ == "__main__":
+    main()
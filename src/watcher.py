@@ -0,0 +1,299 @@
+import os
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional
+
+from data_parser import ProductivityDataParser
+from productivity_tracker import (
+    authenticate_google_docs_api,
+    generate_period_analysis,
+    get_document_revision,
+    read_google_doc,
+    write_analysis_to_doc,
+)
+from snapshot import ParsedSnapshot, get_cache_dir
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+WEEKDAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+# "<day> HH:MM", with a 24-hour clock
+SCHEDULE_PATTERN = re.compile(r'(\w+)\s+(\d{1,2}):(\d{2})')
+
+class SystemClock:
+    """Wall clock in UTC. Replace with any object with now() and sleep() to fake time."""
+
+    def now(self) -> datetime:
+        """Return the current UTC time as a naive datetime."""
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+
+    def sleep(self, seconds: float) -> None:
+        """Block for the given number of seconds."""
+        time.sleep(seconds)
+
+class ScheduledJob:
+    """An analysis that runs at a fixed weekly or monthly time (UTC)."""
+
+    def __init__(self, analysis_type: str, spec: str):
+        """
+        Initialize the job.
+
+        Args:
+            analysis_type: "weekly" or "monthly".
+            spec: "<weekday> HH:MM" (e.g. "fri 04:23") for a weekly job, or
+                "<day of month> HH:MM" (e.g. "1 04:23") for a monthly job,
+                with a 24-hour clock. Days after the 28th run on the 28th.
+
+        Raises:
+            ValueError: If the spec does not fit the analysis type.
+        """
+        self.analysis_type = analysis_type
+        self.spec = spec
+        if analysis_type == "weekly":
+            expected = '"<weekday> HH:MM", e.g. "fri 04:23"'
+        elif analysis_type == "monthly":
+            expected = '"<day of month> HH:MM", e.g. "1 04:23"'
+        else:
+            raise ValueError(f"Only weekly and monthly analyses can be scheduled, not '{analysis_type}'")
+
+        match = SCHEDULE_PATTERN.fullmatch(spec.strip())
+        if not match:
+            raise ValueError(f"Invalid {analysis_type} schedule '{spec}': expected {expected}")
+        day, hour, minute = match.group(1).lower(), int(match.group(2)), int(match.group(3))
+        if hour > 23 or minute > 59:
+            raise ValueError(f"Invalid {analysis_type} schedule '{spec}': {hour:02d}:{minute:02d} is not a time of day")
+        self.hour, self.minute = hour, minute
+
+        self.weekday, self.day_of_month = None, None
+        if analysis_type == "weekly":
+            if day in WEEKDAYS:
+                self.weekday = WEEKDAYS.index(day)
+            elif day in WEEKDAY_NAMES:
+                self.weekday = WEEKDAY_NAMES.index(day)
+            else:
+                raise ValueError(f"Invalid weekly schedule '{spec}': '{match.group(1)}' is not a weekday; expected {expected}")
+        else:
+            if not day.isdigit() or not 1 <= int(day) <= 31:
+                raise ValueError(f"Invalid monthly schedule '{spec}': '{match.group(1)}' is not a day of the month; expected {expected}")
+            self.day_of_month = int(day)
+        self.next_run: Optional[datetime] = None
+
+    def schedule_after(self, moment: datetime) -> datetime:
+        """
+        Compute and store the first run time strictly after a moment.
+
+        Args:
+            moment: The reference time.
+
+        Returns:
+            The next run time.
+        """
+        candidate = moment.replace(hour=self.hour, minute=self.minute, second=0, microsecond=0)
+        if self.weekday is not None:
+            candidate += timedelta(days=(self.weekday - candidate.weekday()) % 7)
+            if candidate <= moment:
+                candidate += timedelta(days=7)
+        else:
+            candidate = candidate.replace(day=min(self.day_of_month, 28))
+            while candidate <= moment:
+                month_start = (candidate.replace(day=1) + timedelta(days=32)).replace(day=1)
+                candidate = month_start.replace(day=min(self.day_of_month, 28))
+        self.next_run = candidate
+        return candidate
+
+class WatchDaemon:
+    """
+    Long-running alternative to cold-start cron runs.
+
+    Keeps the Docs client, the parser and the last document text warm,
+    polls only the document revision, and runs analyses from an in-process
+    scheduler and/or whenever new entries appear.
+    """
+
+    def __init__(self, document_id: str, service=None, clock=None,
+                 jobs: Optional[List[ScheduledJob]] = None,
+                 on_change: Optional[List[str]] = None,
+                 poll_interval: float = 300, write_to_doc: bool = True,
+                 generate: Callable = generate_period_analysis, cache_dir: Optional[str] = None):
+        """
+        Initialize the daemon.
+
+        Args:
+            document_id: The Google Doc ID.
+            service: The Docs API service; authenticated on first use if None.
+            clock: An object with now() and sleep(seconds); SystemClock if None.
+            jobs: Scheduled analyses.
+            on_change: Analysis types to run when new entries appear.
+            poll_interval: Seconds between revision checks.
+            write_to_doc: Whether to write analyses back to the document.
+            generate: Function (parser, doc_content, analysis_type,
+                reference_date) -> text; reference_date is the clock's now().
+            cache_dir: The directory of the parser's snapshot and derived
+                stores; the document's directory under the cache root if None.
+        """
+        self.document_id = document_id
+        self.service = service
+        self.clock = clock or SystemClock()
+        self.jobs = jobs or []
+        self.on_change = on_change or []
+        self.poll_interval = poll_interval
+        self.write_to_doc = write_to_doc
+        self.generate = generate
+
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.parser = ProductivityDataParser(cache_dir=cache_dir or get_cache_dir(document_id))
+        self.revision: Optional[str] = None
+        self.doc_content: Optional[str] = None
+        self.stopped = False
+        self.runs: List[tuple] = []
+
+        now = self.clock.now()
+        for job in self.jobs:
+            job.schedule_after(now)
+
+    def ensure_service(self) -> bool:
+        """Authenticate once and keep the service for the daemon's lifetime."""
+        if self.service is None:
+            self.service = authenticate_google_docs_api()
+        return self.service is not None
+
+    def check_for_changes(self) -> int:
+        """
+        Poll the revision and, only if it changed, re-fetch and re-parse.
+
+        Returns:
+            The number of new entries found (0 when the revision is unchanged).
+        """
+        revision = get_document_revision(self.document_id, self.service)
+        if revision is None or revision == self.revision:
+            return 0
+
+        doc_content = read_google_doc(self.document_id, self.service)
+        if not doc_content:
+            return 0
+
+        # Without a saved snapshot every entry looks new; that is an initial sync, not new entries
+        initial_sync = not os.path.exists(os.path.join(self.parser.cache_dir, ParsedSnapshot.FILENAME))
+
+        self.revision = revision
+        self.doc_content = doc_content
+        self.parser.refresh_snapshot(doc_content)
+        if initial_sync:
+            print(f"[{self.clock.now():%Y-%m-%d %H:%M}] Revision {revision}: initial sync")
+            return 0
+        print(f"[{self.clock.now():%Y-%m-%d %H:%M}] Revision {revision}: {self.parser.new_entries} new entries")
+        return self.parser.new_entries
+
+    def run_analysis(self, analysis_type: str, reason: str) -> Optional[str]:
+        """
+        Generate one analysis from the warm document text and write it back.
+
+        Args:
+            analysis_type: The analysis to run.
+            reason: Why it ran ("schedule" or "new entries"), for the log.
+
+        Returns:
+            The analysis text, or None if generation failed.
+        """
+        if self.doc_content is None:
+            return None
+
+        now = self.clock.now()
+        print(f"[{now:%Y-%m-%d %H:%M}] Running {analysis_type} analysis ({reason})")
+        # The analyzed week or month ends at the clock's time, not the host's
+        analysis = self.generate(self.parser, self.doc_content, analysis_type, reference_date=now)
+        self.runs.append((now, analysis_type, reason))
+
+        if analysis and self.write_to_doc:
+            write_analysis_to_doc(self.document_id, analysis, analysis_type, self.service)
+            # Our own write creates a new revision; don't treat it as new entries
+            self.revision = get_document_revision(self.document_id, self.service)
+        return analysis
+
+    def run_once(self) -> float:
+        """
+        Run one iteration: poll, then run change-triggered and due analyses.
+
+        Returns:
+            The number of seconds to sleep before the next iteration.
+        """
+        if not self.ensure_service():
+            return self.poll_interval
+
+        new_entries = self.check_for_changes()
+        if new_entries:
+            for analysis_type in self.on_change:
+                self.run_analysis(analysis_type, "new entries")
+
+        now = self.clock.now()
+        for job in self.jobs:
+            if job.next_run <= now:
+                self.run_analysis(job.analysis_type, "schedule")
+                job.schedule_after(now)
+
+        # Wake up for the next poll or the next scheduled job, whichever is first
+        next_job = min((job.next_run for job in self.jobs), default=None)
+        delay = self.poll_interval
+        if next_job is not None:
+            delay = min(delay, max((next_job - self.clock.now()).total_seconds(), 0))
+        return delay
+
+    def run(self, max_iterations: Optional[int] = None) -> None:
+        """
+        Run until stopped (or for a fixed number of iterations).
+
+        Args:
+            max_iterations: Stop after this many iterations; run forever if None.
+        """
+        iterations = 0
+        while not self.stopped and (max_iterations is None or iterations < max_iterations):
+            try:
+                delay = self.run_once()
+            except Exception as e:
+                print(f"Error in watch loop: {e}")
+                delay = self.poll_interval
+            iterations += 1
+            self.clock.sleep(delay)
+
+def main(poll_interval=300, weekly_at="fri 04:23", monthly_at=None, on_change=None, write_to_doc=True):
+    """
+    Main function to run the watch daemon.
+
+    Args:
+        poll_interval: Seconds between document revision checks.
+        weekly_at: Schedule spec for the weekly analysis, or None.
+        monthly_at: Schedule spec for the monthly analysis, or None.
+        on_change: Analysis types to run whenever new entries appear.
+        write_to_doc: Whether to write analyses back to the document.
+    """
+    print("Productivity and Mood Tracker - Watch Mode")
+    print("==========================================")
+
+    document_id = os.environ.get("GOOGLE_DOC_ID")
+    if not document_id:
+        print("Error: GOOGLE_DOC_ID environment variable is not set.")
+        return
+
+    jobs = []
+    try:
+        if weekly_at:
+            jobs.append(ScheduledJob("weekly", weekly_at))
+        if monthly_at:
+            jobs.append(ScheduledJob("monthly", monthly_at))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return
+
+    daemon = WatchDaemon(document_id, jobs=jobs, on_change=on_change,
+                         poll_interval=poll_interval, write_to_doc=write_to_doc)
+    for job in jobs:
+        print(f"Scheduled {job.analysis_type} analysis at '{job.spec}' UTC, next run {job.next_run:%Y-%m-%d %H:%M}")
+    if on_change:
+        print(f"Running {', '.join(on_change)} analysis whenever new entries appear")
+    print(f"Polling document revision every {poll_interval}s (Ctrl+C to stop)")
+
+    try:
+        daemon.run()
+    except KeyboardInterrupt:
+        print("\nStopping watch mode...")
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# productivity_tracker exits on import without a Gemini key; tests never call the real API
+os.environ.setdefault("GOOGLE_API_KEY_GEMINI", "test")
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from fake_google import FakeGoogleServer, FakeGoogleState
+
+@pytest.fixture
+def fake_google(monkeypatch, tmp_path):
+    """A local fake Docs/Gemini server that the API clients are pointed at, with an empty cache root."""
+    state = FakeGoogleState(days=60)
+    server = FakeGoogleServer(state, port=0).start()
+    monkeypatch.setenv("GOOGLE_DOCS_ENDPOINT", server.url)
+    monkeypatch.setenv("GEMINI_ENDPOINT", server.url)
+    monkeypatch.setenv("HABIT_CACHE_DIR", str(tmp_path / "cache"))
+    yield state
+    server.stop()
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import productivity_tracker
+from backfill import Backfill, format_backfill, is_partial, periods_since, shared_background
+from data_parser import ProductivityDataParser
+from history_store import HistoryStore
+from model_router import (GEMINI_MIN_CACHED_TOKENS, ModelOption, ModelRouter, StubModel, stub_client_factory,
+                          stub_context_factory)
+from synthetic_logs import generate_log_text
+
+SINCE = datetime(2023, 7, 12)
+UNTIL = datetime(2023, 11, 20)
+
+class WindowRecorder:
+    """Stands in for generate_period_analysis, recording the days each period's extract covers."""
+
+    def __init__(self):
+        self.days = []
+
+    def __call__(self, parser, doc_content, analysis_type, reference_date, period_start=None, background=None):
+        data = parser.extract_data_for_analysis(doc_content, analysis_type, reference_date, period_start)
+        self.days.extend(datetime.strptime(log['date'], '%B %d, %Y') for log in data['daily_logs'])
+        return f"{analysis_type} analysis"
+
+@pytest.fixture
+def parser(tmp_path):
+    """A parser whose in-memory store holds a year of logs ending December 31, 2023."""
+    parser = ProductivityDataParser(cache_dir=str(tmp_path), store=HistoryStore(":memory:"), user="backfill")
+    parser.refresh_snapshot(generate_log_text(365, seed=5, skip_rate=0.0))
+    return parser
+
+@pytest.mark.parametrize("analysis_type", ["weekly", "monthly"])
+def test_periods_tile_the_range(analysis_type):
+    periods = periods_since(SINCE, UNTIL, analysis_type)
+
+    assert periods[0][0] == SINCE and periods[-1][1] == UNTIL
+    for (_, end), (next_start, _) in zip(periods, periods[1:]):
+        assert next_start == end + timedelta(days=1)
+    assert [is_partial(start, end, analysis_type) for start, end in periods].count(True) == (1 if analysis_type == "weekly" else 2)
+
+@pytest.mark.parametrize("analysis_type", ["weekly", "monthly"])
+def test_backfill_analyzes_every_day_once_without_reparsing(parser, analysis_type, monkeypatch):
+    def fail(text):
+        raise AssertionError("a period job re-parsed the document")
+    monkeypatch.setattr(parser, "parse_daily_logs", fail)
+    recorder = WindowRecorder()
+
+    Backfill(parser, None, analysis_type, concurrency=1, generate=recorder).run(SINCE, UNTIL)
+
+    expected = [SINCE + timedelta(days=offset) for offset in range((UNTIL - SINCE).days + 1)]
+    assert sorted(recorder.days) == expected
+
+def test_partial_periods_are_labeled():
+    periods = periods_since(datetime(2023, 1, 1), datetime(2023, 1, 10), "weekly")
+    results = {end.date().isoformat(): "text" for _, end in periods}
+
+    text = format_backfill(results, "weekly", periods)
+
+    assert "Partial week, January 08 to January 10, 2023" in text
+    assert "Week ending January 07, 2023" in text
+
+def test_history_before_the_range_is_shared_as_cached_context(parser, monkeypatch):
+    monkeypatch.delenv("GEMINI_CACHE_MIN_TOKENS", raising=False)
+    stubs = {'standard': StubModel('standard')}
+    router = ModelRouter([ModelOption('standard')], client_factory=stub_client_factory(stubs),
+                         context_factory=stub_context_factory(stubs))
+    monkeypatch.setattr(productivity_tracker, "_model_router", router)
+
+    with router.context_caching() as cache:
+        background = shared_background(parser, SINCE, router, cache.min_tokens)
+        results = Backfill(parser, None, "weekly", concurrency=2, background=background).run(SINCE, UNTIL)
+        stats = cache.stats()
+
+    # Only days before the range are shared, so no period sees a later entry
+    assert "July 11, 2023" in background and "July 12, 2023" not in background
+    assert len(results) == len(periods_since(SINCE, UNTIL, "weekly"))
+    assert (stats['registrations'], stats['hits'], stats['misses']) == (1, len(results), 0)
+
+def test_a_short_history_is_not_shared(parser):
+    router = ModelRouter([ModelOption('standard')], client_factory=stub_client_factory({}))
+    assert shared_background(parser, datetime(2023, 2, 1), router, GEMINI_MIN_CACHED_TOKENS) is None
@@ -0,0 +1,59 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+from anomalies import detect_anomalies
+from dashboard import CHART_NAMES, build_chart, parse_dashboard_data
+from figure_cache import chart_inputs
+from interval_index import DailyLogIndex, logs_for_review
+from log_archive import LogArchive, write_archive
+from synthetic_logs import generate_log_text
+
+@pytest.fixture
+def sources(tmp_path):
+    """The same history as parsed document text and as a memory-mapped archive."""
+    text = generate_log_text(400, seed=3)
+    daily_logs, weekly_reviews = parse_dashboard_data(text)
+    write_archive(daily_logs, weekly_reviews, str(tmp_path / "archive"))
+    return text, LogArchive(str(tmp_path / "archive"))
+
+def line_data(fig):
+    """The x/y data of every line on every axis of a figure."""
+    return [(list(line.get_xdata()), list(line.get_ydata())) for ax in fig.axes for line in ax.get_lines()]
+
+def test_archive_charts_read_the_structured_array(sources):
+    _, archive = sources
+    daily_logs, weekly_reviews = parse_dashboard_data(archive)
+
+    assert isinstance(daily_logs, np.ndarray)
+    assert np.all(np.diff(daily_logs['date'].astype(int)) >= 0)
+    # No chart needs the review lists, so they are not rebuilt
+    assert weekly_reviews and all(set(review) <= {'week', 'overall_mood', 'overall_productivity'} for review in weekly_reviews)
+
+def test_archive_and_text_draw_the_same_charts(sources):
+    text, archive = sources
+    text_logs, text_reviews = parse_dashboard_data(text)
+    archive_logs, archive_reviews = parse_dashboard_data(archive)
+
+    for chart_name in CHART_NAMES:
+        text_fig = build_chart(chart_name, text_logs, text_reviews)
+        archive_fig = build_chart(chart_name, archive_logs, archive_reviews)
+        try:
+            np.testing.assert_equal(line_data(archive_fig), line_data(text_fig), err_msg=chart_name)
+        finally:
+            plt.close(text_fig)
+            plt.close(archive_fig)
+        chart_inputs(chart_name, archive_logs, archive_reviews)
+
+def test_anomalies_and_week_index_match_for_archive_rows(sources):
+    text, archive = sources
+    text_logs, text_reviews = parse_dashboard_data(text)
+    archive_logs, _ = parse_dashboard_data(archive)
+
+    assert detect_anomalies(archive_logs) == detect_anomalies(text_logs)
+
+    text_index = DailyLogIndex(text_logs)
+    archive_index = DailyLogIndex(archive_logs)
+    for review in text_reviews:
+        expected = [log['mood'] for log in logs_for_review(review, text_index) if 'mood' in log]
+        assert [log['mood'] for log in logs_for_review(review, archive_index) if 'mood' in log] == expected
@@ -0,0 +1,101 @@
+from data_parser import ProductivityDataParser
+from history_store import HistoryStore
+from rollups import RollupStore
+
+USER = "user@example.com"
+
+DUPLICATED_TEXT = """Monday, March 6, 2023
+- Mood: 5/10
+- Focus: 4/10
+- Achievements:
+- Drafted the plan
+- Sent the invoices
+
+Monday, March 6, 2023
+- Mood: 8/10
+- Focus: 7/10
+- Achievements:
+- Shipped the plan
+
+Tuesday, March 7, 2023
+- Mood: 6/10
+- Focus: 6/10
+
+Week of March 6-12, 2023
+- Overall mood: 5/10
+- Overall productivity: 5/10
+- Key achievements:
+- First draft
+
+Week of March 6-12, 2023
+- Overall mood: 7/10
+- Overall productivity: 8/10
+- Key achievements:
+- Final version
+"""
+
+def test_upsert_keeps_the_later_of_duplicated_entries():
+    store = HistoryStore(":memory:")
+    daily_logs = [
+        {'date': 'March 6, 2023', 'mood': 5, 'focus': 4, 'achievements': ['Drafted the plan', 'Sent the invoices'], 'sleep': 6},
+        {'date': 'March 6, 2023', 'mood': 8, 'focus': 7, 'achievements': ['Shipped the plan'], 'sleep': 8},
+    ]
+    weekly_reviews = [
+        {'week': 'March 6-12, 2023', 'overall_mood': 5, 'key_achievements': ['First draft']},
+        {'week': 'March 6-12, 2023', 'overall_mood': 7, 'key_achievements': ['Final version']},
+    ]
+
+    written = store.upsert_document(USER, daily_logs, weekly_reviews)
+
+    assert written == {'daily_logs': 1, 'weekly_reviews': 1, 'items': 2, 'metrics': 1}
+    [log] = store.daily_logs(USER)
+    assert (log['mood'], log['focus'], log['achievements'], log['sleep']) == (8, 7, ['Shipped the plan'], 8)
+    [review] = store.weekly_reviews(USER)
+    assert (review['overall_mood'], review['key_achievements']) == (7, ['Final version'])
+
+def test_refresh_snapshot_stores_a_document_with_repeated_entries(tmp_path):
+    store = HistoryStore(":memory:")
+    parser = ProductivityDataParser(cache_dir=str(tmp_path), store=store, user=USER)
+
+    snapshot, _, _ = parser.refresh_snapshot(DUPLICATED_TEXT)
+
+    logs = store.daily_logs(USER)
+    assert [(log['date'], log['mood']) for log in logs] == [('March 6, 2023', 8), ('March 7, 2023', 6)]
+    assert logs[0]['achievements'] == ['Shipped the plan']
+    [review] = store.weekly_reviews(USER)
+    assert review['key_achievements'] == ['Final version']
+    # The store agrees with the snapshot on which duplicate wins
+    assert [log['mood'] for log in snapshot.daily_logs.values()] == [log['mood'] for log in logs]
+
+def test_entries_deleted_from_the_document_are_removed():
+    store = HistoryStore(":memory:")
+    march_6 = {'date': 'March 6, 2023', 'mood': 8, 'focus': 7, 'achievements': ['Shipped the plan'], 'sleep': 8}
+    march_7 = {'date': 'March 7, 2023', 'mood': 6, 'focus': 6, 'challenges': ['Meetings'], 'sleep': 6}
+    week_6 = {'week': 'March 6-12, 2023', 'overall_mood': 7, 'key_achievements': ['Final version']}
+    week_13 = {'week': 'March 13-19, 2023', 'overall_mood': 6, 'goals_for_next_week': ['Rest']}
+    store.upsert_document(USER, [march_6, march_7], [week_6, week_13])
+    store.upsert_document("other@example.com", [march_7], [week_13])
+
+    store.upsert_document(USER, [march_6], [week_6])
+
+    assert [log['date'] for log in store.daily_logs(USER)] == ['March 6, 2023']
+    assert [review['week'] for review in store.weekly_reviews(USER)] == ['March 6-12, 2023']
+    # Nothing of the deleted entries is left behind, and other users are untouched
+    assert store.connection.execute("SELECT COUNT(*) FROM items WHERE user = ?", (USER,)).fetchone() == (2,)
+    assert store.connection.execute("SELECT COUNT(*) FROM daily_metrics WHERE user = ?", (USER,)).fetchone() == (1,)
+    assert [log['date'] for log in store.daily_logs("other@example.com")] == ['March 7, 2023']
+
+def test_repeated_entries_count_once_as_new(tmp_path):
+    parser = ProductivityDataParser(cache_dir=str(tmp_path))
+
+    snapshot, rollups, _ = parser.refresh_snapshot(DUPLICATED_TEXT)
+
+    # March 6, March 7 and the week of March 6, each new once however often it is repeated
+    assert parser.new_entries == 3
+    # The rollups hold only the winning copy of the repeated day
+    expected = RollupStore()
+    expected.update({key: (None, log) for key, log in snapshot.daily_logs.items()}, snapshot)
+    assert rollups.buckets == expected.buckets
+
+    parser.refresh_snapshot(DUPLICATED_TEXT)
+    assert parser.new_entries == 0
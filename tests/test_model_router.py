@@ -0,0 +1,123 @@
+import pytest
+
+from deadline import DeadlineExceeded
+from model_router import (GEMINI_MIN_CACHED_TOKENS, ModelOption, ModelRouter, StubModel, format_cache_stats,
+                          stub_client_factory, stub_context_factory)
+
+def make_models():
+    """A small fast model, a mid-size standard model and a large expensive model."""
+    return [
+        ModelOption('fast-small', max_input_tokens=1000, input_cost=0.075, output_cost=0.30,
+                    base_latency=0.01, latency_per_1k_tokens=0.0),
+        ModelOption('standard', max_input_tokens=100000, input_cost=0.10, output_cost=0.40,
+                    base_latency=0.02, latency_per_1k_tokens=0.0),
+        ModelOption('slow-large', max_input_tokens=1000000, input_cost=0.30, output_cost=2.50,
+                    base_latency=0.05, latency_per_1k_tokens=0.0),
+    ]
+
+def make_stubs(**overrides):
+    """Instant stubs for every model; keyword arguments replace one by name."""
+    stubs = {name: StubModel(name, seed=index) for index, name in enumerate(('fast-small', 'standard', 'slow-large'))}
+    stubs.update(overrides)
+    return stubs
+
+def make_router(stubs=None, models=None, **kwargs):
+    kwargs.setdefault('latency_budget', 1.0)
+    return ModelRouter(models or make_models(), client_factory=stub_client_factory(stubs or make_stubs()), **kwargs)
+
+def prompt_of(tokens):
+    """A prompt the router estimates at this many tokens."""
+    return "x" * (4 * tokens)
+
+def test_small_prompts_go_to_the_first_model_that_accepts_them():
+    router = make_router()
+    assert router.generate(prompt_of(500)).text.startswith("[fast-small]")
+    assert router.generate(prompt_of(5000)).text.startswith("[standard]")
+
+def test_models_over_budget_are_skipped():
+    models = make_models()
+    models[0].base_latency = 2.0
+    router = make_router(models=models, latency_budget=1.0)
+    assert [model.name for model in router.candidates(500)] == ['standard', 'slow-large', 'fast-small']
+
+    # Preferred but too expensive: 5000 prompt tokens cost 0.00225 USD on slow-large, 0.00062 USD on standard
+    models = make_models()
+    router = make_router(models=[models[2], models[1]], cost_budget=0.001)
+    assert router.candidates(5000)[0].name == 'standard'
+
+def test_over_budget_everywhere_picks_the_fastest_model():
+    router = make_router(latency_budget=0.001)
+    assert router.candidates(5000)[0].name == 'standard'
+
+def test_no_model_accepts_an_oversized_prompt():
+    router = make_router(models=make_models()[:1])
+    with pytest.raises(RuntimeError):
+        router.generate(prompt_of(5000))
+
+def test_falls_back_after_a_stub_failure():
+    router = make_router(make_stubs(**{'fast-small': StubModel('fast-small', failure_rate=1.0, seed=0)}))
+    response = router.generate(prompt_of(500))
+    assert response.text.startswith("[standard]")
+    assert [entry[0] for entry in router.history] == ['fast-small', 'standard']
+    assert router.history[0][3].startswith("failed (fast-small stub failure")
+    assert router.history[1][3] == "ok"
+
+def test_falls_back_when_a_stub_times_out():
+    hanging = StubModel('fast-small', base_latency=1.0)
+    router = make_router(make_stubs(**{'fast-small': hanging}), timeout=0.1)
+    response = router.generate(prompt_of(500))
+    assert response.text.startswith("[standard]")
+    assert "did not respond within 0.1s" in router.history[0][3]
+
+def test_attempt_timeout_allows_for_slow_estimates():
+    # A 0.3s call outlasts the 0.1s timeout but not 1.5 times the model's 0.25s estimate
+    models = make_models()
+    models[0].base_latency = 0.25
+    router = make_router(make_stubs(**{'fast-small': StubModel('fast-small', base_latency=0.3)}), models=models, timeout=0.1)
+    assert router.generate(prompt_of(500)).text.startswith("[fast-small]")
+
+def test_spent_timeout_raises_instead_of_falling_back():
+    router = make_router(make_stubs(**{'fast-small': StubModel('fast-small', base_latency=1.0)}), timeout=5.0)
+    with pytest.raises(DeadlineExceeded):
+        router.generate(prompt_of(500), timeout=0.1)
+    assert [entry[0] for entry in router.history] == ['fast-small']
+
+def test_observed_latency_is_an_exponentially_weighted_average():
+    model = ModelOption('m', base_latency=1.0, latency_per_1k_tokens=0.5)
+    model.observe(2000, 3.0)
+    # The observed base is 3.0 - 0.5 * 2 = 2.0; a 0.3 weight moves 1.0 towards it
+    assert model.base_latency == pytest.approx(1.3)
+    model.observe(2000, 3.0)
+    assert model.base_latency == pytest.approx(1.51)
+
+def test_router_updates_the_estimate_of_the_model_that_answered():
+    models = make_models()
+    router = make_router(make_stubs(**{'fast-small': StubModel('fast-small', base_latency=0.2)}), models=models)
+    router.generate(prompt_of(500))
+    assert 0.01 < models[0].base_latency < 0.2
+    assert models[1].base_latency == 0.02
+
+def test_prefixes_below_the_gemini_minimum_are_not_registered(monkeypatch):
+    monkeypatch.delenv("GEMINI_CACHE_MIN_TOKENS", raising=False)
+    stubs = make_stubs()
+    router = make_router(stubs, context_factory=stub_context_factory(stubs))
+    with router.context_caching() as cache:
+        for period in range(3):
+            router.generate(f"period {period}", prefix=prompt_of(100))
+        stats = cache.stats()
+
+    assert stubs['fast-small'].registrations == 0
+    assert (stats['registrations'], stats['too_short'], stats['hits'], stats['misses']) == (0, 1, 0, 3)
+    assert f"below the {GEMINI_MIN_CACHED_TOKENS}-token minimum" in format_cache_stats(stats)
+
+def test_a_long_enough_prefix_is_registered_once_per_batch():
+    stubs = make_stubs()
+    router = make_router(stubs, context_factory=stub_context_factory(stubs))
+    with router.context_caching(min_tokens=50) as cache:
+        for period in range(3):
+            router.generate(f"period {period}", prefix=prompt_of(100))
+        stats = cache.stats()
+
+    assert stubs['fast-small'].registrations == 1
+    assert (stats['registrations'], stats['too_short'], stats['hits'], stats['misses']) == (1, 0, 3, 0)
+    assert stats['cached_tokens'] > 0
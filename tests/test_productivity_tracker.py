@@ -0,0 +1,21 @@
+from productivity_tracker import docs_length, section_requests, write_sections_to_doc
+
+DOCUMENT_ID = "written-doc"
+
+def test_section_indexes_count_utf16_code_units():
+    requests, next_index = section_requests("Weekly 🎉", "Great week 🚀 overall")
+
+    # Each emoji is two UTF-16 code units, so it shifts the indexes by one more than len() does
+    assert docs_length("Weekly 🎉") == len("Weekly 🎉") + 1
+    assert requests[1]['updateTextStyle']['range']['endIndex'] == 1 + docs_length("Weekly 🎉") + 1
+    assert requests[2]['insertText']['location']['index'] == 1 + docs_length("Weekly 🎉") + 1
+    assert next_index == 1 + docs_length("Weekly 🎉\n") + docs_length("Great week 🚀 overall\n\n")
+
+def test_sections_after_a_non_bmp_character_land_in_order(fake_google):
+    original = fake_google.document(DOCUMENT_ID)
+    sections = [("Weekly Analysis 🎉", "A good week 🚀"), ("Monthly Analysis", "A steady month")]
+
+    assert write_sections_to_doc(DOCUMENT_ID, sections) is not None
+
+    expected = "Weekly Analysis 🎉\nA good week 🚀\n\nMonthly Analysis\nA steady month\n\n"
+    assert fake_google.document(DOCUMENT_ID) == expected + original
@@ -0,0 +1,135 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from synthetic_logs import generate_log_text
+import watcher
+from watcher import ScheduledJob, WatchDaemon
+
+DOCUMENT_ID = "watched-doc"
+
+class FakeClock:
+    """A clock that only moves when told to, or when the daemon sleeps."""
+
+    def __init__(self, now):
+        self.current = now
+
+    def now(self):
+        return self.current
+
+    def sleep(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+class RecordingGenerate:
+    """Stands in for generate_period_analysis, recording each call instead of calling Gemini."""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, parser, doc_content, analysis_type, reference_date=None):
+        self.calls.append((analysis_type, reference_date))
+        return f"{analysis_type} analysis up to {reference_date:%B %d, %Y}"
+
+def append_entry(state, date, mood=8, focus=7):
+    """Append a daily log to the fake document, creating a new revision."""
+    text = state.document(DOCUMENT_ID)
+    entry = f"\n\n{date:%A, %B} {date.day}, {date.year}\n- Mood: {mood}/10\n- Focus: {focus}/10\n- Achievements:\n- Shipped the watcher\n"
+    state.insert_text(DOCUMENT_ID, len(text) + 1, entry)
+
+@pytest.fixture
+def document(fake_google):
+    """A document whose last entry is December 31, 2023."""
+    fake_google.documents[DOCUMENT_ID] = generate_log_text(60, seed=1)
+    fake_google.revisions[DOCUMENT_ID] = 1
+    return fake_google
+
+def make_daemon(clock, tmp_path, **kwargs):
+    generate = RecordingGenerate()
+    daemon = WatchDaemon(DOCUMENT_ID, clock=clock, generate=generate, cache_dir=str(tmp_path / "watch"), **kwargs)
+    return daemon, generate
+
+def test_scheduled_run_analyzes_the_period_ending_at_the_clock_time(document, tmp_path):
+    clock = FakeClock(datetime(2024, 1, 4, 12, 0))
+    daemon, generate = make_daemon(clock, tmp_path, jobs=[ScheduledJob("weekly", "fri 04:23")], write_to_doc=False)
+    assert daemon.jobs[0].next_run == datetime(2024, 1, 5, 4, 23)
+
+    # The initial sync and polls before the scheduled time run nothing
+    delay = daemon.run_once()
+    assert generate.calls == []
+    assert delay == daemon.poll_interval
+
+    clock.current = datetime(2024, 1, 5, 4, 30)
+    daemon.run_once()
+    assert generate.calls == [("weekly", datetime(2024, 1, 5, 4, 30))]
+    assert daemon.runs == [(datetime(2024, 1, 5, 4, 30), "weekly", "schedule")]
+    assert daemon.jobs[0].next_run == datetime(2024, 1, 12, 4, 23)
+
+    # Not due again until next week
+    daemon.run_once()
+    assert len(generate.calls) == 1
+
+def test_sleep_is_capped_by_the_next_scheduled_run(document, tmp_path):
+    clock = FakeClock(datetime(2024, 1, 5, 4, 20))
+    daemon, _ = make_daemon(clock, tmp_path, jobs=[ScheduledJob("weekly", "fri 04:23")], write_to_doc=False)
+    assert daemon.run_once() == 180
+
+def test_new_entries_trigger_change_analyses(document, tmp_path):
+    clock = FakeClock(datetime(2024, 1, 2, 9, 0))
+    daemon, generate = make_daemon(clock, tmp_path, on_change=["weekly"], write_to_doc=False)
+
+    # The first sync finds every entry, which is not the same as new entries
+    daemon.run_once()
+    assert generate.calls == []
+
+    append_entry(document, datetime(2024, 1, 2))
+    daemon.run_once()
+    assert generate.calls == [("weekly", datetime(2024, 1, 2, 9, 0))]
+    assert daemon.runs[-1][2] == "new entries"
+    assert daemon.revision == document.revision(DOCUMENT_ID)
+
+    # An unchanged revision is neither re-fetched nor analyzed
+    daemon.run_once()
+    assert len(generate.calls) == 1
+
+def test_own_write_is_not_seen_as_new_entries(document, tmp_path):
+    clock = FakeClock(datetime(2024, 1, 2, 9, 0))
+    daemon, generate = make_daemon(clock, tmp_path, on_change=["weekly"], write_to_doc=True)
+    daemon.run_once()
+
+    append_entry(document, datetime(2024, 1, 2))
+    revision_before_write = document.revision(DOCUMENT_ID)
+    daemon.run_once()
+    assert len(generate.calls) == 1
+    assert "weekly analysis up to January 02, 2024" in document.document(DOCUMENT_ID)
+
+    # The write created a revision, which the daemon recorded as its own
+    assert document.revision(DOCUMENT_ID) != revision_before_write
+    assert daemon.revision == document.revision(DOCUMENT_ID)
+
+    requests = document.stats()['requests']['get']
+    daemon.run_once()
+    assert len(generate.calls) == 1
+    # Only the revision was polled
+    assert document.stats()['requests']['get'] == requests + 1
+
+@pytest.mark.parametrize("analysis_type, spec", [
+    ("weekly", "fri 4:23pm"),
+    ("weekly", "31 04:23"),
+    ("weekly", "fry 04:23"),
+    ("weekly", "fri 25:00"),
+    ("monthly", "fri 04:23"),
+    ("monthly", "32 04:23"),
+])
+def test_malformed_schedule_specs_are_rejected(analysis_type, spec):
+    with pytest.raises(ValueError, match=f"Invalid {analysis_type} schedule '{spec}'"):
+        ScheduledJob(analysis_type, spec)
+
+def test_schedule_specs_accept_full_weekday_names():
+    assert ScheduledJob("weekly", "Friday 16:23").weekday == ScheduledJob("weekly", "fri 16:23").weekday == 4
+
+def test_main_reports_a_malformed_schedule(monkeypatch, capsys):
+    monkeypatch.setenv("GOOGLE_DOC_ID", DOCUMENT_ID)
+
+    watcher.main(weekly_at="fri 4:23pm")
+
+    assert "Error: Invalid weekly schedule 'fri 4:23pm'" in capsys.readouterr().out